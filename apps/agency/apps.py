@@ -4,3 +4,6 @@ from django.utils.translation import gettext_lazy as _
 class AgencyConfig(AppConfig):
     name = 'apps.agency'
     verbose_name = _("Агентство")
+
+    def ready(self):
+        from . import signals  # noqa
@@ -1,10 +1,11 @@
 # apps/agency/models.py
 from django.conf import settings
 from django.db import models
-from django.db.models import F
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
+from .view_counters import record_view, views_count
+
 
 class Department(models.Model):
     name = models.CharField(_("Название департамента"), max_length=255, unique=True)
@@ -188,9 +189,10 @@ class AgencyAbout(models.Model):
         return cls.objects.filter(is_published=True).order_by("-updated_at").first()
 
     def inc_views(self):
-        type(self).objects.filter(pk=self.pk).update(views_count=F("views_count") + 1)
-        # обновим объект в памяти (не обязательно, но приятно)
-        self.views_count += 1
+        # буфер + периодическая запись (apps/agency/view_counters.py);
+        # в памяти — значение с учётом ещё не записанных просмотров
+        record_view(self)
+        self.views_count = views_count(self)
 
 
 class LeadershipProfile(models.Model):
@@ -237,8 +239,10 @@ class LeadershipProfile(models.Model):
         return self.employee.display_name
 
     def inc_views(self):
-        type(self).objects.filter(pk=self.pk).update(views_count=F("views_count") + 1)
-        self.views_count += 1
+        # буфер + периодическая запись (apps/agency/view_counters.py);
+        # в памяти — значение с учётом ещё не записанных просмотров
+        record_view(self)
+        self.views_count = views_count(self)
 
 
 class News(models.Model):
@@ -268,6 +272,8 @@ class News(models.Model):
         return self.title
 
     def inc_views(self):
-        type(self).objects.filter(pk=self.pk).update(views_count=F("views_count") + 1)
-        self.views_count += 1
+        # буфер + периодическая запись (apps/agency/view_counters.py);
+        # в памяти — значение с учётом ещё не записанных просмотров
+        record_view(self)
+        self.views_count = views_count(self)
 
@@ -0,0 +1,74 @@
+# apps/agency/page_cache.py
+#
+# Кэш публичных страниц для анонимных посетителей (главная, новости, объявления,
+# руководство).
+#
+# Ключ: версия + язык + путь с query (?page=N). Любое сохранение/удаление News,
+# AgencyAbout, LeadershipProfile или Employee увеличивает версию (signals.py) —
+# все страницы разом становятся промахом, старые записи дожидаются TIMEOUT.
+#
+# Не кэшируется: не-GET, авторизованные пользователи (у сотрудников свои ссылки
+# в шапке), запросы с непоказанными flash-сообщениями, ответы не 200.
+# Счётчики просмотров (view_counters.py) в кэшируемых страницах не увеличиваются;
+# показанные в списках числа отстают не больше чем на PUBLIC_PAGE_CACHE_SECONDS.
+from __future__ import annotations
+
+import hashlib
+
+from functools import wraps
+
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils import translation
+
+VERSION_KEY = "public_page:version"
+
+
+def _version() -> int:
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, 1, None)
+        version = cache.get(VERSION_KEY) or 1
+    return int(version)
+
+
+def invalidate_public_pages() -> None:
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        # ключа ещё нет (или его вытеснили) — любая новая версия годится
+        cache.add(VERSION_KEY, 2, None)
+
+
+def _cache_key(request) -> str:
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f"public_page:{_version()}:{translation.get_language()}:{path}"
+
+
+def _cacheable(request) -> bool:
+    if request.method != "GET" or request.user.is_authenticated:
+        return False
+    # len() не помечает сообщения прочитанными
+    return not len(messages.get_messages(request))
+
+
+def public_page_cache(view):
+    @wraps(view)
+    def _wrapped(request, *args, **kwargs):
+        if not settings.PUBLIC_PAGE_CACHE_SECONDS or not _cacheable(request):
+            return view(request, *args, **kwargs)
+
+        key = _cache_key(request)
+        cached = cache.get(key)
+        if cached is not None:
+            content, content_type = cached
+            return HttpResponse(content, content_type=content_type)
+
+        response = view(request, *args, **kwargs)
+        if response.status_code == 200 and not response.streaming:
+            cache.set(key, (response.content, response["Content-Type"]), settings.PUBLIC_PAGE_CACHE_SECONDS)
+        return response
+
+    return _wrapped
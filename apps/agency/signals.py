@@ -0,0 +1,19 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.agency.models import AgencyAbout, Employee, LeadershipProfile, News
+from apps.agency.page_cache import invalidate_public_pages
+
+
+@receiver(post_save, sender=News)
+@receiver(post_delete, sender=News)
+@receiver(post_save, sender=AgencyAbout)
+@receiver(post_delete, sender=AgencyAbout)
+@receiver(post_save, sender=LeadershipProfile)
+@receiver(post_delete, sender=LeadershipProfile)
+@receiver(post_save, sender=Employee)
+@receiver(post_delete, sender=Employee)
+def invalidate_public_page_cache(sender, **kwargs):
+    # руководство на сайте — это Employee (ФИО, фото, должность)
+    transaction.on_commit(invalidate_public_pages)
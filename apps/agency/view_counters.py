@@ -0,0 +1,139 @@
+# apps/agency/view_counters.py
+#
+# Буфер просмотров публичных страниц (News, AgencyAbout, LeadershipProfile).
+#
+# UPDATE views_count = views_count + 1 на каждый заход упирается в блокировку строки:
+# "О агентстве" — одна горячая запись. Вместо этого процесс копит приращения
+# в памяти и раз в VIEW_COUNTERS_FLUSH_SECONDS пишет их фоновым потоком: одна
+# строка — один UPDATE (объекты с одинаковым приращением — одним UPDATE ... IN).
+#
+#   - best-effort, счётчики приблизительные: не записанные из-за ошибки БД
+#     приращения возвращаются в буфер, при штатном завершении процесса буфер
+#     сбрасывается (atexit). Но при SIGKILL, OOM или таймауте воркера gunicorn
+#     atexit не выполняется — теряется до VIEW_COUNTERS_FLUSH_SECONDS просмотров.
+#     На точное число просмотров ничего не завязывать;
+#   - для отображения: views_count(obj) = значение из БД + ещё не записанное
+#     в этом процессе;
+#   - VIEW_COUNTERS_BUFFERED=False — старое поведение, UPDATE сразу (тесты, отладка).
+from __future__ import annotations
+
+import atexit
+import logging
+import os
+import threading
+import time
+
+from collections import defaultdict
+from typing import Dict, Iterable, Tuple
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Model
+
+logger = logging.getLogger(__name__)
+
+_Key = Tuple[str, int]  # (app_label.ModelName, pk)
+
+_lock = threading.Lock()
+_pending: Dict[_Key, int] = defaultdict(int)
+_state = {"pid": None, "thread": None}
+
+
+def _key(obj: Model) -> _Key:
+    return obj._meta.label, obj.pk
+
+
+def _ensure_flusher() -> None:
+    # после fork (gunicorn --preload) поток родителя в дочернем процессе не живёт
+    pid = os.getpid()
+    if _state["pid"] == pid and _state["thread"] is not None:
+        return
+    if _state["pid"] != pid:
+        _pending.clear()
+    _state["pid"] = pid
+    thread = threading.Thread(target=_flush_loop, name="view-counters", daemon=True)
+    _state["thread"] = thread
+    thread.start()
+
+
+def _flush_loop() -> None:
+    while True:
+        time.sleep(settings.VIEW_COUNTERS_FLUSH_SECONDS)
+        try:
+            flush_view_counters()
+        except Exception:
+            logger.exception("View counters flush failed")
+        finally:
+            connection.close()
+
+
+def record_view(obj: Model) -> None:
+    if not settings.VIEW_COUNTERS_BUFFERED:
+        type(obj).objects.filter(pk=obj.pk).update(views_count=F("views_count") + 1)
+        return
+
+    with _lock:
+        _ensure_flusher()
+        _pending[_key(obj)] += 1
+
+
+def pending_views(obj: Model) -> int:
+    with _lock:
+        return _pending.get(_key(obj), 0)
+
+
+def views_count(obj: Model) -> int:
+    """
+    Счётчик для показа: сохранённое значение + ещё не записанные просмотры.
+    """
+    return (obj.views_count or 0) + pending_views(obj)
+
+
+def apply_pending_views(objs: Iterable[Model]) -> None:
+    """
+    Подмешивает не записанные просмотры в views_count объектов списка (только в памяти).
+    """
+    with _lock:
+        if not _pending:
+            return
+        for obj in objs:
+            obj.views_count = (obj.views_count or 0) + _pending.get(_key(obj), 0)
+
+
+def flush_view_counters() -> int:
+    """
+    Записывает накопленное. Возвращает число обновлённых объектов.
+    """
+    with _lock:
+        if not _pending:
+            return 0
+        batch = dict(_pending)
+        _pending.clear()
+
+    # {(модель, приращение): [pk, ...]} — одинаковые приращения одним UPDATE
+    grouped: Dict[Tuple[str, int], list] = defaultdict(list)
+    for (label, pk), delta in batch.items():
+        grouped[(label, delta)].append(pk)
+
+    try:
+        with transaction.atomic():
+            for (label, delta), pks in sorted(grouped.items()):
+                model = apps.get_model(label)
+                model.objects.filter(pk__in=sorted(pks)).update(views_count=F("views_count") + delta)
+    except Exception:
+        with _lock:
+            for key, delta in batch.items():
+                _pending[key] += delta
+        raise
+    return len(batch)
+
+
+def _flush_at_exit() -> None:
+    try:
+        flush_view_counters()
+    except Exception:
+        logger.exception("View counters flush at exit failed")
+
+
+atexit.register(_flush_at_exit)
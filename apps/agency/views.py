@@ -1,11 +1,23 @@
+from django.conf import settings
+from django.core.paginator import Paginator
 from django.shortcuts import render, get_object_or_404
 
 from apps.agency.models import AgencyAbout, News, LeadershipProfile
+from apps.agency.page_cache import public_page_cache
+from apps.agency.view_counters import apply_pending_views
 
 
+def _news_page(request, qs):
+    page_obj = Paginator(qs, settings.PUBLIC_NEWS_PAGE_SIZE).get_page(request.GET.get("page") or 1)
+    apply_pending_views(page_obj.object_list)
+    return page_obj
+
+
+@public_page_cache
 def public_home(request):
     about = AgencyAbout.get_public()
-    news_list = News.objects.filter(is_published=True).order_by("-published_at")[:6]
+    news_list = list(News.objects.filter(is_published=True).order_by("-published_at")[:6])
+    apply_pending_views(news_list)
     return render(request, "public/home.html", {"about": about, "news_list": news_list})
 
 
@@ -18,6 +30,7 @@ def public_about_detail(request):
     return render(request, "public/agency_about_detail.html", {"about": about})
 
 
+@public_page_cache
 def public_leadership_list(request):
     leaders = (
         LeadershipProfile.objects
@@ -28,10 +41,11 @@ def public_leadership_list(request):
     return render(request, "public/leadership_list.html", {"leaders": leaders})
 
 
+@public_page_cache
 def public_news_list(request):
     # только новости
-    news_list = News.objects.filter(is_published=True, announcement=False).order_by("-published_at")
-    return render(request, "public/news_list.html", {"news_list": news_list})
+    page_obj = _news_page(request, News.objects.filter(is_published=True, announcement=False).order_by("-published_at", "-id"))
+    return render(request, "public/news_list.html", {"news_list": page_obj.object_list, "page_obj": page_obj})
 
 
 def public_news_detail(request, pk: int):
@@ -40,8 +54,9 @@ def public_news_detail(request, pk: int):
     return render(request, "public/news_detail.html", {"obj": obj})
 
 
+@public_page_cache
 def public_announcements_list(request):
     # только объявления
-    news_list = News.objects.filter(is_published=True, announcement=True).order_by("-published_at")
-    return render(request, "public/announcements_list.html", {"news_list": news_list})
+    page_obj = _news_page(request, News.objects.filter(is_published=True, announcement=True).order_by("-published_at", "-id"))
+    return render(request, "public/announcements_list.html", {"news_list": page_obj.object_list, "page_obj": page_obj})
 
@@ -8,8 +8,37 @@ from modeltranslation.admin import TranslationAdmin
 from import_export.admin import ImportExportModelAdmin
 from .resources import CompanyResource, CompanyDirectionStatResource
 
+from .changes import company_change_source
 from .models import Category, Direction, Company, Position, EmployeeCompany, Region, District, Unit, CompanyPhone, \
-    CompanyDirectionStat
+    CompanyDirectionStat, CompanyChange
+
+
+class CompanyChangeSourceAdminMixin:
+    """
+    Изменения компаний из админки пишутся в журнал с source=admin,
+    импорт через django-import-export — с source=import.
+    """
+
+    def changeform_view(self, *args, **kwargs):
+        with company_change_source(CompanyChange.Source.ADMIN):
+            return super().changeform_view(*args, **kwargs)
+
+    def delete_view(self, *args, **kwargs):
+        with company_change_source(CompanyChange.Source.ADMIN):
+            return super().delete_view(*args, **kwargs)
+
+    def changelist_view(self, *args, **kwargs):
+        # actions (массовое удаление и т.п.)
+        with company_change_source(CompanyChange.Source.ADMIN):
+            return super().changelist_view(*args, **kwargs)
+
+    def import_action(self, *args, **kwargs):
+        with company_change_source(CompanyChange.Source.IMPORT):
+            return super().import_action(*args, **kwargs)
+
+    def process_import(self, *args, **kwargs):
+        with company_change_source(CompanyChange.Source.IMPORT):
+            return super().process_import(*args, **kwargs)
 
 
 @admin.register(Region)
@@ -87,7 +116,7 @@ class CompanyDirectionStatInline(admin.TabularInline):
 
 
 @admin.register(CompanyDirectionStat)
-class CompanyDirectionStatAdmin(ImportExportModelAdmin, admin.ModelAdmin):
+class CompanyDirectionStatAdmin(CompanyChangeSourceAdminMixin, ImportExportModelAdmin, admin.ModelAdmin):
     resource_class = CompanyDirectionStatResource
 
     list_display = ("company", "direction", "year", "quantity", "unit", "jobs", "volume_bln_sum")
@@ -147,7 +176,7 @@ class CompanyAdminForm(forms.ModelForm):
 
 
 @admin.register(Company)
-class CompanyAdmin(TranslationAdmin, ImportExportModelAdmin, admin.ModelAdmin):
+class CompanyAdmin(CompanyChangeSourceAdminMixin, TranslationAdmin, ImportExportModelAdmin, admin.ModelAdmin):
     resource_class = CompanyResource
     form = CompanyAdminForm
     list_display = ("name", "inn", "category", "region", "district", "data_source", "verification_level", "created_at")
@@ -187,7 +216,7 @@ class PositionAdmin(TranslationAdmin, admin.ModelAdmin):
 
 
 @admin.register(EmployeeCompany)
-class EmployeeCompanyAdmin(admin.ModelAdmin):
+class EmployeeCompanyAdmin(CompanyChangeSourceAdminMixin, admin.ModelAdmin):
     list_display = (
         "company",
         "position",
@@ -5,3 +5,6 @@ from django.utils.translation import gettext_lazy as _
 class CompaniesConfig(AppConfig):
     name = 'apps.companies'
     verbose_name = _("Tashkilotlar")
+
+    def ready(self):
+        from . import signals  # noqa
@@ -1,25 +1,26 @@
 from dal import autocomplete
-from django.db.models import Q
-from .models import District
+from .reference_cache import get_districts
 
 class DistrictAutocomplete(autocomplete.Select2QuerySetView):
     """
     Возвращает список районов отфильтрованных по выбранному региону.
     DAL сам передаст значение поля 'region' через forward=['region'].
+    Районы берём из кэша справочников, поиск по тексту — в памяти.
     """
     def get_queryset(self):
-        qs = District.objects.all()
-
         # фильтр по выбранному блоку (приходит в forwarded)
         region_id = self.forwarded.get('region')
-        if region_id:
-            qs = qs.filter(region_id=region_id)
+        try:
+            items = get_districts(int(region_id) if region_id else None)
+        except (TypeError, ValueError):
+            items = get_districts(None)
 
         # поиск по тексту
         if self.q:
-            qs = qs.filter(
-                Q(name_ru__icontains=self.q) |
-                Q(name_uz__icontains=self.q)
-            )
+            q = self.q.casefold()
+            items = [
+                d for d in items
+                if q in (d.name_ru or "").casefold() or q in (d.name_uz or "").casefold()
+            ]
 
-        return qs.order_by("code", "id")
\ No newline at end of file
+        return items
@@ -0,0 +1,35 @@
+import threading
+
+from django.db import transaction
+
+
+class OnCommitBatch:
+    """
+    Копит ключи (id компаний, срезы куба ...) в пределах потока и отдаёт их
+    handler-у одним вызовом после commit. Внутри транзакции импорта одна
+    компания меняется десятки раз — пересчёт должен случиться один раз.
+
+    Вне atomic() on_commit срабатывает сразу, так что поведение то же.
+    """
+
+    def __init__(self, handler):
+        self.handler = handler
+        self._local = threading.local()
+
+    def _keys(self) -> set:
+        if not hasattr(self._local, "keys"):
+            self._local.keys = set()
+        return self._local.keys
+
+    def add(self, keys) -> None:
+        self._keys().update(k for k in keys if k)
+        # регистрируем на каждое добавление: после rollback колбэки теряются,
+        # а ключи остаются — их подберёт следующий commit (лишний пересчёт не страшен)
+        transaction.on_commit(self.flush)
+
+    def flush(self) -> None:
+        keys = self._keys()
+        if not keys:
+            return
+        self._local.keys = set()
+        self.handler(keys)
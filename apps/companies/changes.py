@@ -0,0 +1,170 @@
+# apps/companies/changes.py
+from __future__ import annotations
+
+import contextvars
+import logging
+
+from contextlib import ContextDecorator
+
+from django.db import OperationalError, connection, transaction
+from django.db.models import Max, Min
+
+from .models import CompanyChange, CompanyChangeWatermark
+
+logger = logging.getLogger(__name__)
+
+_source = contextvars.ContextVar("company_change_source", default=CompanyChange.Source.SYSTEM)
+
+
+class company_change_source(ContextDecorator):
+    """
+    Источник изменений для журнала:
+
+        @company_change_source(CompanyChange.Source.TELEGRAM)
+        def register_or_bind_telegram_profile_by_inn(...): ...
+
+        with company_change_source(CompanyChange.Source.IMPORT):
+            ...
+    """
+
+    def __init__(self, source: str):
+        self.source = source
+        self._token = None
+
+    def _recreate_cm(self):
+        # как декоратор: свой экземпляр на каждый вызов (потоки, рекурсия)
+        return type(self)(self.source)
+
+    def __enter__(self):
+        self._token = _source.set(self.source)
+        return self
+
+    def __exit__(self, *exc):
+        _source.reset(self._token)
+        return False
+
+
+def current_change_source() -> str:
+    return _source.get()
+
+
+def record_company_change(company_id: int | None, kind: str, *, stat_slices=None) -> None:
+    """
+    Пишет запись в журнал в текущей транзакции (откатится вместе с изменением).
+    stat_slices — затронутые срезы куба {(год, direction_id)}: по строке на срез.
+    """
+    if not company_id:
+        return
+    source = _source.get()
+    slices = sorted({(y, d) for y, d in (stat_slices or ()) if y and d})
+    if not slices:
+        CompanyChange.objects.create(company_id=company_id, kind=kind, source=source)
+        return
+    CompanyChange.objects.bulk_create([
+        CompanyChange(company_id=company_id, kind=kind, source=source, stat_year=y, stat_direction_id=d)
+        for y, d in slices
+    ])
+
+
+def record_company_changes(company_ids, kind: str) -> None:
+    source = _source.get()
+    CompanyChange.objects.bulk_create([
+        CompanyChange(company_id=pk, kind=kind, source=source)
+        for pk in sorted(set(company_ids)) if pk
+    ])
+
+
+# ---------------- потребители ----------------
+
+# потребитель получает id компаний и срезы куба {(год, direction_id)} из записей пачки
+
+def _rebuild_search(company_ids, stat_slices):
+    from .search import rebuild_search_documents
+
+    return rebuild_search_documents(company_ids)
+
+
+def _rebuild_cube(company_ids, stat_slices):
+    from .cube import company_slices, rebuild_cube_slices
+
+    # текущие срезы компаний + прежние срезы удалённых/перенесённых показателей
+    return rebuild_cube_slices(company_slices(company_ids) | set(stat_slices))
+
+
+COMPANY_CHANGE_CONSUMERS = {
+    "search": _rebuild_search,
+    "stat_cube": _rebuild_cube,
+}
+
+
+def committed_high_watermark() -> int | None:
+    """
+    Максимальный id, ниже которого в журнале уже не появится новых строк.
+
+    id выдаются при INSERT, а видны после COMMIT: долгий импорт может получить id=10
+    и закоммититься после строки id=11. Поэтому на Postgres берём SHARE-блокировку
+    журнала — она дожидается всех транзакций, которые в него пишут, — и читаем max(id).
+    lock_timeout короткий: если идёт импорт, просто пропускаем этот запуск.
+    """
+    try:
+        with transaction.atomic():
+            if connection.vendor == "postgresql":
+                with connection.cursor() as cursor:
+                    cursor.execute("SET LOCAL lock_timeout = '2s'")
+                    cursor.execute(f"LOCK TABLE {CompanyChange._meta.db_table} IN SHARE MODE")
+            return CompanyChange.objects.aggregate(m=Max("id"))["m"] or 0
+    except OperationalError:
+        logger.info("Company change journal is busy, skipping this run")
+        return None
+
+
+def consume_company_changes(consumer: str, *, batch_size: int = 1000, max_batches: int | None = None) -> int:
+    """
+    Отдаёт потребителю id компаний, изменённых после его watermark-а, пачками.
+    Возвращает количество обработанных записей журнала.
+    """
+    handler = COMPANY_CHANGE_CONSUMERS[consumer]
+    high = committed_high_watermark()
+    if high is None:
+        return 0
+
+    processed = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        with transaction.atomic():
+            wm, _ = CompanyChangeWatermark.objects.select_for_update().get_or_create(consumer=consumer)
+            rows = list(
+                CompanyChange.objects
+                .filter(id__gt=wm.last_change_id, id__lte=high)
+                .order_by("id")
+                .values_list("id", "company_id", "stat_year", "stat_direction_id")[:batch_size]
+            )
+            if not rows:
+                break
+
+            handler(
+                {company_id for _id, company_id, _y, _d in rows},
+                {(y, d) for _id, _c, y, d in rows if y and d},
+            )
+
+            wm.last_change_id = rows[-1][0]
+            wm.save(update_fields=["last_change_id", "updated_at"])
+
+        processed += len(rows)
+        batches += 1
+
+    return processed
+
+
+def prune_company_changes() -> int:
+    """
+    Удаляет записи, которые уже обработали все известные потребители.
+    """
+    low = CompanyChangeWatermark.objects.filter(
+        consumer__in=list(COMPANY_CHANGE_CONSUMERS)
+    ).aggregate(m=Min("last_change_id"))["m"]
+    known = CompanyChangeWatermark.objects.filter(consumer__in=list(COMPANY_CHANGE_CONSUMERS)).count()
+    if not low or known < len(COMPANY_CHANGE_CONSUMERS):
+        return 0
+    deleted, _ = CompanyChange.objects.filter(id__lte=low).delete()
+    return deleted
@@ -0,0 +1,125 @@
+# apps/companies/cube.py
+from __future__ import annotations
+
+import logging
+
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+
+from .batching import OnCommitBatch
+from .models import CompanyDirectionStat, CompanyStatCube
+
+logger = logging.getLogger(__name__)
+
+# Категория берётся у направления (а не у компании): показатель относится к направлению
+CUBE_DIMENSIONS = {
+    "year": "year",
+    "region_id": "company__region_id",
+    "district_id": "company__district_id",
+    "category_id": "direction__category_id",
+    "direction_id": "direction_id",
+    "unit_id": "unit_id",
+}
+
+
+def _aggregate(stats_qs) -> list[CompanyStatCube]:
+    rows = (
+        stats_qs
+        .values(*CUBE_DIMENSIONS.values())
+        .annotate(
+            quantity_sum=Sum("quantity"),
+            volume_sum=Sum("volume_bln_sum"),
+            jobs_sum=Sum("jobs"),
+            companies=Count("company_id", distinct=True),
+            rows=Count("id"),
+        )
+        .order_by()
+    )
+    return [
+        CompanyStatCube(
+            **{dim: r[src] for dim, src in CUBE_DIMENSIONS.items()},
+            quantity=r["quantity_sum"],
+            volume_bln_sum=r["volume_sum"],
+            jobs=r["jobs_sum"],
+            companies_count=r["companies"],
+            rows_count=r["rows"],
+        )
+        for r in rows
+    ]
+
+
+def _slices_q(slices, prefix: str = "") -> Q:
+    """
+    {(год, direction_id)} -> Q(year=.., direction_id__in=[..]) | ...
+    """
+    by_year = defaultdict(set)
+    for year, direction_id in slices:
+        by_year[year].add(direction_id)
+
+    q = Q()
+    for year, direction_ids in by_year.items():
+        q |= Q(**{f"{prefix}year": year, f"{prefix}direction_id__in": sorted(direction_ids)})
+    return q
+
+
+@transaction.atomic
+def rebuild_cube_slices(slices) -> int:
+    """
+    Пересчитывает только затронутые срезы (год, направление): delete + insert.
+    """
+    slices = {(int(y), int(d)) for y, d in slices if y and d}
+    if not slices:
+        return 0
+
+    q = _slices_q(slices)
+    CompanyStatCube.objects.filter(q).delete()
+    cells = _aggregate(CompanyDirectionStat.objects.filter(q))
+    CompanyStatCube.objects.bulk_create(cells, batch_size=1000)
+    return len(cells)
+
+
+@transaction.atomic
+def rebuild_cube_all() -> int:
+    CompanyStatCube.objects.all().delete()
+    cells = _aggregate(CompanyDirectionStat.objects.all())
+    CompanyStatCube.objects.bulk_create(cells, batch_size=1000)
+    return len(cells)
+
+
+def company_slices(company_ids) -> set:
+    if not company_ids:
+        return set()
+    return set(
+        CompanyDirectionStat.objects
+        .filter(company_id__in=list(company_ids))
+        .values_list("year", "direction_id")
+        .distinct()
+    )
+
+
+def rebuild_cube_for_companies(company_ids) -> int:
+    return rebuild_cube_slices(company_slices(company_ids))
+
+
+def _flush_cube(keys) -> None:
+    """
+    keys: ("slice", год, direction_id) или ("company", company_id).
+    Компании раскрываем в срезы уже после commit — одним запросом.
+    """
+    slices = {(k[1], k[2]) for k in keys if k[0] == "slice"}
+    slices.update(company_slices([k[1] for k in keys if k[0] == "company"]))
+    cells = rebuild_cube_slices(slices)
+    logger.debug("Stat cube: %s slice(s) rebuilt, %s cell(s)", len(slices), cells)
+
+
+_cube_batch = OnCommitBatch(_flush_cube)
+
+
+def schedule_cube_slices(slices) -> None:
+    _cube_batch.add(("slice", y, d) for y, d in slices if y and d)
+
+
+def schedule_cube_for_companies(company_ids) -> None:
+    _cube_batch.add(("company", pk) for pk in company_ids if pk)
@@ -1,7 +1,8 @@
 from django.core.management.base import BaseCommand
 from django.db import transaction
 
-from apps.companies.models import Company, Direction, CompanyDirectionStat
+from apps.companies.changes import company_change_source
+from apps.companies.models import Company, Direction, CompanyDirectionStat, CompanyChange
 
 DEFAULT_YEAR = 2026
 LEGACY_DIRECTION_TITLE = "Общая мощность"
@@ -15,6 +16,7 @@ class Command(BaseCommand):
         parser.add_argument("--dry-run", action="store_true", default=False)
 
     @transaction.atomic
+    @company_change_source(CompanyChange.Source.IMPORT)
     def handle(self, *args, **opts):
         year = opts["year"]
         dry = opts["dry_run"]
@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.companies.models import Company, EmployeeCompany
+from apps.companies.normalization import company_name_key, norm_inn_key, person_name_key
+
+
+class Command(BaseCommand):
+    help = "Fill Company.name_key/inn_key and EmployeeCompany.name_key for existing rows."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    @transaction.atomic
+    def handle(self, *args, **opts):
+        batch_size = opts["batch_size"]
+
+        companies = 0
+        batch = []
+        for c in Company.objects.only("id", "name", "inn", "name_key", "inn_key").iterator(chunk_size=batch_size):
+            name_key, inn_key = company_name_key(c.name), norm_inn_key(c.inn)
+            if (c.name_key, c.inn_key) == (name_key, inn_key):
+                continue
+            c.name_key, c.inn_key = name_key, inn_key
+            batch.append(c)
+            if len(batch) >= batch_size:
+                companies += len(batch)
+                Company.objects.bulk_update(batch, ["name_key", "inn_key"])
+                batch = []
+        if batch:
+            companies += len(batch)
+            Company.objects.bulk_update(batch, ["name_key", "inn_key"])
+
+        employees = 0
+        batch = []
+        qs = EmployeeCompany.objects.only("id", "last_name", "first_name", "middle_name", "name_key")
+        for e in qs.iterator(chunk_size=batch_size):
+            name_key = person_name_key(e.last_name, e.first_name, e.middle_name)
+            if e.name_key == name_key:
+                continue
+            e.name_key = name_key
+            batch.append(e)
+            if len(batch) >= batch_size:
+                employees += len(batch)
+                EmployeeCompany.objects.bulk_update(batch, ["name_key"])
+                batch = []
+        if batch:
+            employees += len(batch)
+            EmployeeCompany.objects.bulk_update(batch, ["name_key"])
+
+        self.stdout.write(self.style.SUCCESS(f"Done. companies={companies} employees={employees}"))
@@ -0,0 +1,73 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from apps.companies.models import Company, EmployeeCompany
+
+
+class Command(BaseCommand):
+    help = "Report duplicate clusters of companies (by normalized INN / name) and company employees."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--by", choices=["inn", "name", "all"], default="all")
+        parser.add_argument("--employees", action="store_true", default=False,
+                            help="Also report duplicate employees inside a company")
+        parser.add_argument("--limit", type=int, default=200, help="Max clusters per section")
+
+    def _report(self, title: str, key_field: str, limit: int):
+        keys = list(
+            Company.objects
+            .exclude(**{key_field: ""})
+            .values(key_field)
+            .annotate(n=Count("id"))
+            .filter(n__gt=1)
+            .order_by("-n", key_field)
+            .values_list(key_field, flat=True)[:limit]
+        )
+        self.stdout.write(self.style.MIGRATE_HEADING(f"{title}: {len(keys)} cluster(s)"))
+        if not keys:
+            return
+
+        clusters = defaultdict(list)
+        members = (
+            Company.objects
+            .filter(**{f"{key_field}__in": keys})
+            .order_by("id")
+            .values_list(key_field, "id", "inn", "name")
+        )
+        for key, pk, inn, name in members:
+            clusters[key].append((pk, inn, name))
+
+        for key in keys:
+            rows = clusters[key]
+            self.stdout.write(f"[{key}] x{len(rows)}")
+            for pk, inn, name in rows:
+                self.stdout.write(f"    id={pk} inn={inn} name={name}")
+
+    def _report_employees(self, limit: int):
+        dups = list(
+            EmployeeCompany.objects
+            .exclude(name_key="")
+            .values("company_id", "position_id", "name_key")
+            .annotate(n=Count("id"))
+            .filter(n__gt=1)
+            .order_by("-n", "company_id")[:limit]
+        )
+        self.stdout.write(self.style.MIGRATE_HEADING(f"Employees: {len(dups)} cluster(s)"))
+        for d in dups:
+            self.stdout.write(
+                f"company_id={d['company_id']} position_id={d['position_id']} "
+                f"[{d['name_key']}] x{d['n']}"
+            )
+
+    def handle(self, *args, **opts):
+        by = opts["by"]
+        limit = opts["limit"]
+
+        if by in ("inn", "all"):
+            self._report("By INN", "inn_key", limit)
+        if by in ("name", "all"):
+            self._report("By name", "name_key", limit)
+        if opts["employees"]:
+            self._report_employees(limit)
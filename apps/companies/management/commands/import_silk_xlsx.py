@@ -5,9 +5,10 @@ import openpyxl
 from django.core.management.base import BaseCommand
 from django.db import transaction
 
+from apps.companies.changes import company_change_source
 from apps.companies.models import (
     Company, Category, Region, Direction, Unit,
-    CompanyPhone, Position, EmployeeCompany, CompanyDirectionStat
+    CompanyPhone, Position, EmployeeCompany, CompanyDirectionStat, CompanyChange
 )
 
 
@@ -128,6 +129,7 @@ class Command(BaseCommand):
         parser.add_argument("--dry-run", action="store_true", default=False)
 
     @transaction.atomic
+    @company_change_source(CompanyChange.Source.IMPORT)
     def handle(self, *args, **opts):
         path = opts["path"]
         sheet_name = opts["sheet"]
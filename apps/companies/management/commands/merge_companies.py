@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from apps.companies.models import Company
+from apps.companies.services import merge_companies
+
+
+class Command(BaseCommand):
+    help = "Merge duplicate companies into the target one (requests, employees, phones, stats, M2M)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--target", type=int, required=True, help="Company id to keep")
+        parser.add_argument("--source", type=int, action="append", required=True,
+                            help="Duplicate company id (can be repeated)")
+        parser.add_argument("--dry-run", action="store_true", default=False)
+
+    @transaction.atomic
+    def handle(self, *args, **opts):
+        try:
+            target = Company.objects.get(pk=opts["target"])
+        except Company.DoesNotExist:
+            raise CommandError(f"Company id={opts['target']} not found")
+
+        sources = list(Company.objects.filter(pk__in=opts["source"]).exclude(pk=target.pk))
+        missing = set(opts["source"]) - {c.pk for c in sources} - {target.pk}
+        if missing:
+            raise CommandError(f"Companies not found: {sorted(missing)}")
+
+        res = merge_companies(target=target, sources=sources)
+        msg = (
+            f"merged={res.merged_ids} into={res.target.pk} requests={res.requests_moved} "
+            f"profiles={res.profiles_moved} employees={res.employees_moved} "
+            f"employees_merged={res.employees_merged} phones={res.phones_moved} stats={res.stats_moved}"
+        )
+
+        if opts["dry_run"]:
+            raise SystemExit(f"[DRY RUN] {msg}")
+
+        self.stdout.write(self.style.SUCCESS(f"Done. {msg}"))
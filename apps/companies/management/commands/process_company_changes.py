@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.companies.changes import COMPANY_CHANGE_CONSUMERS, consume_company_changes, prune_company_changes
+
+
+class Command(BaseCommand):
+    help = "Feed CompanyChange journal to downstream consumers (search documents, stat cube) from their watermarks."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--consumer", action="append", default=None,
+                            help=f"One of: {', '.join(COMPANY_CHANGE_CONSUMERS)} (default: all)")
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--loop", action="store_true", default=False, help="Run forever")
+        parser.add_argument("--sleep", type=float, default=30.0, help="Seconds between runs with --loop")
+        parser.add_argument("--prune", action="store_true", default=False,
+                            help="Delete journal rows already processed by all consumers")
+
+    def handle(self, *args, **opts):
+        consumers = opts["consumer"] or list(COMPANY_CHANGE_CONSUMERS)
+        unknown = set(consumers) - set(COMPANY_CHANGE_CONSUMERS)
+        if unknown:
+            raise CommandError(f"Unknown consumer(s): {', '.join(sorted(unknown))}")
+
+        while True:
+            for name in consumers:
+                processed = consume_company_changes(name, batch_size=opts["batch_size"])
+                if processed or not opts["loop"]:
+                    self.stdout.write(self.style.SUCCESS(f"{name}: processed={processed}"))
+
+            if opts["prune"]:
+                deleted = prune_company_changes()
+                if deleted or not opts["loop"]:
+                    self.stdout.write(f"pruned={deleted}")
+
+            if not opts["loop"]:
+                break
+            time.sleep(opts["sleep"])
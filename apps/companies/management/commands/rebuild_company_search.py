@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from apps.companies.models import Company
+from apps.companies.search import rebuild_search_documents
+
+
+class Command(BaseCommand):
+    help = "Rebuild CompanySearchDocument for all companies (or given ids)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--id", type=int, action="append", dest="ids", default=None)
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **opts):
+        batch_size = opts["batch_size"]
+        qs = Company.objects.order_by("pk")
+        if opts["ids"]:
+            qs = qs.filter(pk__in=opts["ids"])
+
+        total = 0
+        batch = []
+        for pk in qs.values_list("pk", flat=True).iterator(chunk_size=batch_size):
+            batch.append(pk)
+            if len(batch) >= batch_size:
+                total += rebuild_search_documents(batch)
+                batch = []
+        if batch:
+            total += rebuild_search_documents(batch)
+
+        self.stdout.write(self.style.SUCCESS(f"Done. documents={total}"))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from apps.companies.cube import rebuild_cube_all, rebuild_cube_slices
+from apps.companies.models import CompanyDirectionStat, CompanyStatCube
+
+
+class Command(BaseCommand):
+    help = "Rebuild CompanyStatCube from CompanyDirectionStat (all, or one year)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--year", type=int, default=None)
+
+    def handle(self, *args, **opts):
+        year = opts["year"]
+        if year:
+            # срезы и из показателей, и из самого куба — чтобы удалить "осиротевшие" ячейки
+            slices = set(
+                CompanyDirectionStat.objects.filter(year=year).values_list("year", "direction_id").distinct()
+            ) | set(
+                CompanyStatCube.objects.filter(year=year).values_list("year", "direction_id").distinct()
+            )
+            cells = rebuild_cube_slices(slices)
+        else:
+            cells = rebuild_cube_all()
+
+        self.stdout.write(self.style.SUCCESS(f"Done. cells={cells}"))
@@ -1,8 +1,29 @@
+from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.db import models
 from django.http import JsonResponse
 from django.utils.translation import gettext_lazy as _
 
+from .normalization import company_name_key, norm_inn_key, person_name_key
+
+if settings.DB_IS_POSTGRES:
+    from django.contrib.postgres.indexes import GinIndex
+
+
+def _with_key_fields(update_fields, mapping: dict[str, tuple[str, ...]]):
+    """
+    save(update_fields=[...]) не должен терять нормализованные ключи:
+    если обновляется исходное поле, докидываем и его ключ.
+    """
+    if update_fields is None:
+        return None
+    update_fields = set(update_fields)
+    for key_field, source_fields in mapping.items():
+        if update_fields.intersection(source_fields):
+            update_fields.add(key_field)
+    return update_fields
+
+
 class Region(models.Model):
     code = models.CharField(_("Код региона"), max_length=10, unique=True, db_index=True)
     name = models.CharField(_("Название региона"), max_length=255)
@@ -148,6 +169,14 @@ class Company(models.Model):
         help_text=_("Идентификационный номер налогоплательщика компании"),
     )
 
+    # ключи для поиска дублей (заполняются в save())
+    name_key = models.CharField(
+        _("Нормализованное название"), max_length=255, blank=True, default="", editable=False
+    )
+    inn_key = models.CharField(
+        _("Нормализованный ИНН"), max_length=20, blank=True, default="", editable=False
+    )
+
     data_source = models.CharField(
         _("Источник данных"),
         max_length=20,
@@ -178,6 +207,8 @@ class Company(models.Model):
         indexes = [
             models.Index(fields=["inn"]),
             models.Index(fields=["name"]),
+            models.Index(fields=["name_key"]),
+            models.Index(fields=["inn_key"]),
             models.Index(fields=["data_source"]),
             models.Index(fields=["verification_level"]),
         ]
@@ -185,6 +216,15 @@ class Company(models.Model):
     def __str__(self):
         return f"{self.name} ({self.inn})"
 
+    def save(self, *args, **kwargs):
+        self.name_key = company_name_key(self.name)
+        self.inn_key = norm_inn_key(self.inn)
+        kwargs["update_fields"] = _with_key_fields(
+            kwargs.get("update_fields"),
+            {"name_key": ("name",), "inn_key": ("inn",)},
+        )
+        super().save(*args, **kwargs)
+
     def clean(self):
         super().clean()
         if self.region_id and self.district_id:
@@ -260,6 +300,11 @@ class EmployeeCompany(models.Model):
     phone = models.CharField(_("Телефон номер"), max_length=15, blank=True, null=True)
     email = models.EmailField(_("Электронная почта"), blank=True, null=True)
 
+    # "ФАМИЛИЯ ИМЯ ОТЧЕСТВО" в нормализованном виде (заполняется в save())
+    name_key = models.CharField(
+        _("Нормализованное ФИО"), max_length=500, blank=True, default="", editable=False
+    )
+
     created_at = models.DateTimeField(_("Дата создания"), auto_now_add=True)
 
     class Meta:
@@ -272,11 +317,23 @@ class EmployeeCompany(models.Model):
                 name="uniq_employee_company_identity",
             )
         ]
+        indexes = [
+            models.Index(fields=["company", "position", "name_key"]),
+            models.Index(fields=["name_key"]),
+        ]
 
 
     def __str__(self):
         return f"{self.first_name} {self.last_name}"
 
+    def save(self, *args, **kwargs):
+        self.name_key = person_name_key(self.last_name, self.first_name, self.middle_name)
+        kwargs["update_fields"] = _with_key_fields(
+            kwargs.get("update_fields"),
+            {"name_key": ("last_name", "first_name", "middle_name")},
+        )
+        super().save(*args, **kwargs)
+
 
 class CompanyPhone(models.Model):
     class Kind(models.TextChoices):
@@ -304,3 +361,145 @@ class CompanyPhone(models.Model):
 
     def __str__(self):
         return f"{self.phone}"
+
+
+class CompanySearchDocument(models.Model):
+    """
+    Денормализованный поисковый текст компании: название, ИНН, телефоны, ФИО сотрудников.
+    Пересобирается сигналами (см. apps/companies/search.py), руками не редактируется.
+    """
+    company = models.OneToOneField(
+        Company,
+        verbose_name=_("Компания"),
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="search_document",
+    )
+    document = models.TextField(_("Поисковый текст"), blank=True, default="")
+    updated_at = models.DateTimeField(_("Обновлено"), auto_now=True)
+
+    class Meta:
+        verbose_name = _("Поисковый документ компании")
+        verbose_name_plural = _("Поисковые документы компаний")
+        # триграммный GIN ускоряет LIKE '%...%' и similarity(); нужен pg_trgm
+        indexes = [
+            GinIndex(fields=["document"], name="company_search_doc_trgm", opclasses=["gin_trgm_ops"]),
+        ] if settings.DB_IS_POSTGRES else []
+
+    def __str__(self):
+        return f"{self.company_id}"
+
+
+class CompanyStatCube(models.Model):
+    """
+    Предагрегированный куб по CompanyDirectionStat:
+    (год, регион, район, категория направления, направление, ед. изм.) -> суммы и количества.
+    Пересчитывается срезами (год, направление), см. apps/companies/cube.py.
+    """
+    year = models.PositiveSmallIntegerField(_("Год"))
+    region = models.ForeignKey(
+        Region, verbose_name=_("Регион"), on_delete=models.CASCADE, null=True, blank=True, related_name="+"
+    )
+    district = models.ForeignKey(
+        District, verbose_name=_("Район/город"), on_delete=models.CASCADE, null=True, blank=True, related_name="+"
+    )
+    category = models.ForeignKey(
+        Category, verbose_name=_("Категория"), on_delete=models.CASCADE, null=True, blank=True, related_name="+"
+    )
+    direction = models.ForeignKey(
+        Direction, verbose_name=_("Направление"), on_delete=models.CASCADE, related_name="+"
+    )
+    unit = models.ForeignKey(
+        Unit, verbose_name=_("Единица измерения"), on_delete=models.CASCADE, null=True, blank=True, related_name="+"
+    )
+
+    quantity = models.DecimalField(_("Количество"), max_digits=24, decimal_places=6, null=True, blank=True)
+    volume_bln_sum = models.DecimalField(_("Объём (млрд сум)"), max_digits=24, decimal_places=6, null=True, blank=True)
+    jobs = models.BigIntegerField(_("Количество рабочих мест"), null=True, blank=True)
+    companies_count = models.PositiveIntegerField(_("Количество компаний"), default=0)
+    rows_count = models.PositiveIntegerField(_("Количество записей"), default=0)
+
+    updated_at = models.DateTimeField(_("Обновлено"), auto_now=True)
+
+    class Meta:
+        verbose_name = _("Куб показателей компаний")
+        verbose_name_plural = _("Куб показателей компаний")
+        indexes = [
+            models.Index(fields=["year", "direction"]),
+            models.Index(fields=["year", "region"]),
+            models.Index(fields=["year", "category"]),
+        ]
+
+    def __str__(self):
+        return f"{self.year} / {self.direction_id}"
+
+
+class ReferenceDataVersion(models.Model):
+    """
+    Одна строка (pk=1): версия справочников (регионы, районы, категории, направления,
+    единицы, проблемные направления). Увеличивается сигналами, по ней процессы
+    сбрасывают свой кэш (apps/companies/reference_cache.py) и считают ETag.
+    """
+    version = models.PositiveBigIntegerField(_("Версия"), default=1)
+    updated_at = models.DateTimeField(_("Обновлено"), auto_now=True)
+
+    class Meta:
+        verbose_name = _("Версия справочников")
+        verbose_name_plural = _("Версия справочников")
+
+    def __str__(self):
+        return f"v{self.version}"
+
+
+class CompanyChange(models.Model):
+    """
+    Журнал изменений компаний (append-only). Пишется сигналами в той же транзакции,
+    что и само изменение; потребители (поиск, куб ...) читают его по возрастанию id
+    от своего watermark-а (CompanyChangeWatermark). См. apps/companies/changes.py.
+    """
+    class Kind(models.TextChoices):
+        CREATED = "created", _("Создана")
+        UPDATED = "updated", _("Изменена")
+        RELATED = "related", _("Изменены связанные данные")
+        MERGED = "merged", _("Объединена с дублями")
+        DELETED = "deleted", _("Удалена")
+
+    class Source(models.TextChoices):
+        SYSTEM = "system", _("Система")
+        ADMIN = "admin", _("Админ панель")
+        IMPORT = "import", _("Импорт")
+        PUBLIC_WEB = "public_web", _("Публичная форма")
+        TELEGRAM = "telegram", _("Telegram bot")
+        MERGE = "merge", _("Объединение дублей")
+
+    id = models.BigAutoField(primary_key=True)
+    # без FK: запись должна пережить удаление компании
+    company_id = models.BigIntegerField(_("ID компании"), db_index=True)
+    kind = models.CharField(_("Тип"), max_length=16, choices=Kind.choices)
+    source = models.CharField(_("Источник"), max_length=16, choices=Source.choices, default=Source.SYSTEM)
+    # срез куба (год, направление), затронутый изменением показателя: старый срез
+    # удалённого/перенесённого показателя по текущим данным компании уже не найти
+    stat_year = models.PositiveSmallIntegerField(_("Год показателя"), null=True, blank=True)
+    stat_direction_id = models.BigIntegerField(_("ID направления показателя"), null=True, blank=True)
+    created_at = models.DateTimeField(_("Дата"), auto_now_add=True)
+
+    class Meta:
+        verbose_name = _("Изменение компании")
+        verbose_name_plural = _("Журнал изменений компаний")
+        ordering = ("id",)
+
+    def __str__(self):
+        return f"#{self.pk} {self.company_id} {self.kind}"
+
+
+class CompanyChangeWatermark(models.Model):
+    consumer = models.CharField(_("Потребитель"), max_length=64, unique=True)
+    last_change_id = models.BigIntegerField(_("Последний обработанный id"), default=0)
+    updated_at = models.DateTimeField(_("Обновлено"), auto_now=True)
+
+    class Meta:
+        verbose_name = _("Watermark журнала компаний")
+        verbose_name_plural = _("Watermark-и журнала компаний")
+
+    def __str__(self):
+        return f"{self.consumer}: {self.last_change_id}"
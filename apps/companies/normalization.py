@@ -0,0 +1,43 @@
+import re
+
+# Организационно-правовые формы, которые пишут как попало ("MCHJ", "МЧЖ", "ООО" ...).
+# Для ключа поиска дублей они только мешают.
+LEGAL_FORM_TOKENS = frozenset({
+    "MCHJ", "МЧЖ", "OOO", "ООО", "AJ", "АЖ", "XK", "ХК", "QK", "ҚК",
+    "YATT", "ЯТТ", "XT", "ХТ", "OAJ", "ОАЖ", "AO", "АО", "ЧП", "ИП", "DUK", "ДУК",
+})
+
+
+# апострофы латиницы: O'zbekiston, Oʻzbekiston, O‘zbekiston, Ozbekiston -> OZBEKISTON
+_APOSTROPHES_RE = re.compile(r"[ʻʼ'‘’`]")
+
+
+def norm_name_key(s: str | None) -> str:
+    s = (s or "").strip().upper()
+    s = re.sub(r"\s+", " ", s)
+    # маленькая нормализация кириллицы
+    s = s.replace("Ё", "Е").replace("Й", "И")
+    s = _APOSTROPHES_RE.sub("", s)
+    # выкинем точки/запятые и прочий шум; узбекские Қ Ў Ғ Ҳ — буквы, не шум
+    s = re.sub(r"[^A-ZА-ЯҚЎҒҲ0-9 ]+", "", s)
+    return s
+
+
+def person_name_key(last_name: str | None, first_name: str | None, middle_name: str | None) -> str:
+    return " ".join(filter(None, [
+        norm_name_key(last_name),
+        norm_name_key(first_name),
+        norm_name_key(middle_name),
+    ])).strip()
+
+
+def company_name_key(name: str | None) -> str:
+    """
+    '"Bustan Silk" MCHJ' и 'BUSTAN SILK М.Ч.Ж.' -> 'BUSTAN SILK'
+    """
+    words = [w for w in norm_name_key(name).split() if w not in LEGAL_FORM_TOKENS]
+    return " ".join(words)
+
+
+def norm_inn_key(inn: str | None) -> str:
+    return re.sub(r"\D+", "", str(inn or ""))
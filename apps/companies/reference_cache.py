@@ -0,0 +1,254 @@
+# apps/companies/reference_cache.py
+#
+# Справочники меняются раз в месяц, а читаются на каждом рендере формы / AJAX-запросе.
+#
+# Каждый процесс держит словарь {ключ: список объектов}, проштампованный версией
+# из ReferenceDataVersion. Версию сверяем с БД не чаще REFERENCE_CACHE_CHECK_SECONDS;
+# сигналы (apps/companies/signals.py) увеличивают её после commit.
+#
+# Названия переводимые (modeltranslation), сортировка по ним зависит от языка —
+# поэтому язык входит в ключ.
+from __future__ import annotations
+
+import logging
+import threading
+import time
+
+from django import forms
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import connections
+from django.db.models import F
+from django.forms.models import ModelChoiceIterator
+from django.utils import timezone
+from django.utils.translation import get_language
+
+from .batching import OnCommitBatch
+from .models import Category, Direction, District, ReferenceDataVersion, Region
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_state = {
+    "version": None,
+    "checked_at": 0.0,
+    "loaded_at": 0.0,
+    "data": {},
+}
+
+
+def _read_db_version() -> int:
+    v = ReferenceDataVersion.objects.filter(pk=1).values_list("version", flat=True).first()
+    return int(v or 0)
+
+
+def current_version() -> int:
+    now = time.monotonic()
+    with _lock:
+        if (
+            _state["version"] is not None
+            and now - _state["checked_at"] < settings.REFERENCE_CACHE_CHECK_SECONDS
+        ):
+            return _state["version"]
+
+    version = _read_db_version()
+
+    with _lock:
+        expired = now - _state["loaded_at"] > settings.REFERENCE_CACHE_MAX_AGE_SECONDS
+        if version != _state["version"] or expired:
+            _state["data"] = {}
+            _state["loaded_at"] = now
+        _state["version"] = version
+        _state["checked_at"] = now
+    return version
+
+
+def invalidate_local() -> None:
+    with _lock:
+        _state["version"] = None
+        _state["checked_at"] = 0.0
+        _state["data"] = {}
+
+
+def _bump(_keys) -> None:
+    updated = ReferenceDataVersion.objects.filter(pk=1).update(
+        version=F("version") + 1, updated_at=timezone.now()
+    )
+    if not updated:
+        ReferenceDataVersion.objects.get_or_create(pk=1, defaults={"version": 2})
+    invalidate_local()
+
+
+# импорт районов из xlsx = сотни save() в одной транзакции -> один bump после commit
+_bump_batch = OnCommitBatch(_bump)
+
+
+def bump_reference_version() -> None:
+    _bump_batch.add(["reference"])
+
+
+def _cached(key: tuple, loader):
+    current_version()
+    with _lock:
+        if key in _state["data"]:
+            return _state["data"][key]
+
+    value = list(loader())
+
+    with _lock:
+        _state["data"][key] = value
+    return value
+
+
+def _lang() -> str:
+    return (get_language() or settings.LANGUAGE_CODE).split("-")[0].lower()
+
+
+def etag_for_reference(request, *args, **kwargs) -> str:
+    """
+    Для @etag: ответ зависит только от версии справочников, языка и query string
+    (query string уже часть URL, который браузер кэширует).
+    """
+    return f"ref-{current_version()}-{_lang()}"
+
+
+# ---------------- справочники ----------------
+
+def get_regions() -> list[Region]:
+    return _cached(("regions", _lang()), lambda: Region.objects.order_by("name"))
+
+
+def get_districts(region_id: int | None) -> list[District]:
+    def load():
+        qs = District.objects.order_by("code", "id")
+        if region_id:
+            qs = qs.filter(region_id=region_id)
+        return qs
+
+    return _cached(("districts", int(region_id or 0)), load)
+
+
+def get_categories() -> list[Category]:
+    return _cached(("categories", _lang()), lambda: Category.objects.order_by("name"))
+
+
+def get_directions(category_id: int | None = None, *, only_categorized: bool = False) -> list[Direction]:
+    def load():
+        qs = Direction.objects.order_by("title")
+        if only_categorized:
+            qs = qs.filter(category__isnull=False)
+        if category_id:
+            qs = qs.filter(category_id=category_id)
+        return qs
+
+    return _cached(("directions", _lang(), int(category_id or 0), only_categorized), load)
+
+
+def get_problem_directions(*, only_active: bool = True):
+    ProblemDirection = apps.get_model("agency", "ProblemDirection")
+
+    def load():
+        qs = ProblemDirection.objects.select_related("department").order_by("sort_order", "name")
+        if only_active:
+            qs = qs.filter(is_active=True)
+        return qs
+
+    return _cached(("problem_directions", _lang(), only_active), load)
+
+
+def warm_up() -> None:
+    """
+    Вызывается при старте воркера (config/wsgi.py, config/asgi.py):
+    первый пользователь не должен платить за загрузку справочников.
+    """
+    from django.utils import translation
+
+    for lang, _name in settings.LANGUAGES:
+        with translation.override(lang):
+            get_regions()
+            get_categories()
+            get_directions()
+            get_directions(only_categorized=True)
+            get_problem_directions()
+
+
+def safe_warm_up() -> None:
+    """
+    Прогрев при импорте wsgi/asgi. При gunicorn --preload это мастер-процесс:
+    прогретый словарь воркеры получают через fork, а соединение с БД — нет,
+    поэтому после прогрева соединения закрываются (иначе один сокет на всех).
+    """
+    try:
+        warm_up()
+    except Exception:
+        # БД может быть ещё недоступна (migrate, первый деплой) — не валим воркер
+        logger.warning("Reference cache warm-up failed", exc_info=True)
+    finally:
+        connections.close_all()
+
+
+# ---------------- поля форм ----------------
+
+class CachedModelChoiceIterator(ModelChoiceIterator):
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ("", self.field.empty_label)
+        for obj in self.field.cached_objects():
+            yield self.choice(obj)
+
+    def __len__(self):
+        return len(self.field.cached_objects()) + (self.field.empty_label is not None)
+
+    def __bool__(self):
+        return self.field.empty_label is not None or bool(self.field.cached_objects())
+
+
+class CachedModelChoiceMixin:
+    """
+    choices и валидация берутся из кэша справочников, а не из queryset:
+    ни рендер, ни is_valid() не ходят в БД.
+    """
+    iterator = CachedModelChoiceIterator
+
+    def __init__(self, *args, loader=None, **kwargs):
+        self.loader = loader
+        super().__init__(*args, **kwargs)
+
+    def cached_objects(self):
+        return self.loader() if self.loader else []
+
+    def _cached_by_pk(self) -> dict:
+        return {str(o.pk): o for o in self.cached_objects()}
+
+
+class CachedModelChoiceField(CachedModelChoiceMixin, forms.ModelChoiceField):
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        if isinstance(value, self.queryset.model):
+            value = value.pk
+        obj = self._cached_by_pk().get(str(value))
+        if obj is None:
+            raise ValidationError(
+                self.error_messages["invalid_choice"],
+                code="invalid_choice",
+                params={"value": value},
+            )
+        return obj
+
+
+class CachedModelMultipleChoiceField(CachedModelChoiceMixin, forms.ModelMultipleChoiceField):
+    def _check_values(self, value):
+        by_pk = self._cached_by_pk()
+        result = []
+        for pk in value:
+            obj = by_pk.get(str(pk))
+            if obj is None:
+                raise ValidationError(
+                    self.error_messages["invalid_choice"],
+                    code="invalid_choice",
+                    params={"value": pk},
+                )
+            result.append(obj)
+        return result
@@ -17,6 +17,7 @@ from .models import (
     Position,
     CompanyDirectionStat,
 )
+from .normalization import person_name_key
 
 DEFAULT_DIRECTOR_POSITION = "Директор"
 DEFAULT_YEAR = 2026
@@ -87,28 +88,12 @@ def _get_unit(unit_raw: str) -> Unit | None:
         or Unit.objects.filter(name__iexact=s).first()
     )
 
-def _norm_name_key(s: str) -> str:
-    s = (s or "").strip().upper()
-    s = re.sub(r"\s+", " ", s)
-    # маленькая нормализация кириллицы
-    s = s.replace("Ё", "Е").replace("Й", "И")
-    # выкинем точки/запятые и прочий шум
-    s = re.sub(r"[^A-ZА-Я0-9 ]+", "", s)
-    return s
-
-def _director_key(last_name: str, first_name: str, middle_name: str | None) -> str:
-    return " ".join(filter(None, [
-        _norm_name_key(last_name),
-        _norm_name_key(first_name),
-        _norm_name_key(middle_name or ""),
-    ])).strip()
-
 def _find_or_create_director(company: Company, position: Position,
                              last_name: str, first_name: str, middle_name: str | None) -> EmployeeCompany:
     # кандидаты в пределах компании+позиции
     qs = EmployeeCompany.objects.filter(company=company, position=position)
 
-    incoming_key = _director_key(last_name, first_name, middle_name)
+    incoming_key = person_name_key(last_name, first_name, middle_name)
 
     # 1) ищем точное совпадение по текущим полям (быстро)
     emp = qs.filter(
@@ -119,21 +104,20 @@ def _find_or_create_director(company: Company, position: Position,
     if emp:
         return emp
 
-    # 2) ищем "похожего" по нормализованному ключу
-    for candidate in qs.only("id", "last_name", "first_name", "middle_name"):
-        cand_key = _director_key(candidate.last_name or "", candidate.first_name or "", candidate.middle_name)
-        if cand_key and incoming_key and cand_key == incoming_key:
-            # обновим более полными данными, если у кандидата пусто
-            changed = False
-            if last_name and not candidate.last_name:
-                candidate.last_name = last_name; changed = True
-            if first_name and not candidate.first_name:
-                candidate.first_name = first_name; changed = True
-            if middle_name and not candidate.middle_name:
-                candidate.middle_name = middle_name; changed = True
-            if changed:
-                candidate.save(update_fields=["last_name", "first_name", "middle_name"])
-            return candidate
+    # 2) ищем "похожего" по нормализованному ключу (индекс company+position+name_key)
+    candidate = qs.filter(name_key=incoming_key).first() if incoming_key else None
+    if candidate:
+        # обновим более полными данными, если у кандидата пусто
+        changed = False
+        if last_name and not candidate.last_name:
+            candidate.last_name = last_name; changed = True
+        if first_name and not candidate.first_name:
+            candidate.first_name = first_name; changed = True
+        if middle_name and not candidate.middle_name:
+            candidate.middle_name = middle_name; changed = True
+        if changed:
+            candidate.save(update_fields=["last_name", "first_name", "middle_name"])
+        return candidate
 
     # 3) не нашли - создаём
     emp, _ = EmployeeCompany.objects.get_or_create(
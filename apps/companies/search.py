@@ -0,0 +1,136 @@
+# apps/companies/search.py
+from __future__ import annotations
+
+import re
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db.models import Case, FloatField, IntegerField, Value, When
+from django.utils.functional import cached_property
+
+from .batching import OnCommitBatch
+from .models import Company, CompanySearchDocument
+from .normalization import norm_inn_key, norm_name_key, person_name_key
+
+PHONE_QUERY_RE = re.compile(r"^[\d\s()+-]+$")
+
+
+# ---------------- документ ----------------
+
+def build_search_document(company: Company) -> str:
+    """
+    Всё в одном регистре/алфавите, что и поисковый запрос (см. search_query_key).
+    Ожидает prefetch phones и employee_company.
+    """
+    parts = [norm_name_key(company.name), norm_inn_key(company.inn)]
+    for p in company.phones.all():
+        parts.append(norm_inn_key(p.phone))
+    for e in company.employee_company.all():
+        parts.append(person_name_key(e.last_name, e.first_name, e.middle_name))
+    # description переводимое (modeltranslation) — берём сырые колонки, без fallback-строки
+    for lang, _name in settings.LANGUAGES:
+        parts.append(norm_name_key(getattr(company, f"description_{lang}", None)))
+    return " | ".join(x for x in parts if x)
+
+
+def rebuild_search_documents(company_ids) -> int:
+    company_ids = list({int(x) for x in company_ids if x})
+    if not company_ids:
+        return 0
+
+    companies = (
+        Company.objects
+        .filter(pk__in=company_ids)
+        .only("id", "name", "inn", *[f"description_{lang}" for lang, _name in settings.LANGUAGES])
+        .prefetch_related("phones", "employee_company")
+    )
+    docs = [
+        CompanySearchDocument(company_id=c.pk, document=build_search_document(c))
+        for c in companies
+    ]
+    CompanySearchDocument.objects.bulk_create(
+        docs,
+        update_conflicts=True,
+        unique_fields=["company"],
+        update_fields=["document", "updated_at"],
+    )
+    return len(docs)
+
+
+_search_batch = OnCommitBatch(rebuild_search_documents)
+
+
+def schedule_search_rebuild(company_ids) -> None:
+    _search_batch.add(company_ids)
+
+
+# ---------------- поиск ----------------
+
+def search_query_key(q: str) -> str:
+    q = (q or "").strip()
+    if PHONE_QUERY_RE.match(q):
+        return norm_inn_key(q)
+    return norm_name_key(q)
+
+
+def search_companies(qs, q: str):
+    """
+    Фильтр по поисковому документу + ранжирование.
+    На Postgres LIKE и similarity() обслуживаются триграммным GIN индексом.
+    """
+    key = search_query_key(q)
+    if not key:
+        # запрос из одного шума ("!!!") — ничего не нашлось, а не весь список
+        return qs.none() if (q or "").strip() else qs
+
+    qs = qs.filter(search_document__document__contains=key)
+
+    exact = Case(
+        When(inn_key=key, then=Value(3)),
+        When(name_key=key, then=Value(2)),
+        When(name_key__startswith=key, then=Value(1)),
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+    if settings.DB_IS_POSTGRES:
+        from django.contrib.postgres.search import TrigramWordSimilarity
+
+        similarity = TrigramWordSimilarity(Value(key), "search_document__document")
+    else:
+        similarity = Value(0.0, output_field=FloatField())
+
+    return qs.annotate(search_exact=exact, search_rank=similarity).order_by(
+        "-search_exact", "-search_rank", "name"
+    )
+
+
+class CappedCountPaginator(Paginator):
+    """
+    Считает не дальше count_cap строк после начала запрошенной страницы:
+    SELECT COUNT(*) FROM (... LIMIT offset+cap+1). Если строк больше — count == offset+cap,
+    is_count_capped == True, в шаблоне показываем "N+"; num_pages растёт вместе
+    с номером страницы, так что листать можно до конца списка.
+    """
+
+    def __init__(self, *args, count_cap: int | None = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.count_cap = count_cap or settings.COMPANY_SEARCH_COUNT_CAP
+        self.is_count_capped = False
+        self._requested_page = 1
+
+    def validate_number(self, number):
+        # count считается от запрошенной страницы, поэтому номер запоминаем до super()
+        try:
+            self._requested_page = max(int(number), 1)
+        except (TypeError, ValueError):
+            pass
+        return super().validate_number(number)
+
+    @cached_property
+    def count(self):
+        limit = (self._requested_page - 1) * self.per_page + self.count_cap
+        total = self.object_list.order_by().values("pk")[: limit + 1].count()
+        if total > limit:
+            self.is_count_capped = True
+            return limit
+        return total
@@ -0,0 +1,193 @@
+# apps/companies/services.py
+from __future__ import annotations
+
+import logging
+
+from dataclasses import dataclass, field
+
+from django.apps import apps
+from django.db import transaction
+from django.db.models import Case, IntegerField, Value, When
+
+from .models import (
+    Category,
+    Company,
+    CompanyChange,
+    CompanyDirectionStat,
+    CompanyPhone,
+    Direction,
+    EmployeeCompany,
+)
+from .changes import company_change_source, record_company_change
+from .cube import schedule_cube_for_companies
+from .search import schedule_search_rebuild
+
+logger = logging.getLogger(__name__)
+
+# Поля паспорта, которые берём из дубля, если у целевой компании они пустые
+MERGE_FILL_FIELDS = ("region_id", "district_id", "category_id", "description")
+
+
+@dataclass(frozen=True)
+class MergeCompaniesResult:
+    target: Company
+    merged_ids: list[int] = field(default_factory=list)
+    requests_moved: int = 0
+    profiles_moved: int = 0
+    employees_moved: int = 0
+    employees_merged: int = 0
+    phones_moved: int = 0
+    stats_moved: int = 0
+
+
+def _remap_fk(qs, field_name: str, mapping: dict[int, int]) -> int:
+    """
+    Одним UPDATE переставляет FK по словарю {старый_id: новый_id}.
+    """
+    if not mapping:
+        return 0
+    return qs.filter(**{f"{field_name}__in": list(mapping)}).update(**{
+        field_name: Case(
+            *[When(**{field_name: old}, then=Value(new)) for old, new in mapping.items()],
+            output_field=IntegerField(),
+        )
+    })
+
+
+def _first_wins(rows, key) -> list[int]:
+    """
+    rows: [(id, key...)] в порядке приоритета. Возвращает id строк,
+    ключ которых уже встречался (их надо удалить перед переносом).
+    """
+    seen = set()
+    losers = []
+    for row in rows:
+        k = key(row)
+        if k in seen:
+            losers.append(row[0])
+        else:
+            seen.add(k)
+    return losers
+
+
+@transaction.atomic
+@company_change_source(CompanyChange.Source.MERGE)
+def merge_companies(*, target: Company, sources) -> MergeCompaniesResult:
+    """
+    Сливает компании-дубли в target.
+
+    Все связанные данные переносятся set-based UPDATE-ами внутри одной транзакции:
+    обращения, telegram-профили, сотрудники (одинаковые по должности+ФИО
+    схлопываются), телефоны и статистика (при конфликте остаётся запись target),
+    M2M категорий/направлений. После этого дубли удаляются.
+    """
+    Request = apps.get_model("requests", "Request")
+    TelegramProfile = apps.get_model("tg_bot", "TelegramProfile")
+
+    source_ids = sorted({c.pk for c in sources if c.pk and c.pk != target.pk})
+    if not source_ids:
+        return MergeCompaniesResult(target=target)
+
+    # блокируем все участвующие строки в одном порядке, чтобы не ловить дедлоки
+    locked = list(
+        Company.objects.select_for_update()
+        .filter(pk__in=[target.pk, *source_ids])
+        .order_by("pk")
+    )
+    by_id = {c.pk: c for c in locked}
+    target = by_id[target.pk]
+    source_ids = [pk for pk in source_ids if pk in by_id]
+    if not source_ids:
+        return MergeCompaniesResult(target=target)
+
+    # 1) сотрудники: (должность, нормализованное ФИО) -> кто остаётся
+    keep: dict[tuple, int] = {}
+    emp_remap: dict[int, int] = {}
+    for emp_id, company_id, position_id, name_key in (
+        EmployeeCompany.objects
+        .filter(company_id__in=[target.pk, *source_ids])
+        .exclude(name_key="")
+        .annotate(is_target=Case(When(company_id=target.pk, then=Value(0)), default=Value(1)))
+        .order_by("is_target", "company_id", "id")
+        .values_list("id", "company_id", "position_id", "name_key")
+    ):
+        key = (position_id, name_key)
+        if key in keep:
+            emp_remap[emp_id] = keep[key]
+        else:
+            keep[key] = emp_id
+
+    _remap_fk(Request.objects.all(), "employee_id", emp_remap)
+    _remap_fk(TelegramProfile.objects.all(), "employee_company_id", emp_remap)
+    EmployeeCompany.objects.filter(pk__in=list(emp_remap)).delete()
+    employees_moved = EmployeeCompany.objects.filter(company_id__in=source_ids).update(company_id=target.pk)
+
+    # 2) обращения и профили
+    requests_moved = Request.objects.filter(company_id__in=source_ids).update(company_id=target.pk)
+    profiles_moved = TelegramProfile.objects.filter(company_id__in=source_ids).update(company_id=target.pk)
+
+    # 3) телефоны: unique(company, phone), у target приоритет
+    phone_rows = list(
+        CompanyPhone.objects
+        .filter(company_id__in=[target.pk, *source_ids])
+        .annotate(is_target=Case(When(company_id=target.pk, then=Value(0)), default=Value(1)))
+        .order_by("is_target", "company_id", "id")
+        .values_list("id", "phone")
+    )
+    CompanyPhone.objects.filter(pk__in=_first_wins(phone_rows, key=lambda r: r[1])).delete()
+    phones_qs = CompanyPhone.objects.filter(company_id__in=source_ids)
+    if CompanyPhone.objects.filter(company_id=target.pk, is_primary=True).exists():
+        phones_moved = phones_qs.update(company_id=target.pk, is_primary=False)
+    else:
+        phones_moved = phones_qs.update(company_id=target.pk)
+
+    # 4) статистика: unique(company, direction, year), у target приоритет
+    stat_rows = list(
+        CompanyDirectionStat.objects
+        .filter(company_id__in=[target.pk, *source_ids])
+        .annotate(is_target=Case(When(company_id=target.pk, then=Value(0)), default=Value(1)))
+        .order_by("is_target", "company_id", "id")
+        .values_list("id", "direction_id", "year")
+    )
+    CompanyDirectionStat.objects.filter(pk__in=_first_wins(stat_rows, key=lambda r: (r[1], r[2]))).delete()
+    stats_moved = CompanyDirectionStat.objects.filter(company_id__in=source_ids).update(company_id=target.pk)
+
+    # 5) M2M
+    target.categories.add(*Category.objects.filter(companies_m2m__in=source_ids).distinct())
+    target.directions.add(*Direction.objects.filter(companies__in=source_ids).distinct())
+
+    # 6) пустые поля паспорта добираем из дублей
+    update_fields = []
+    for fname in MERGE_FILL_FIELDS:
+        if getattr(target, fname):
+            continue
+        for pk in source_ids:
+            value = getattr(by_id[pk], fname)
+            if value:
+                setattr(target, fname, value)
+                update_fields.append(fname.removesuffix("_id"))
+                break
+    if update_fields:
+        target.save(update_fields=update_fields)
+
+    Company.objects.filter(pk__in=source_ids).delete()
+    # UPDATE-ы выше сигналов не шлют
+    record_company_change(target.pk, CompanyChange.Kind.MERGED)
+    schedule_search_rebuild([target.pk])
+    schedule_cube_for_companies([target.pk])
+
+    logger.info(
+        "Companies %s merged into %s: requests=%s employees=%s(+%s merged) phones=%s stats=%s",
+        source_ids, target.pk, requests_moved, employees_moved, len(emp_remap), phones_moved, stats_moved,
+    )
+
+    return MergeCompaniesResult(
+        target=target,
+        merged_ids=source_ids,
+        requests_moved=requests_moved,
+        profiles_moved=profiles_moved,
+        employees_moved=employees_moved,
+        employees_merged=len(emp_remap),
+        phones_moved=phones_moved,
+        stats_moved=stats_moved,
+    )
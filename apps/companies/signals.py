@@ -0,0 +1,163 @@
+from django.db import connections
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save, pre_migrate
+from django.dispatch import receiver
+
+from apps.agency.models import ProblemDirection
+from apps.companies.changes import record_company_change, record_company_changes
+from apps.companies.cube import schedule_cube_for_companies, schedule_cube_slices
+from apps.companies.models import (
+    Category,
+    Company,
+    CompanyChange,
+    CompanyDirectionStat,
+    CompanyPhone,
+    Direction,
+    District,
+    EmployeeCompany,
+    Region,
+)
+from apps.companies.reference_cache import bump_reference_version
+from apps.companies.search import schedule_search_rebuild
+
+CUBE_COMPANY_FIELDS = ("region_id", "district_id")
+
+
+@receiver(pre_migrate)
+def ensure_pg_trgm_extension(sender, using, **kwargs):
+    # миграции у нас не хранятся в репозитории, поэтому расширение включаем здесь
+    if sender.name != "apps.companies":
+        return
+    connection = connections[using]
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+
+@receiver(post_save, sender=Company)
+def company_search_on_save(sender, instance: Company, raw=False, **kwargs):
+    if not raw:
+        schedule_search_rebuild([instance.pk])
+
+
+@receiver(post_save, sender=CompanyPhone)
+@receiver(post_delete, sender=CompanyPhone)
+@receiver(post_save, sender=EmployeeCompany)
+@receiver(post_delete, sender=EmployeeCompany)
+def company_search_on_related_change(sender, instance, raw=False, **kwargs):
+    if not raw:
+        schedule_search_rebuild([instance.company_id])
+
+
+# ---------------- куб показателей ----------------
+# Исходные значения читаем из __dict__, чтобы не дёргать БД на .only()/defer()
+
+@receiver(post_init, sender=CompanyDirectionStat)
+def stat_remember_slice(sender, instance: CompanyDirectionStat, **kwargs):
+    instance._cube_slice = (instance.__dict__.get("year"), instance.__dict__.get("direction_id"))
+
+
+def _stat_slices(instance: CompanyDirectionStat) -> set:
+    # прежний срез (до save) и текущий; _cube_slice обновляется последним receiver-ом модуля
+    new_slice = (instance.year, instance.direction_id)
+    return {getattr(instance, "_cube_slice", new_slice), new_slice}
+
+
+@receiver(post_save, sender=CompanyDirectionStat)
+def stat_cube_on_save(sender, instance: CompanyDirectionStat, raw=False, **kwargs):
+    if not raw:
+        schedule_cube_slices(_stat_slices(instance))
+
+
+@receiver(post_delete, sender=CompanyDirectionStat)
+def stat_cube_on_delete(sender, instance: CompanyDirectionStat, **kwargs):
+    schedule_cube_slices([(instance.year, instance.direction_id)])
+
+
+@receiver(post_init, sender=Company)
+def company_remember_cube_dims(sender, instance: Company, **kwargs):
+    instance._cube_dims = tuple(instance.__dict__.get(f, ...) for f in CUBE_COMPANY_FIELDS)
+
+
+@receiver(post_save, sender=Company)
+def company_cube_on_save(sender, instance: Company, created=False, raw=False, update_fields=None, **kwargs):
+    # у новой компании показателей ещё нет
+    if raw or created:
+        return
+    if update_fields is not None and not {"region", "district"} & set(update_fields):
+        return
+    dims = tuple(getattr(instance, f) for f in CUBE_COMPANY_FIELDS)
+    if dims != getattr(instance, "_cube_dims", None):
+        schedule_cube_for_companies([instance.pk])
+    instance._cube_dims = dims
+
+
+# ---------------- версия справочников ----------------
+
+REFERENCE_MODELS = (Region, District, Category, Direction, ProblemDirection)
+
+
+def reference_changed(sender, raw=False, **kwargs):
+    if not raw:
+        bump_reference_version()
+
+
+for _model in REFERENCE_MODELS:
+    post_save.connect(reference_changed, sender=_model, dispatch_uid=f"refdata_save_{_model._meta.label}")
+    post_delete.connect(reference_changed, sender=_model, dispatch_uid=f"refdata_delete_{_model._meta.label}")
+
+
+# ---------------- журнал изменений компаний ----------------
+
+@receiver(post_save, sender=Company)
+def company_journal_on_save(sender, instance: Company, created=False, raw=False, **kwargs):
+    if not raw:
+        kind = CompanyChange.Kind.CREATED if created else CompanyChange.Kind.UPDATED
+        record_company_change(instance.pk, kind)
+
+
+@receiver(post_delete, sender=Company)
+def company_journal_on_delete(sender, instance: Company, **kwargs):
+    record_company_change(instance.pk, CompanyChange.Kind.DELETED)
+
+
+@receiver(post_save, sender=CompanyPhone)
+@receiver(post_delete, sender=CompanyPhone)
+@receiver(post_save, sender=EmployeeCompany)
+@receiver(post_delete, sender=EmployeeCompany)
+def company_journal_on_related_change(sender, instance, raw=False, **kwargs):
+    if not raw:
+        record_company_change(instance.company_id, CompanyChange.Kind.RELATED)
+
+
+@receiver(post_save, sender=CompanyDirectionStat)
+def company_journal_on_stat_save(sender, instance: CompanyDirectionStat, raw=False, **kwargs):
+    if not raw:
+        record_company_change(instance.company_id, CompanyChange.Kind.RELATED, stat_slices=_stat_slices(instance))
+
+
+@receiver(post_delete, sender=CompanyDirectionStat)
+def company_journal_on_stat_delete(sender, instance: CompanyDirectionStat, **kwargs):
+    # и при удалении компании: показатели удаляются каскадом, каждый со своим срезом
+    record_company_change(
+        instance.company_id,
+        CompanyChange.Kind.RELATED,
+        stat_slices={(instance.year, instance.direction_id)},
+    )
+
+
+@receiver(m2m_changed, sender=Company.categories.through)
+@receiver(m2m_changed, sender=Company.directions.through)
+def company_journal_on_m2m_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        record_company_change(instance.pk, CompanyChange.Kind.RELATED)
+    elif pk_set:
+        # category.companies_m2m.add(...) — меняются компании из pk_set
+        record_company_changes(pk_set, CompanyChange.Kind.RELATED)
+
+
+# последним: все receiver-ы выше видели срез показателя до save
+@receiver(post_save, sender=CompanyDirectionStat)
+def stat_forget_slice(sender, instance: CompanyDirectionStat, **kwargs):
+    instance._cube_slice = (instance.year, instance.direction_id)
@@ -1,3 +1,62 @@
-from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
 
-# Create your tests here.
+from apps.companies.normalization import company_name_key, norm_name_key
+from apps.companies.search import CappedCountPaginator, search_query_key
+
+
+class NameKeyTests(SimpleTestCase):
+    def test_uzbek_cyrillic_letters_are_kept(self):
+        self.assertEqual(norm_name_key("Қўқон"), "ҚЎҚОН")
+        self.assertEqual(norm_name_key("ғалла ҳосил"), "ҒАЛЛА ҲОСИЛ")
+        self.assertEqual(search_query_key("Ққ Ўў Ғғ Ҳҳ"), "ҚҚ ЎЎ ҒҒ ҲҲ")
+
+    def test_latin_apostrophes_give_one_key(self):
+        keys = {norm_name_key(s) for s in ("O'zbekiston", "Oʻzbekiston", "O‘zbekiston", "O’zbekiston", "Ozbekiston")}
+        self.assertEqual(keys, {"OZBEKISTON"})
+
+    def test_legal_form_is_dropped(self):
+        self.assertEqual(company_name_key('"Bustan Silk" MCHJ'), "BUSTAN SILK")
+        self.assertEqual(company_name_key("Қўқон нон ҚК"), "ҚЎҚОН НОН")
+
+    def test_phone_query_keeps_digits(self):
+        self.assertEqual(search_query_key("+998 (90) 123-45-67"), "998901234567")
+
+
+class CappedCountPaginatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        User.objects.bulk_create([User(username=f"u{i:03d}") for i in range(30)])
+
+    def _page(self, number):
+        qs = get_user_model().objects.order_by("username")
+        paginator = CappedCountPaginator(qs, 2, count_cap=5)
+        return paginator, paginator.get_page(number)
+
+    def test_first_page_shows_capped_count(self):
+        paginator, page = self._page(1)
+
+        self.assertTrue(paginator.is_count_capped)
+        self.assertEqual(paginator.count, 5)
+        self.assertTrue(page.has_next())
+
+    def test_pages_past_the_cap(self):
+        paginator, page = self._page(10)
+
+        self.assertEqual(page.number, 10)
+        self.assertEqual([u.username for u in page], ["u018", "u019"])
+        self.assertTrue(page.has_next())
+        self.assertTrue(paginator.is_count_capped)
+
+    def test_last_page_is_exact(self):
+        paginator, page = self._page(15)
+
+        self.assertEqual(page.number, 15)
+        self.assertFalse(page.has_next())
+        self.assertFalse(paginator.is_count_capped)
+        self.assertEqual(paginator.count, 30)
+
+    def test_page_beyond_end_falls_back_to_last(self):
+        _paginator, page = self._page(99)
+        self.assertEqual(page.number, 15)
@@ -1,13 +1,21 @@
 from typing import Optional, Literal
-from django.db.models import Q
-from django.core.paginator import Paginator
 from django.http import JsonResponse, HttpRequest, HttpResponse
 from django.shortcuts import render
 from django.template.loader import render_to_string
+from django.conf import settings
 from django.utils.translation import get_language
-from django.views.decorators.http import require_GET
-
-from apps.companies.models import Company, Category, Region, District, Direction
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import etag, require_GET
+
+from apps.companies.models import Company
+from apps.companies.reference_cache import (
+    etag_for_reference,
+    get_categories,
+    get_directions,
+    get_districts,
+    get_regions,
+)
+from apps.companies.search import CappedCountPaginator, search_companies
 from apps.users.decorators import agency_required
 
 Lang = Literal["ru", "uz"]
@@ -40,15 +48,8 @@ def _company_filters_qs(request):
     direction_ids = [d for d in direction_ids if d]
 
     if q:
-        qs = qs.filter(
-            Q(name__icontains=q)
-            | Q(inn__icontains=q)
-            | Q(description__icontains=q)
-            | Q(phones__phone__icontains=q)
-            | Q(employee_company__first_name__icontains=q)
-            | Q(employee_company__last_name__icontains=q)
-            | Q(employee_company__middle_name__icontains=q)
-        ).distinct()
+        # один JOIN на поисковый документ вместо OR по телефонам/сотрудникам + distinct()
+        qs = search_companies(qs, q)
 
     if category_id:
         qs = qs.filter(category_id=category_id)
@@ -60,7 +61,10 @@ def _company_filters_qs(request):
         qs = qs.filter(district_id=district_id)
 
     if direction_ids:
-        qs = qs.filter(directions__id__in=direction_ids).distinct()
+        # подзапрос вместо JOIN + distinct()
+        qs = qs.filter(pk__in=Company.directions.through.objects.filter(
+            direction_id__in=direction_ids,
+        ).values("company_id"))
 
     return qs
 
@@ -70,9 +74,9 @@ def _company_filters_qs(request):
 def companies_page(request):
     # полная страница: фильтры + контейнер для таблицы
     context = {
-        "categories": Category.objects.order_by("name"),
-        "regions": Region.objects.order_by("name"),
-        "directions": Direction.objects.order_by("title"),
+        "categories": get_categories(),
+        "regions": get_regions(),
+        "directions": get_directions(),
     }
     return render(request, "companies/companies_page.html", context)
 
@@ -80,9 +84,11 @@ def companies_page(request):
 @require_GET
 @agency_required
 def companies_table_partial(request):
-    qs = _company_filters_qs(request).order_by("name")
+    qs = _company_filters_qs(request)
+    if not qs.query.order_by:
+        qs = qs.order_by("name")
 
-    paginator = Paginator(qs, 25)
+    paginator = CappedCountPaginator(qs, 25)
     page_number = request.GET.get("page") or 1
     page_obj = paginator.get_page(page_number)
 
@@ -99,6 +105,8 @@ def companies_table_partial(request):
 
 
 @require_GET
+@cache_control(private=True, max_age=settings.REFERENCE_HTTP_MAX_AGE)
+@etag(etag_for_reference)
 def districts_by_region(request):
     """
     AJAX-эндпоинт:
@@ -116,14 +124,8 @@ def districts_by_region(request):
 
     lang = _resolve_lang(request)
 
-    districts_qs = (
-        District.objects
-        .filter(region_id=region_id_int)
-        .order_by("code", "id")
-    )
-
     results = []
-    for s in districts_qs:
+    for s in get_districts(region_id_int):
         name = s.name
 
         results.append({
@@ -138,15 +140,15 @@ def districts_by_region(request):
 
 
 @require_GET
+@cache_control(private=True, max_age=settings.REFERENCE_HTTP_MAX_AGE)
+@etag(etag_for_reference)
 def directions_by_category_json(request):
     category_id = (request.GET.get("category") or "").strip()
-
-    qs = Direction.objects.filter(category__isnull=False).order_by("title")
-    if category_id:
-        qs = qs.filter(category_id=category_id)
-    else:
+    if not category_id.isdigit():
         # если категория не выбрана: возвращаем все (но на фронте будем disable)
-        qs = qs
+        category_id = None
+
+    qs = get_directions(category_id, only_categorized=True)
 
     return JsonResponse({
         "results": [{"id": d.id, "title": d.title} for d in qs]
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class PanelConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.panel'
+
+    def ready(self):
+        from . import signals  # noqa
@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.agency.page_cache import invalidate_public_pages
+from apps.panel.services.image_derivatives import build_derivatives, iter_media_images
+
+
+class Command(BaseCommand):
+    help = (
+        "Build resized WebP/JPEG copies (IMAGE_DERIVATIVE_SIZES) for images already in MEDIA: "
+        "photos, CKEditor uploads and JPEG/PNG request attachments."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--path",
+            default="",
+            help="Only this MEDIA subdirectory (e.g. agency/news).",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Rebuild copies that already exist (after changing sizes or format).",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=settings.IMAGE_DERIVATIVE_WORKERS,
+            help="Parallel threads (default IMAGE_DERIVATIVE_WORKERS).",
+        )
+
+    def handle(self, *args, **opts):
+        names = list(iter_media_images(opts["path"].strip("/")))
+        self.stdout.write(f"Images found: {len(names)}")
+
+        with ThreadPoolExecutor(max_workers=max(1, opts["workers"])) as pool:
+            written = list(pool.map(lambda name: build_derivatives(name, force=opts["force"]), names))
+
+        built = sum(1 for n in written if n)
+        if built:
+            # публичные страницы могли закэшировать URL оригиналов
+            invalidate_public_pages()
+        self.stdout.write(self.style.SUCCESS(
+            f"Done: {built} images processed, {sum(written)} files written, {len(names) - built} up to date or unreadable."
+        ))
@@ -17,7 +17,10 @@ from django.db.models import (
 from django.db.models.functions import TruncDate
 from django.utils import timezone
 
-from apps.companies.models import Company
+import pandas as pd
+
+from apps.companies.cube import CUBE_DIMENSIONS
+from apps.companies.models import Company, CompanyDirectionStat, CompanyStatCube
 from apps.requests.models import Request, RequestHistory
 
 
@@ -500,6 +503,172 @@ def data_quality_summary() -> Dict[str, Any]:
     }
 
 
+# -----------------------------
+# Pivot: куб показателей компаний
+# -----------------------------
+# измерение -> (id-колонка куба, поле с подписью (modeltranslation))
+PIVOT_DIMENSIONS = {
+    "region": ("region_id", "region__name"),
+    "district": ("district_id", "district__name"),
+    "category": ("category_id", "category__name"),
+    "direction": ("direction_id", "direction__title"),
+    "unit": ("unit_id", "unit__name"),
+}
+PIVOT_METRICS = ("volume_bln_sum", "quantity", "jobs", "companies_count")
+# companies_count в кубе — distinct внутри ячейки: при сложении по направлениям
+# (району, единице) компания с несколькими направлениями посчиталась бы несколько
+# раз, поэтому эта метрика считается из CompanyDirectionStat на нужном уровне
+DISTINCT_METRICS = {"companies_count"}
+
+
+def _stat_source(cube_col: str) -> str:
+    """
+    id-колонка куба -> путь к тому же полю от CompanyDirectionStat.
+    """
+    return CUBE_DIMENSIONS[cube_col]
+
+
+def _companies_count_records(id_cols, label_cols, *, category_id, direction_id, region_id):
+    qs = CompanyDirectionStat.objects.all()
+    if category_id:
+        qs = qs.filter(direction__category_id=category_id)
+    if direction_id:
+        qs = qs.filter(direction_id=direction_id)
+    if region_id:
+        qs = qs.filter(company__region_id=region_id)
+
+    id_src = [_stat_source(c) for c in id_cols]
+    # "company__region_id" + "region__name_ru" -> "company__region__name_ru"
+    label_src = [
+        f"{src[:-len('_id')]}__{label.split('__', 1)[1]}"
+        for src, label in zip(id_src, label_cols)
+    ]
+    rows = (
+        qs.values("year", *id_src, *label_src)
+        .annotate(companies_count=Count("company_id", distinct=True))
+        .order_by()
+    )
+    records = [
+        {
+            "year": r["year"],
+            "companies_count": r["companies_count"],
+            **{c: r[src] for c, src in zip(id_cols, id_src)},
+            **{c: r[src] for c, src in zip(label_cols, label_src)},
+        }
+        for r in rows
+    ]
+    totals = dict(
+        qs.values("year").annotate(n=Count("company_id", distinct=True)).order_by().values_list("year", "n")
+    )
+    return records, totals
+
+
+def _json_number(v):
+    if v is None or pd.isna(v) or v in (float("inf"), float("-inf")):
+        return None
+    return round(float(v), 4)
+
+
+def companies_stat_pivot(
+    *,
+    dimension: str = "region",
+    metric: str = "volume_bln_sum",
+    category_id: int | None = None,
+    direction_id: int | None = None,
+    region_id: int | None = None,
+    limit: int = 50,
+) -> Dict[str, Any]:
+    """
+    Pivot по CompanyStatCube: строки = измерение, колонки = годы, плюс прирост к прошлому году.
+    pandas работает с маленьким кубом, а не с сырыми CompanyDirectionStat.
+
+    Количество в разных единицах складывать нельзя, поэтому для metric=quantity
+    строки дополнительно разбиваются по единице измерения.
+    companies_count — distinct по компаниям на уровне строки и итога (DISTINCT_METRICS).
+    """
+    if dimension not in PIVOT_DIMENSIONS:
+        dimension = "region"
+    if metric not in PIVOT_METRICS:
+        metric = "volume_bln_sum"
+
+    dims = [dimension]
+    if metric == "quantity" and dimension != "unit":
+        dims.append("unit")
+
+    qs = CompanyStatCube.objects.all()
+    if category_id:
+        qs = qs.filter(category_id=category_id)
+    if direction_id:
+        qs = qs.filter(direction_id=direction_id)
+    if region_id:
+        qs = qs.filter(region_id=region_id)
+
+    id_cols = [PIVOT_DIMENSIONS[d][0] for d in dims]
+    label_cols = []
+    for d in dims:
+        base, field = PIVOT_DIMENSIONS[d][1].split("__")
+        label_cols.append(f"{base}__{_mt_field(field)}")
+
+    distinct_totals = None
+    if metric in DISTINCT_METRICS:
+        records, distinct_totals = _companies_count_records(
+            id_cols, label_cols,
+            category_id=category_id, direction_id=direction_id, region_id=region_id,
+        )
+    else:
+        records = list(qs.values("year", metric, *id_cols, *label_cols))
+
+    df = pd.DataFrame.from_records(records, columns=["year", metric, *id_cols, *label_cols])
+    payload = {"dimension": dimension, "metric": metric, "years": [], "rows": [], "totals": {}}
+    if df.empty:
+        return payload
+
+    df[metric] = pd.to_numeric(df[metric], errors="coerce")
+    df[id_cols] = df[id_cols].fillna(0).astype(int)  # 0 = "не указано"
+
+    pivot = df.pivot_table(index=id_cols, columns="year", values=metric, aggfunc="sum").sort_index(axis=1)
+    years = [int(y) for y in pivot.columns]
+    delta = pivot.diff(axis=1)
+    delta_pct = pivot.pct_change(axis=1, fill_method=None) * 100
+
+    labels = (
+        df.drop_duplicates(subset=id_cols)
+        .set_index(id_cols)[label_cols]
+        .fillna("")
+        .apply(lambda r: " · ".join(x for x in r if x) or _("— Не указано"), axis=1)
+    )
+
+    # сортируем по последнему году
+    pivot = pivot.sort_values(by=years[-1], ascending=False, na_position="last").head(int(limit))
+
+    rows = []
+    for key, values in pivot.iterrows():
+        key = key if isinstance(key, tuple) else (key,)
+        rows.append({
+            "key": {d: (k or None) for d, k in zip(dims, key)},
+            "label": labels.get(key if len(key) > 1 else key[0], ""),
+            "values": [_json_number(v) for v in values],
+            "delta": [_json_number(v) for v in delta.loc[values.name]],
+            "delta_pct": [_json_number(v) for v in delta_pct.loc[values.name]],
+        })
+
+    payload.update({"years": years, "rows": rows})
+
+    # итог по разным единицам измерения не имеет смысла
+    if metric != "quantity" or df["unit_id"].nunique() == 1:
+        if distinct_totals is not None:
+            # компания с несколькими строками за год — одна в итоге
+            totals = pd.Series(distinct_totals, dtype="float64").reindex(years)
+        else:
+            totals = df.groupby("year")[metric].sum(min_count=1).reindex(years)
+        payload["totals"] = {
+            "values": [_json_number(v) for v in totals],
+            "delta": [_json_number(v) for v in totals.diff()],
+            "delta_pct": [_json_number(v) for v in totals.pct_change(fill_method=None) * 100],
+        }
+    return payload
+
+
 # -----------------------------
 # One-stop payload (удобно для dashboard)
 # -----------------------------
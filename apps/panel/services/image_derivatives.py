@@ -0,0 +1,211 @@
+# apps/panel/services/image_derivatives.py
+#
+# Уменьшенные копии изображений из MEDIA (фото сотрудников, новостей, "О агентстве",
+# картинки CKEditor, JPEG/PNG-вложения обращений).
+#
+# Копии лежат рядом с оригиналом: agency/news/a.jpg -> agency/news/a.md.webp
+# (размеры — IMAGE_DERIVATIVE_SIZES, формат — IMAGE_DERIVATIVE_FORMAT, webp или jpeg).
+# Строятся после commit в фоновом пуле потоков (signals.py), для уже загруженных
+# файлов — manage.py build_image_derivatives. Пока копии нет, шаблоны получают
+# оригинал (templatetags/images.py), так что отставание фона ничего не ломает;
+# для фото и картинок публичных страниц после постройки сбрасывается кэш страниц
+# (signals.py), иначе закэшированный URL оригинала жил бы весь PUBLIC_PAGE_CACHE_SECONDS.
+from __future__ import annotations
+
+import logging
+import os
+import re
+
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from typing import Callable, Iterable, Iterator
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png"}
+
+_FORMATS = {
+    "webp": ("WEBP", ".webp", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", ".jpg", {"quality": 82, "optimize": True, "progressive": True}),
+}
+
+_executor: ThreadPoolExecutor | None = None
+# найденные копии: exists() на каждый рендер не нужен, копии не исчезают
+_known: set[str] = set()
+_KNOWN_LIMIT = 20000
+
+
+def _format():
+    return _FORMATS[settings.IMAGE_DERIVATIVE_FORMAT]
+
+
+def _derivative_re() -> re.Pattern:
+    sizes = "|".join(re.escape(s) for s in settings.IMAGE_DERIVATIVE_SIZES)
+    return re.compile(rf"\.({sizes})\.(webp|jpg)$", re.IGNORECASE)
+
+
+def is_derivative(name: str) -> bool:
+    return bool(_derivative_re().search(name))
+
+
+def is_image_name(name: str) -> bool:
+    return os.path.splitext(name or "")[1].lower() in IMAGE_EXTENSIONS and not is_derivative(name)
+
+
+def derivative_name(name: str, size: str) -> str:
+    stem, _ext = os.path.splitext(name)
+    return f"{stem}.{size}{_format()[1]}"
+
+
+def _encode(image: Image.Image, max_px: int) -> bytes:
+    fmt, _ext, options = _format()
+    copy = image.copy()
+    copy.thumbnail((max_px, max_px), Image.Resampling.LANCZOS)  # без увеличения
+
+    if fmt == "JPEG" and copy.mode != "RGB":
+        rgba = copy.convert("RGBA")
+        background = Image.new("RGB", rgba.size, (255, 255, 255))
+        background.paste(rgba, mask=rgba.getchannel("A"))
+        copy = background
+    elif copy.mode not in ("RGB", "RGBA"):
+        copy = copy.convert("RGBA" if "A" in copy.getbands() or copy.mode == "P" else "RGB")
+
+    out = BytesIO()
+    copy.save(out, fmt, **options)
+    return out.getvalue()
+
+
+def build_derivatives(name: str, *, storage=default_storage, force: bool = False) -> int:
+    """
+    Строит недостающие копии (force — все заново). Возвращает число записанных файлов.
+    """
+    if not is_image_name(name):
+        return 0
+
+    todo = [
+        (size, px, derivative_name(name, size))
+        for size, px in settings.IMAGE_DERIVATIVE_SIZES.items()
+    ]
+    if not force:
+        todo = [item for item in todo if not storage.exists(item[2])]
+    if not todo:
+        return 0
+
+    try:
+        with storage.open(name, "rb") as fh:
+            image = Image.open(fh)
+            image = ImageOps.exif_transpose(image)
+            image.load()
+    except (FileNotFoundError, UnidentifiedImageError, OSError, Image.DecompressionBombError) as exc:
+        logger.warning("Image derivatives: cannot read %s: %s", name, exc)
+        return 0
+
+    written = 0
+    for _size, px, target in todo:
+        data = _encode(image, px)
+        if storage.exists(target):
+            storage.delete(target)
+        saved = storage.save(target, ContentFile(data))
+        if saved != target:
+            # параллельный построитель успел первым — оставляем его файл
+            storage.delete(saved)
+        written += 1
+    return written
+
+
+def _build_safely(names: list[str], on_built: Callable[[], None] | None) -> None:
+    written = 0
+    for name in names:
+        try:
+            written += build_derivatives(name)
+        except Exception:
+            logger.exception("Image derivatives failed for %s", name)
+    if written and on_built is not None:
+        try:
+            on_built()
+        except Exception:
+            logger.exception("Image derivatives callback failed")
+
+
+def schedule_derivatives(names: Iterable[str], *, on_built: Callable[[], None] | None = None) -> None:
+    """
+    После commit — в фоновый пул (IMAGE_DERIVATIVE_WORKERS потоков).
+    on_built вызывается в потоке пула, если записана хоть одна копия
+    (например, сброс кэша страниц, закэшировавших URL оригинала).
+    """
+    names = [n for n in names if n and is_image_name(n)]
+    if not names or not settings.IMAGE_DERIVATIVES_ENABLED:
+        return
+
+    def submit():
+        global _executor
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.IMAGE_DERIVATIVE_WORKERS, thread_name_prefix="image-derivatives"
+            )
+        _executor.submit(_build_safely, names, on_built)
+
+    transaction.on_commit(submit)
+
+
+def derivative_url(name: str, size: str, *, storage=default_storage) -> str:
+    """
+    URL копии нужного размера, если она уже есть, иначе оригинала.
+    """
+    if not name:
+        return ""
+    if size in settings.IMAGE_DERIVATIVE_SIZES and is_image_name(name):
+        target = derivative_name(name, size)
+        if target in _known:
+            return storage.url(target)
+        if storage.exists(target):
+            if len(_known) >= _KNOWN_LIMIT:
+                _known.clear()
+            _known.add(target)
+            return storage.url(target)
+    return storage.url(name)
+
+
+def iter_media_images(root: str = "", *, storage=default_storage) -> Iterator[str]:
+    """
+    Все оригиналы изображений в хранилище (для backfill).
+    """
+    dirs, files = storage.listdir(root)
+    for f in files:
+        name = f"{root}/{f}" if root else f
+        if is_image_name(name):
+            yield name
+    for d in dirs:
+        yield from iter_media_images(f"{root}/{d}" if root else d, storage=storage)
+
+
+# картинки из HTML (CKEditor): src="/media/uploads/..."
+_IMG_SRC_RE = re.compile(r"""<img\b[^>]*?\bsrc\s*=\s*["']([^"']+)["']""", re.IGNORECASE)
+
+
+def media_names_from_html(html: str) -> list[str]:
+    names = []
+    for src in _IMG_SRC_RE.findall(html or ""):
+        if src.startswith(settings.MEDIA_URL):
+            names.append(src[len(settings.MEDIA_URL):])
+    return names
+
+
+def replace_html_images(html: str, size: str) -> str:
+    """
+    src картинок из MEDIA -> копия нужного размера (если уже построена).
+    """
+    def repl(match: re.Match) -> str:
+        src = match.group(1)
+        if not src.startswith(settings.MEDIA_URL):
+            return match.group(0)
+        url = derivative_url(src[len(settings.MEDIA_URL):], size)
+        return match.group(0).replace(src, url, 1)
+
+    return _IMG_SRC_RE.sub(repl, html or "")
@@ -0,0 +1,145 @@
+# apps/panel/services/protected_files.py
+#
+# Отдача файлов из MEDIA после проверки доступа во view (вложения обращений).
+#
+# PROTECTED_MEDIA_SERVER:
+#   - "nginx"  — пустой ответ с X-Accel-Redirect: PROTECTED_MEDIA_INTERNAL_URL + путь,
+#                байты отдаёт nginx из internal location (Range/304 — тоже он);
+#   - "apache" — X-Sendfile с абсолютным путём (mod_xsendfile);
+#   - ""       — FileResponse из Django: ETag/Last-Modified (304/412) и один
+#                диапазон Range (206/416), чтобы большие PDF докачивались.
+#
+# Пример nginx:
+#   location /protected-media/ { internal; alias /srv/adli/media/; }
+# а вложения обращений не отдаются публичным location /media/.
+from __future__ import annotations
+
+import mimetypes
+import os
+import re
+
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def _content_type(filename: str) -> str:
+    content_type, encoding = mimetypes.guess_type(filename)
+    if encoding or not content_type:
+        return "application/octet-stream"
+    return content_type
+
+
+def _parse_range(header: str, size: int):
+    """
+    Один диапазон "bytes=a-b" / "bytes=a-" / "bytes=-n" -> (start, end) включительно.
+    None — заголовок не понят (отдаём файл целиком), False — диапазон вне файла.
+    """
+    match = _RANGE_RE.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        length = int(last)
+        if length == 0:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+class _RangeFile:
+    """
+    Итератор по куску файла [start, end] — для StreamingHttpResponse/FileResponse.
+    """
+
+    def __init__(self, fh, start: int, end: int, chunk_size: int = FileResponse.block_size):
+        self.fh = fh
+        self.remaining = end - start + 1
+        self.chunk_size = chunk_size
+        fh.seek(start)
+
+    def __iter__(self):
+        while self.remaining > 0:
+            chunk = self.fh.read(min(self.chunk_size, self.remaining))
+            if not chunk:
+                break
+            self.remaining -= len(chunk)
+            yield chunk
+
+    def close(self):
+        self.fh.close()
+
+
+def serve_protected_file(request, name: str, *, download_name: str = "", as_attachment: bool = True, storage=default_storage):
+    """
+    Ответ с файлом name из хранилища. Доступ уже проверен вызывающим view.
+    """
+    if not name or not storage.exists(name):
+        raise Http404()
+
+    filename = download_name or os.path.basename(name)
+    headers = {
+        "Content-Disposition": content_disposition_header(as_attachment, filename),
+        # ответ зависит от прав пользователя — в общие кэши не кладём
+        "Cache-Control": "private, max-age=0, must-revalidate",
+        "X-Content-Type-Options": "nosniff",
+    }
+
+    server = settings.PROTECTED_MEDIA_SERVER
+    if server == "nginx":
+        response = HttpResponse(content_type=_content_type(filename), headers=headers)
+        response["X-Accel-Redirect"] = settings.PROTECTED_MEDIA_INTERNAL_URL + quote(name)
+        return response
+    if server == "apache":
+        response = HttpResponse(content_type=_content_type(filename), headers=headers)
+        # путь — байтами файловой системы (UTF-8), иначе Django закодирует заголовок по RFC 2047
+        response["X-Sendfile"] = storage.path(name).encode("utf-8").decode("latin-1")
+        return response
+
+    size = storage.size(name)
+    mtime = storage.get_modified_time(name).timestamp()
+    etag = f'"{int(mtime):x}-{size:x}"'
+    last_modified = http_date(mtime)
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=int(mtime))
+    if not_modified is not None:
+        not_modified["ETag"] = etag
+        return not_modified
+
+    byte_range = None
+    range_header = request.META.get("HTTP_RANGE", "")
+    if range_header and request.method == "GET":
+        if_range = request.META.get("HTTP_IF_RANGE", "").strip()
+        if not if_range or if_range == etag or parse_http_date_safe(if_range) == int(mtime):
+            byte_range = _parse_range(range_header, size)
+
+    headers.update({"ETag": etag, "Last-Modified": last_modified, "Accept-Ranges": "bytes"})
+
+    if byte_range is False:
+        response = HttpResponse(status=416, headers=headers)
+        response["Content-Range"] = f"bytes */{size}"
+        return response
+
+    fh = storage.open(name, "rb")
+    if byte_range is None:
+        # Content-Disposition и Content-Length FileResponse выставит сам
+        return FileResponse(fh, as_attachment=as_attachment, filename=filename,
+                            content_type=_content_type(filename), headers=headers)
+
+    start, end = byte_range
+    response = FileResponse(_RangeFile(fh, start, end), status=206, content_type=_content_type(filename), headers=headers)
+    response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    response["Content-Length"] = str(end - start + 1)
+    return response
@@ -0,0 +1,91 @@
+# apps/panel/services/request_archive.py
+#
+# ZIP со всеми вложениями обращения — собирается на лету и сразу уходит клиенту.
+#
+# zipfile пишет в объект без seek (data descriptor после каждого файла), поэтому
+# архив не держится ни в памяти, ни на диске: в буфере — только последний кусок.
+# Файлы кладутся без сжатия (ZIP_STORED): PDF/JPEG/DOCX уже сжаты, а CPU
+# воркера не тратится. Имена — как фильтр basename на странице обращения,
+# повторы получают суффикс " (2)", " (3)".
+from __future__ import annotations
+
+import os
+import zipfile
+
+from typing import Iterable, Iterator
+
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+from apps.panel.templatetags.request_files import basename
+
+CHUNK_SIZE = 64 * 1024
+
+
+class _ChunkBuffer:
+    """
+    Файлоподобный приёмник для zipfile: накопленное забирается через pop().
+    """
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+        self._offset = 0
+
+    def write(self, data: bytes) -> int:
+        if data:
+            self._chunks.append(bytes(data))
+            self._offset += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._offset
+
+    def flush(self) -> None:
+        pass
+
+    def pop(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _unique_name(name: str, used: set) -> str:
+    candidate = name or "file"
+    stem, ext = os.path.splitext(candidate)
+    n = 2
+    while candidate.lower() in used:
+        candidate = f"{stem} ({n}){ext}"
+        n += 1
+    used.add(candidate.lower())
+    return candidate
+
+
+def iter_request_files_zip(files: Iterable, *, storage=default_storage) -> Iterator[bytes]:
+    """
+    files — RequestFile (или что угодно с .file). Отсутствующие на диске файлы пропускаются.
+    """
+    buffer = _ChunkBuffer()
+    used: set = set()
+
+    with zipfile.ZipFile(buffer, mode="w", compression=zipfile.ZIP_STORED, allowZip64=True) as archive:
+        for item in files:
+            name = item.file.name
+            if not name or not storage.exists(name):
+                continue
+
+            created_at = getattr(item, "created_at", None) or timezone.now()
+            info = zipfile.ZipInfo(
+                _unique_name(basename(item.file), used),
+                date_time=timezone.localtime(created_at).timetuple()[:6],
+            )
+            info.compress_type = zipfile.ZIP_STORED
+            with storage.open(name, "rb") as src, archive.open(info, mode="w", force_zip64=True) as dst:
+                while chunk := src.read(CHUNK_SIZE):
+                    dst.write(chunk)
+                    if data := buffer.pop():
+                        yield data
+            if data := buffer.pop():
+                yield data
+
+    # центральный каталог пишется при закрытии архива
+    yield buffer.pop()
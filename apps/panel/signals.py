@@ -0,0 +1,42 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from apps.agency.models import AgencyAbout, Employee, LeadershipProfile, News
+from apps.agency.page_cache import invalidate_public_pages
+from apps.requests.models import RequestFile
+
+from .services.image_derivatives import media_names_from_html, schedule_derivatives
+
+# HTML-поля (CKEditor) по языкам: картинки из MEDIA_URL/uploads/
+_HTML_FIELDS = {
+    News: ("description",),
+    AgencyAbout: ("description",),
+    LeadershipProfile: ("biography",),
+}
+_LANGUAGES = ("uz", "ru")
+
+
+def _html_images(instance) -> list:
+    names = []
+    for field in _HTML_FIELDS.get(type(instance), ()):
+        for lang in _LANGUAGES:
+            names += media_names_from_html(getattr(instance, f"{field}_{lang}", "") or "")
+    return names
+
+
+@receiver(post_save, sender=Employee)
+@receiver(post_save, sender=News)
+@receiver(post_save, sender=AgencyAbout)
+@receiver(post_save, sender=LeadershipProfile)
+def build_photo_derivatives(sender, instance, **kwargs):
+    photo = getattr(instance, "photo", None)
+    names = [photo.name] if photo else []
+    # версия кэша поднимается на commit, раньше появления копий: без второго
+    # сброса анонимная страница закэшировала бы URL оригинала на весь TIMEOUT
+    schedule_derivatives(names + _html_images(instance), on_built=invalidate_public_pages)
+
+
+@receiver(post_save, sender=RequestFile)
+def build_request_file_derivatives(sender, instance, created, **kwargs):
+    if created and instance.file:
+        schedule_derivatives([instance.file.name])
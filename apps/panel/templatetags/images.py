@@ -0,0 +1,30 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from apps.panel.services.image_derivatives import derivative_url, replace_html_images
+
+register = template.Library()
+
+
+@register.filter
+def thumb(file_or_name, size="md"):
+    """
+    URL уменьшенной копии (sm/md/lg) для ImageField/FileField или пути в MEDIA;
+    пока копия не построена — URL оригинала.
+        <img src="{{ n.photo|thumb:'md' }}">
+    """
+    if not file_or_name:
+        return ""
+    name = getattr(file_or_name, "name", None) or str(file_or_name)
+    return derivative_url(name, size)
+
+
+@register.filter
+def thumb_images(html, size="lg"):
+    """
+    В HTML из CKEditor подменяет src картинок из MEDIA на копии нужного размера.
+        {{ obj.description|thumb_images:'lg'|safe }}
+    """
+    if not html:
+        return ""
+    return mark_safe(replace_html_images(str(html), size))
@@ -8,6 +8,8 @@ from .views import (
     overdue_requests_report_export,
     requests_list,
     request_detail,
+    request_file_download,
+    request_files_zip,
     request_action_add_step,
     request_action_mark_done,
     request_action_assign_executor,
@@ -31,6 +33,7 @@ from .views import (
     api_dashboard_requests_problem_directions,
     api_analytics_requests_all,
     api_analytics_companies_all,
+    api_analytics_companies_pivot,
 
 )
 
@@ -41,6 +44,7 @@ urlpatterns = [
     path("api/dashboard/", api_dashboard_all, name="api_dashboard_all"),
     path("api/analytics/requests/", api_analytics_requests_all, name="api_analytics_requests_all"),
     path("api/analytics/companies/", api_analytics_companies_all, name="api_analytics_companies_all"),
+    path("api/analytics/companies/pivot/", api_analytics_companies_pivot, name="api_analytics_companies_pivot"),
     path("api/dashboard/kpi/", api_dashboard_kpi, name="api_dashboard_kpi"),
 
     path("api/dashboard/requests/status/", api_dashboard_requests_status, name="api_dashboard_requests_status"),
@@ -77,6 +81,8 @@ urlpatterns = [
     # Requests (panel)
     path("requests/", requests_list, name="requests_list"),
     path("request/<int:pk>/", request_detail, name="request_detail"),
+    path("request/<int:pk>/files/<int:file_id>/", request_file_download, name="request_file"),
+    path("request/<int:pk>/files/zip/", request_files_zip, name="request_files_zip"),
 
     # Actions
     path("requests/<int:pk>/actions/assign-executor/", request_action_assign_executor, name="request_action_assign_executor"),
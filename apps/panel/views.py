@@ -1,18 +1,23 @@
 # apps/panel/views.py
+import os
 from datetime import date
 
+from django.conf import settings
+
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
+from django.core.files.storage import default_storage
 from django.db.models import Q
-from django.http import Http404, HttpResponse, JsonResponse
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.utils import timezone
+from django.utils.http import content_disposition_header
 from django.utils.translation import gettext_lazy as _
 from django.views.decorators.cache import cache_page
 from django.views.decorators.http import require_GET, require_POST
 
 from apps.users.decorators import agency_required
-from apps.requests.models import Request, RequestOfficialResponse
+from apps.requests.models import Request, RequestFile, RequestOfficialResponse
 from apps.requests.services import (
     register_request,
     send_for_resolution,
@@ -30,6 +35,9 @@ from .forms import (
     AssignExecutorForm,
     OverdueReportFilterForm,
 )
+from .services.image_derivatives import derivative_name, is_image_name
+from .services.protected_files import serve_protected_file
+from .services.request_archive import iter_request_files_zip
 from .services.request_buckets import visible_requests_qs, apply_bucket
 from .services.request_reports import (
     build_overdue_report_rows,
@@ -54,6 +62,7 @@ from .services.analytics import (
     companies_by_region,
     companies_by_direction,
     data_quality_summary, requests_by_problem_direction,
+    companies_stat_pivot,
 )
 
 # --- Roles (auth.Group names) ---
@@ -318,6 +327,29 @@ def api_dashboard_data_quality(request):
     return JsonResponse(data_quality_summary(), safe=True)
 
 
+def _int_or_none(value):
+    try:
+        return int(value) if value else None
+    except (TypeError, ValueError):
+        return None
+
+
+@require_GET
+@agency_required
+@cache_page(60)
+def api_analytics_companies_pivot(request):
+    # считается по предагрегированному кубу (CompanyStatCube), а не по сырым показателям
+    data = companies_stat_pivot(
+        dimension=request.GET.get("dimension") or "region",
+        metric=request.GET.get("metric") or "volume_bln_sum",
+        category_id=_int_or_none(request.GET.get("category")),
+        direction_id=_int_or_none(request.GET.get("direction")),
+        region_id=_int_or_none(request.GET.get("region")),
+        limit=_int_or_none(request.GET.get("limit")) or 50,
+    )
+    return JsonResponse(data, safe=True)
+
+
 
 @require_GET
 @agency_required
@@ -444,6 +476,50 @@ def request_detail(request, pk: int):
     return render(request, "panel/requests/detail.html", context)
 
 
+@require_GET
+@agency_required
+def request_file_download(request, pk: int, file_id: int):
+    """
+    Вложение обращения — только если само обращение видно пользователю.
+    ?inline=1 — открыть в браузере, ?size=sm|md|lg — уменьшенная копия изображения.
+    """
+    attachment = get_object_or_404(
+        RequestFile.objects.filter(request__in=visible_requests_qs(Request.objects.all(), request.user)),
+        pk=file_id,
+        request_id=pk,
+    )
+    name = attachment.file.name
+    size = request.GET.get("size", "")
+    if size and is_image_name(name) and size in settings.IMAGE_DERIVATIVE_SIZES:
+        derivative = derivative_name(name, size)
+        if default_storage.exists(derivative):
+            return serve_protected_file(request, derivative, as_attachment=False)
+
+    return serve_protected_file(
+        request,
+        name,
+        download_name=os.path.basename(name),
+        as_attachment=not (request.GET.get("inline") or size),
+    )
+
+
+@require_GET
+@agency_required
+def request_files_zip(request, pk: int):
+    """
+    Все вложения обращения одним ZIP (потоком, без сборки архива на сервере).
+    """
+    obj = get_object_or_404(visible_requests_qs(Request.objects.all(), request.user), pk=pk)
+    files = list(obj.files.order_by("created_at", "pk"))
+    if not files:
+        raise Http404()
+
+    response = StreamingHttpResponse(iter_request_files_zip(files), content_type="application/zip")
+    response["Content-Disposition"] = content_disposition_header(True, f"{obj.public_id or obj.pk}.zip")
+    response["Cache-Control"] = "private, no-store"
+    return response
+
+
 def _render_detail_oob(request, obj_id: int, official_response_form=None):
     obj = Request.objects.select_related(
         "company", "employee", "assigned_department", "assigned_employee", "telegram_profile"
@@ -4,6 +4,15 @@ from django.utils.translation import gettext_lazy as _
 
 from apps.agency.models import ProblemDirection
 from apps.companies.models import Category, Direction, Region, District
+from apps.companies.reference_cache import (
+    CachedModelChoiceField,
+    CachedModelMultipleChoiceField,
+    get_categories,
+    get_directions,
+    get_districts,
+    get_problem_directions,
+    get_regions,
+)
 
 BASE_INPUT = "block w-full rounded-lg border border-gray-300 bg-gray-50 p-2.5 text-sm focus:border-blue-500 focus:ring-blue-500"
 BASE_TEXTAREA = BASE_INPUT + " min-h-[120px]"
@@ -30,31 +39,36 @@ class MultipleFileField(forms.FileField):
         return [super().clean(data, initial)]
 
 class PublicRequestForm(forms.Form):
-    problem_direction = forms.ModelChoiceField(
+    # choices справочников берутся из кэша процесса (apps/companies/reference_cache.py)
+    problem_direction = CachedModelChoiceField(
         label=_("Проблемное направление"),
-        queryset=ProblemDirection.objects.filter(is_active=True).select_related("department").order_by("sort_order", "name"),
+        queryset=ProblemDirection.objects.filter(is_active=True),
+        loader=get_problem_directions,
         empty_label=_("Выберите направление"),
         required=True,
     )
     # company
-    category = forms.ModelChoiceField(
+    category = CachedModelChoiceField(
         label=_("Категория"),
         queryset=Category.objects.all(),
+        loader=get_categories,
         empty_label=_("Выберите категорию"),
     )
     company_name = forms.CharField(label=_("Название компании"), max_length=255)
     inn = forms.CharField(label=_("ИНН"), max_length=20)
 
-    region = forms.ModelChoiceField(
+    region = CachedModelChoiceField(
         label=_("Регион"),
-        queryset=Region.objects.all().order_by("name"),
+        queryset=Region.objects.all(),
+        loader=get_regions,
         required=False,
         empty_label=_("Выберите регион"),
     )
 
-    district = forms.ModelChoiceField(
+    # список районов зависит от региона — loader задаётся в __init__
+    district = CachedModelChoiceField(
         label=_("Район/город"),
-        queryset=District.objects.none(),
+        queryset=District.objects.all(),
         required=False,
         empty_label=_("Выберите район/город"),
     )
@@ -67,9 +81,10 @@ class PublicRequestForm(forms.Form):
     email = forms.EmailField(label=_("Электронная почта"))
 
     # request
-    directions = forms.ModelMultipleChoiceField(
+    directions = CachedModelMultipleChoiceField(
         label=_("Направления"),
-        queryset=Direction.objects.none(),
+        queryset=Direction.objects.all(),
+        loader=get_directions,
         required=False,
     )
 
@@ -78,12 +93,11 @@ class PublicRequestForm(forms.Form):
     attachments = MultipleFileField(label=_("Приложения"), required=False)
 
     def __init__(self, *args, **kwargs):
-        directions_qs = kwargs.pop("directions_qs", Direction.objects.all())
-        district_qs = kwargs.pop("district_qs", District.objects.none())
+        region_id = kwargs.pop("region_id", None)
         super().__init__(*args, **kwargs)
 
-        self.fields["directions"].queryset = directions_qs
-        self.fields["district"].queryset = district_qs
+        if region_id:
+            self.fields["district"].loader = lambda: get_districts(region_id)
         self.fields["problem_direction"].widget.attrs.update({"class": BASE_INPUT})
 
         # классы
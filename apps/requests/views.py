@@ -1,13 +1,22 @@
 import secrets
+from django.conf import settings
 from django.http import Http404, JsonResponse, HttpResponse
 from django.contrib import messages
 from django.db import transaction
 from django.shortcuts import redirect, render
 from django.template.loader import render_to_string
 from django.utils.translation import gettext_lazy as _
-from django.views.decorators.http import require_GET
-
-from apps.companies.models import Company, EmployeeCompany, Position, Direction, Region, District, Category
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import etag, require_GET
+
+from apps.companies.changes import company_change_source
+from apps.companies.models import Company, CompanyChange, EmployeeCompany, Position
+from apps.companies.reference_cache import (
+    etag_for_reference,
+    get_categories,
+    get_directions,
+    get_regions,
+)
 from .models import Request, RequestFile, RequestHistory
 from .forms import PublicRequestForm, TrackRequestsForm
 from .services import create_public_request, create_public_request_routed
@@ -16,19 +25,15 @@ from ..users.decorators import public_company_only
 
 @transaction.atomic
 @public_company_only
+@company_change_source(CompanyChange.Source.PUBLIC_WEB)
 def public_request_create(request):
-    district_qs = District.objects.none()
     if request.method == "POST":
 
         region_id = request.POST.get("region")
-        if region_id and str(region_id).isdigit():
-            district_qs = District.objects.filter(region_id=int(region_id)).order_by("name")
-
         form = PublicRequestForm(
             request.POST,
             request.FILES,
-            directions_qs=Direction.objects.all(),
-            district_qs=district_qs,
+            region_id=int(region_id) if region_id and str(region_id).isdigit() else None,
         )
 
         if form.is_valid():
@@ -143,15 +148,12 @@ def public_request_create(request):
         else:
             messages.error(request, _("Проверьте форму: есть ошибки."))
     else:
-        form = PublicRequestForm(
-            directions_qs=Direction.objects.all(),
-            district_qs=District.objects.none(),
-        )
+        form = PublicRequestForm()
 
     context = {
         "form": form,
-        "categories": Category.objects.order_by("name"),
-        "regions": Region.objects.order_by("name"),
+        "categories": get_categories(),
+        "regions": get_regions(),
     }
     return render(request, "public/request_form.html", context)
 
@@ -289,6 +291,9 @@ def public_request_history_json(request, public_id: str):
     })
 
 
+@require_GET
+@cache_control(private=True, max_age=settings.REFERENCE_HTTP_MAX_AGE)
+@etag(etag_for_reference)
 def htmx_directions_by_category(request):
     """
     HTMX endpoint: возвращает HTML-блок с чекбоксами directions
@@ -297,9 +302,9 @@ def htmx_directions_by_category(request):
     category_id = request.GET.get("category")  # имя поля select'а
     selected = request.GET.getlist("directions")  # уже выбранные чекбоксы
 
-    qs = Direction.objects.filter(category__isnull=False).order_by("title")
-    if category_id:
-        qs = qs.filter(category_id=category_id)
+    if category_id and not str(category_id).isdigit():
+        category_id = None
+    qs = get_directions(category_id, only_categorized=True)
 
     html = render_to_string(
         "partials/directions_choices.html",
@@ -1,12 +1,52 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.utils.translation import gettext_lazy as _
 
-from apps.telephony.models import TelephonyLink
+from apps.telephony.models import KerioSnapshot, KerioSyncRun, TelephonyLink
+from apps.telephony.provisioning import provision_links
 
 
 @admin.register(TelephonyLink)
 class TelephonyLinkAdmin(admin.ModelAdmin):
-    list_display = ("employee", "extension", "kerio_guid")
-    list_filter = ("employee",)
+    list_display = ("employee", "extension", "kerio_guid", "provision_status", "provision_attempted_at")
+    list_filter = ("provision_status", "employee__department")
     search_fields = ("employee", "extension", "kerio_guid")
+    readonly_fields = ("provision_status", "provision_error", "provision_attempted_at")
+    actions = ("provision_in_kerio",)
 
+    @admin.action(description=_("Создать выбранных в Kerio"))
+    def provision_in_kerio(self, request, queryset):
+        try:
+            res = provision_links(queryset.values_list("pk", flat=True))
+        except Exception as exc:
+            self.message_user(request, _("Kerio недоступен: %s") % exc, level=messages.ERROR)
+            return
+        self.message_user(
+            request,
+            _("Создано: %(done)s, пропущено: %(skipped)s, ошибок: %(failed)s") % res,
+            level=messages.WARNING if res["failed"] else messages.SUCCESS,
+        )
 
+
+@admin.register(KerioSnapshot)
+class KerioSnapshotAdmin(admin.ModelAdmin):
+    list_display = ("fetched_at", "duration_ms", "refresh_started_at", "last_error_at")
+    readonly_fields = (
+        "users", "extensions", "fetched_at", "duration_ms",
+        "refresh_started_at", "last_error", "last_error_at",
+    )
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(KerioSyncRun)
+class KerioSyncRunAdmin(admin.ModelAdmin):
+    list_display = (
+        "started_at", "status", "trigger", "duration_ms", "kerio_users", "links_total",
+        "matched", "updated", "missing_in_kerio", "unlinked_kerio_users", "conflicts",
+    )
+    list_filter = ("status", "trigger")
+    readonly_fields = [f.name for f in KerioSyncRun._meta.fields]
+
+    def has_add_permission(self, request):
+        return False
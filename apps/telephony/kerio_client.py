@@ -1,60 +1,222 @@
 # apps/telephony/kerio_client.py
+#
+# JSON-RPC клиент Kerio Operator.
+#
+# Клиент один на процесс (get_kerio_client): один логин, токен переиспользуется,
+# HTTP-соединения держатся открытыми (keep-alive, пул на KERIO_OPERATOR_POOL_SIZE).
+#   - токен считается живым KERIO_OPERATOR_TOKEN_TTL_SECONDS после последнего
+#     успешного вызова (таймаут сессии Kerio по бездействию), потом — новый логин;
+#   - повторный логин только на ошибку авторизации (HTTP 401/403 или код сессии
+#     в ответе), сетевые ошибки и ошибки API пробрасываются как есть;
+#   - call_batch — несколько методов одним HTTP-запросом (JSON-RPC batch).
+#
+# Потокобезопасен: логин под блокировкой, запросы идут параллельно.
+# Для тестов и замеров — локальный фейковый сервер, apps/telephony/kerio_fake.py.
 from __future__ import annotations
 
+import itertools
 import os
+import threading
+import time
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
 import requests
-from typing import Any, Dict, Optional
+
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+# коды JSON-RPC ошибок Kerio про сессию: истекла / нет токена / неверный токен
+AUTH_ERROR_CODES = {-32001, -32002, -32003}
+
+
+class KerioApiError(RuntimeError):
+    def __init__(self, error: Dict[str, Any]):
+        self.code = error.get("code")
+        self.message = error.get("message") or ""
+        self.error = error
+        super().__init__(f"Kerio API error: {error}")
+
+
+class KerioAuthError(KerioApiError):
+    pass
+
+
+def _api_error(error: Dict[str, Any]) -> KerioApiError:
+    return KerioAuthError(error) if error.get("code") in AUTH_ERROR_CODES else KerioApiError(error)
 
 
 class KerioOperatorClient:
-    def __init__(self) -> None:
-        self.url = os.getenv("KERIO_OPERATOR_URL", "").strip()
+    def __init__(
+        self,
+        url: Optional[str] = None,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        *,
+        verify_ssl: Optional[bool] = None,
+        token_ttl: Optional[int] = None,
+        pool_size: Optional[int] = None,
+    ) -> None:
+        self.url = (url if url is not None else os.getenv("KERIO_OPERATOR_URL", "")).strip()
         if not self.url:
             raise RuntimeError("KERIO_OPERATOR_URL is not set")
 
-        self.username = os.getenv("KERIO_OPERATOR_USER", "").strip()
-        self.password = os.getenv("KERIO_OPERATOR_PASS", "").strip()
+        self.username = (username if username is not None else os.getenv("KERIO_OPERATOR_USER", "")).strip()
+        self.password = (password if password is not None else os.getenv("KERIO_OPERATOR_PASS", "")).strip()
 
-        verify_env = os.getenv("KERIO_OPERATOR_SSL_VERIFY", "true").lower().strip()
-        self.verify_ssl = verify_env in ("1", "true", "yes", "on")
+        if verify_ssl is None:
+            verify_env = os.getenv("KERIO_OPERATOR_SSL_VERIFY", "true").lower().strip()
+            verify_ssl = verify_env in ("1", "true", "yes", "on")
+        self.verify_ssl = verify_ssl
+        self.token_ttl = settings.KERIO_OPERATOR_TOKEN_TTL_SECONDS if token_ttl is None else token_ttl
+        self.timeout = settings.KERIO_OPERATOR_TIMEOUT_SECONDS
 
+        pool_size = pool_size or settings.KERIO_OPERATOR_POOL_SIZE
         self.sess = requests.Session()
-        self.token: Optional[str] = None
-        self._rpc_id = 0
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.sess.mount("https://", adapter)
+        self.sess.mount("http://", adapter)
 
-    def _next_id(self) -> int:
-        self._rpc_id += 1
-        return self._rpc_id
+        self.token: Optional[str] = None
+        self._token_expires_at = 0.0
+        self._login_lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self.logins = 0
 
-    def _rpc(self, method: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-        payload = {"jsonrpc": "2.0", "id": self._next_id(), "method": method, "params": params or {}}
+    def _post(self, payload: Any, token: Optional[str]) -> Any:
         headers = {"Content-Type": "application/json"}
-        if self.token:
-            headers["X-Token"] = self.token
+        if token:
+            headers["X-Token"] = token
 
-        r = self.sess.post(self.url, json=payload, headers=headers, verify=self.verify_ssl, timeout=25)
+        r = self.sess.post(self.url, json=payload, headers=headers, verify=self.verify_ssl, timeout=self.timeout)
+        if r.status_code in (401, 403):
+            raise KerioAuthError({"code": r.status_code, "message": r.reason})
         r.raise_for_status()
-        data = r.json()
+        return r.json()
+
+    def _rpc(self, method: str, params: Optional[Dict[str, Any]], token: Optional[str]) -> Dict[str, Any]:
+        payload = {"jsonrpc": "2.0", "id": next(self._ids), "method": method, "params": params or {}}
+        data = self._post(payload, token)
         if "error" in data:
-            raise RuntimeError(f"Kerio API error: {data['error']}")
+            raise _api_error(data["error"])
         return data.get("result", {})
 
-    def login(self) -> None:
+    def _touch(self) -> None:
+        self._token_expires_at = time.monotonic() + self.token_ttl
+
+    def login(self) -> str:
         result = self._rpc("Session.login", {
             "userName": self.username,
             "password": self.password,
             "application": {"name": "ADLI", "vendor": "WEBadiko", "version": "1.0"},
-        })
+        }, token=None)
         token = result.get("token")
         if not token:
             raise RuntimeError("Kerio login failed: token not returned")
         self.token = token
+        self.logins += 1
+        self._touch()
+        return token
+
+    def _valid_token(self, stale: Optional[str] = None) -> str:
+        """
+        stale — токен, который сервер только что отверг: если другой поток уже
+        перелогинился, берём его токен, а не логинимся второй раз.
+        """
+        with self._login_lock:
+            expired = time.monotonic() >= self._token_expires_at
+            if self.token is None or expired or self.token == stale:
+                self.login()
+            return self.token
 
     def call(self, method: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-        if not self.token:
-            self.login()
+        token = self._valid_token()
+        try:
+            result = self._rpc(method, params, token)
+        except KerioAuthError:
+            token = self._valid_token(stale=token)
+            result = self._rpc(method, params, token)
+        self._touch()
+        return result
+
+    def call_batch(
+        self,
+        calls: Sequence[Tuple[str, Optional[Dict[str, Any]]]],
+        *,
+        raise_errors: bool = True,
+    ) -> List[Any]:
+        """
+        Несколько методов одним HTTP-запросом. Результаты — в порядке calls;
+        raise_errors=False — на месте неудачного вызова KerioApiError вместо исключения.
+        Если сервер отверг токен для всего пакета (HTTP 401/403 или ошибка сессии
+        на каждом вызове), пакет повторяется после логина.
+        """
+        if not calls:
+            return []
+
+        token = self._valid_token()
         try:
-            return self._rpc(method, params=params)
-        except Exception:
-            self.login()
-            return self._rpc(method, params=params)
+            results = self._batch(calls, token)
+            rejected = all(isinstance(r, KerioAuthError) for r in results)
+        except KerioAuthError:
+            rejected = True
+        if rejected:
+            token = self._valid_token(stale=token)
+            results = self._batch(calls, token)
+        self._touch()
+
+        if raise_errors:
+            for r in results:
+                if isinstance(r, KerioApiError):
+                    raise r
+        return results
+
+    def _batch(self, calls: Sequence[Tuple[str, Optional[Dict[str, Any]]]], token: str) -> List[Any]:
+        ids = [next(self._ids) for _ in calls]
+        payload = [
+            {"jsonrpc": "2.0", "id": rpc_id, "method": method, "params": params or {}}
+            for rpc_id, (method, params) in zip(ids, calls)
+        ]
+        data = self._post(payload, token)
+        if isinstance(data, dict):
+            # ошибка на весь пакет (например, неверный токен) приходит одним объектом
+            error = _api_error(data.get("error") or {"message": f"Unexpected batch response: {data}"})
+            return [error for _ in calls]
+
+        by_id = {item.get("id"): item for item in data}
+        results: List[Any] = []
+        for rpc_id in ids:
+            item = by_id.get(rpc_id)
+            if item is None:
+                results.append(KerioApiError({"message": f"No response for batch id {rpc_id}"}))
+            elif "error" in item:
+                results.append(_api_error(item["error"]))
+            else:
+                results.append(item.get("result", {}))
+        return results
+
+
+_client_lock = threading.Lock()
+_client: Dict[str, Any] = {"pid": None, "client": None}
+
+
+def get_kerio_client() -> KerioOperatorClient:
+    """
+    Общий клиент процесса. После fork (gunicorn --preload) создаётся заново:
+    сокеты родителя дочернему процессу не годятся.
+    """
+    pid = os.getpid()
+    with _client_lock:
+        if _client["client"] is None or _client["pid"] != pid:
+            _client["client"] = KerioOperatorClient()
+            _client["pid"] = pid
+        return _client["client"]
+
+
+def reset_kerio_client() -> None:
+    with _client_lock:
+        client = _client["client"]
+        _client["client"] = None
+        _client["pid"] = None
+    if client is not None:
+        client.sess.close()
@@ -0,0 +1,242 @@
+# apps/telephony/kerio_fake.py
+#
+# Локальный фейковый Kerio Operator (JSON-RPC поверх HTTP/1.1 с keep-alive) —
+# для проверок клиента и синхронизации без настоящей АТС.
+#
+# Поддерживает Session.login/logout, Users.get/create, Extensions.get/create
+# и batch-запросы. Считает HTTP-соединения, запросы, вызовы методов и логины;
+# expire_tokens() имитирует истёкшую сессию, fail_next_requests(n) — отказ шлюза (502),
+# fail_next_requests(n, status=401) — отказ по HTTP-статусу авторизации.
+#
+#     with FakeKerioServer(users=500) as server:
+#         client = KerioOperatorClient(server.url, "admin", "secret")
+from __future__ import annotations
+
+import itertools
+import json
+import secrets
+import threading
+import time
+
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+SESSION_EXPIRED = {"code": -32001, "message": "Session expired."}
+METHOD_NOT_FOUND = -32601
+ALREADY_EXISTS = 1000
+NOT_FOUND = 1001
+
+
+class _FakeKerioError(Exception):
+    def __init__(self, code: int, message: str):
+        self.code = code
+        self.message = message
+
+
+class FakeKerioServer:
+    def __init__(
+        self,
+        *,
+        users: int = 0,
+        username: str = "admin",
+        password: str = "secret",
+        latency: float = 0.0,
+        first_extension: int = 100,
+    ) -> None:
+        self.username = username
+        self.password = password
+        self.latency = latency
+
+        self._lock = threading.Lock()
+        self._guids = itertools.count(1)
+        self.users: Dict[int, Dict[str, Any]] = {}
+        self.extensions: Dict[str, Dict[str, Any]] = {}
+        self.tokens: set[str] = set()
+
+        self.connections = 0
+        self.http_requests = 0
+        self.calls: Counter = Counter()
+        self._fail_requests = 0
+        self._fail_status = 502
+
+        for i in range(users):
+            tel_num = str(first_extension + i)
+            self._create_extension({"telNum": tel_num, "description": ""})
+            self._create_user({
+                "USERNAME": f"user{i:05d}",
+                "FULL_NAME": f"Kerio User {i:05d}",
+                "EXTENSIONS": [{"TEL_NUM": tel_num, "IS_PRIMARY": True}],
+            })
+
+        self._httpd: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    # ---------------- жизненный цикл ----------------
+
+    def start(self) -> "FakeKerioServer":
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive
+
+            def setup(self):
+                super().setup()
+                with server._lock:
+                    server.connections += 1
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                status, payload = server.handle(body, self.headers.get("X-Token"))
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fake-kerio", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def __enter__(self) -> "FakeKerioServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/admin/api/jsonrpc/"
+
+    # ---------------- управление ----------------
+
+    def expire_tokens(self) -> None:
+        with self._lock:
+            self.tokens.clear()
+
+    def fail_next_requests(self, count: int = 1, *, status: int = 502) -> None:
+        with self._lock:
+            self._fail_requests += count
+            self._fail_status = status
+
+    def reset_counters(self) -> None:
+        with self._lock:
+            self.connections = 0
+            self.http_requests = 0
+            self.calls.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "connections": self.connections,
+                "http_requests": self.http_requests,
+                "logins": self.calls["Session.login"],
+                "calls": sum(self.calls.values()),
+            }
+
+    # ---------------- обработка ----------------
+
+    def handle(self, body: bytes, token: Optional[str]) -> tuple[int, Any]:
+        if self.latency:
+            time.sleep(self.latency)
+
+        with self._lock:
+            self.http_requests += 1
+            if self._fail_requests:
+                self._fail_requests -= 1
+                return self._fail_status, {"error": "bad gateway" if self._fail_status == 502 else "unauthorized"}
+
+            request = json.loads(body or b"{}")
+            if isinstance(request, list):
+                return 200, [self._dispatch(item, token) for item in request]
+            return 200, self._dispatch(request, token)
+
+    def _dispatch(self, request: Dict[str, Any], token: Optional[str]) -> Dict[str, Any]:
+        method = request.get("method") or ""
+        params = request.get("params") or {}
+        rpc_id = request.get("id")
+        self.calls[method] += 1
+
+        if method != "Session.login" and token not in self.tokens:
+            return {"jsonrpc": "2.0", "id": rpc_id, "error": SESSION_EXPIRED}
+
+        handler = {
+            "Session.login": self._login,
+            "Session.logout": lambda p: self.tokens.discard(token) or {},
+            "Users.get": lambda p: {"userList": self._user_list(), "totalItems": len(self.users)},
+            "Users.create": lambda p: self._create_user(p.get("detail") or {}),
+            "Extensions.get": lambda p: {"extensionList": list(self.extensions.values())},
+            "Extensions.create": lambda p: self._create_extension(p.get("detail") or {}),
+        }.get(method)
+        if handler is None:
+            return {"jsonrpc": "2.0", "id": rpc_id, "error": {"code": METHOD_NOT_FOUND, "message": "Method not found"}}
+
+        try:
+            result = handler(params)
+        except _FakeKerioError as exc:
+            return {"jsonrpc": "2.0", "id": rpc_id, "error": {"code": exc.code, "message": exc.message}}
+        return {"jsonrpc": "2.0", "id": rpc_id, "result": result}
+
+    def _login(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        if params.get("userName") != self.username or params.get("password") != self.password:
+            raise _FakeKerioError(-32000, "Invalid user name or password.")
+        token = secrets.token_hex(16)
+        self.tokens.add(token)
+        return {"token": token}
+
+    def _user_list(self) -> List[Dict[str, Any]]:
+        return sorted(self.users.values(), key=lambda u: u["USERNAME"])
+
+    def _create_extension(self, detail: Dict[str, Any]) -> Dict[str, Any]:
+        tel_num = str(detail.get("telNum") or "").strip()
+        if not tel_num:
+            raise _FakeKerioError(NOT_FOUND, "telNum is required.")
+        if tel_num in self.extensions:
+            raise _FakeKerioError(ALREADY_EXISTS, f"Extension {tel_num} already exists.")
+        guid = next(self._guids)
+        self.extensions[tel_num] = {
+            "guid": guid,
+            "telNum": tel_num,
+            "userGuid": None,
+            "description": detail.get("description") or "",
+        }
+        return {"guid": guid}
+
+    def _create_user(self, detail: Dict[str, Any]) -> Dict[str, Any]:
+        username = (detail.get("USERNAME") or "").strip()
+        if any(u["USERNAME"] == username for u in self.users.values()):
+            raise _FakeKerioError(ALREADY_EXISTS, f"User {username} already exists.")
+
+        exts = detail.get("EXTENSIONS") or []
+        for e in exts:
+            ext = self.extensions.get(str(e.get("TEL_NUM") or ""))
+            if ext is None:
+                raise _FakeKerioError(NOT_FOUND, f"Extension {e.get('TEL_NUM')} does not exist.")
+            if ext["userGuid"] is not None:
+                raise _FakeKerioError(ALREADY_EXISTS, f"Extension {ext['telNum']} is already assigned.")
+
+        guid = next(self._guids)
+        for e in exts:
+            self.extensions[str(e["TEL_NUM"])]["userGuid"] = guid
+        self.users[guid] = {
+            "GUID": guid,
+            "USERNAME": username,
+            "FULL_NAME": detail.get("FULL_NAME") or "",
+            "EMAIL": detail.get("EMAIL") or "",
+            "DISABLED": bool(detail.get("DISABLED")),
+            "EXTENSIONS": [{"TEL_NUM": str(e["TEL_NUM"]), "IS_PRIMARY": bool(e.get("IS_PRIMARY"))} for e in exts],
+        }
+        return {"GUID": guid}
@@ -0,0 +1,69 @@
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from apps.telephony.kerio_client import KerioOperatorClient
+from apps.telephony.kerio_fake import FakeKerioServer
+
+_USERS_GET = ("Users.get", {"query": {"start": 0, "limit": -1}})
+_EXTENSIONS_GET = ("Extensions.get", {"query": {"start": 0, "limit": -1}})
+
+
+class Command(BaseCommand):
+    help = (
+        "Kerio client against a local fake Kerio server: client per call vs shared client, "
+        "threads, batch. Does not touch a real PBX or the database. "
+        "Re-login behaviour is covered by apps.telephony tests."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=500, help="Users on the fake server")
+        parser.add_argument("--calls", type=int, default=50)
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument("--latency-ms", type=float, default=5.0, help="Fake server latency per HTTP request")
+
+    def handle(self, *args, **options):
+        with FakeKerioServer(users=options["users"], latency=options["latency_ms"] / 1000) as server:
+            def client():
+                return KerioOperatorClient(server.url, server.username, server.password, verify_ssl=False)
+
+            calls = options["calls"]
+
+            self._measure(server, "client per call", lambda: [client().call(*_USERS_GET) for _ in range(calls)])
+
+            shared = client()
+            self._measure(server, "shared client", lambda: [shared.call(*_USERS_GET) for _ in range(calls)])
+
+            threaded = client()
+            with ThreadPoolExecutor(max_workers=options["threads"]) as pool:
+                self._measure(
+                    server,
+                    f"shared, {options['threads']} threads",
+                    lambda: list(pool.map(lambda _: threaded.call(*_USERS_GET), range(calls))),
+                )
+
+            self._measure(
+                server,
+                "users+extensions x2",
+                lambda: [(shared.call(*_USERS_GET), shared.call(*_EXTENSIONS_GET)) for _ in range(calls)],
+            )
+            self._measure(
+                server,
+                "users+extensions batch",
+                lambda: [shared.call_batch([_USERS_GET, _EXTENSIONS_GET]) for _ in range(calls)],
+            )
+
+        self.stdout.write(self.style.SUCCESS("Done"))
+
+    def _measure(self, server: FakeKerioServer, label: str, run) -> None:
+        server.reset_counters()
+        started = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - started
+        s = server.stats()
+        self.stdout.write(
+            f"{label:>24}: {elapsed:6.2f}s, http {s['http_requests']:>4}, "
+            f"connections {s['connections']:>4}, logins {s['logins']:>4}"
+        )
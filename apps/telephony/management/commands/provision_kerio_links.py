@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.telephony.models import TelephonyLink
+from apps.telephony.provisioning import failed_link_ids, provision_links
+
+
+class Command(BaseCommand):
+    help = (
+        "Create employees in Kerio in bulk (extension + user) through a thread pool sharing one client. "
+        "Already linked links are skipped; results are stored on TelephonyLink.provision_status."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--id", type=int, action="append", dest="ids", default=None, help="TelephonyLink id")
+        parser.add_argument("--department", type=int, default=None, help="All unlinked employees of a department")
+        parser.add_argument("--failed", action="store_true", help="Retry links whose last attempt failed")
+        parser.add_argument("--workers", type=int, default=None)
+
+    def handle(self, *args, **opts):
+        ids = list(opts["ids"] or [])
+        if opts["department"]:
+            ids += TelephonyLink.objects.filter(
+                employee__department_id=opts["department"],
+                employee__is_active=True,
+                kerio_guid__isnull=True,
+            ).values_list("pk", flat=True)
+        if opts["failed"]:
+            ids += failed_link_ids()
+        if not ids:
+            raise CommandError("Nothing to provision: pass --id, --department or --failed.")
+
+        ids = sorted(set(ids))
+        self.stdout.write(f"Provisioning {len(ids)} links...")
+        res = provision_links(ids, workers=opts["workers"])
+
+        for link in TelephonyLink.objects.filter(pk__in=ids, provision_status=TelephonyLink.ProvisionStatus.FAILED):
+            self.stdout.write(f"  failed #{link.pk} ext {link.extension or '-'}: {link.provision_error}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Done. done={res['done']} skipped={res['skipped']} failed={res['failed']}"
+        ))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from apps.telephony.snapshot import refresh_kerio_snapshot
+
+
+class Command(BaseCommand):
+    help = "Refresh the stored Kerio users/extensions snapshot (for cron; pages only read it)."
+
+    def handle(self, *args, **opts):
+        snapshot = refresh_kerio_snapshot()
+        if snapshot is None:
+            self.stdout.write(self.style.WARNING("Refresh is already running elsewhere, skipped."))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"Done. users={len(snapshot.users)} extensions={len(snapshot.extensions)} "
+            f"duration_ms={snapshot.duration_ms}"
+        ))
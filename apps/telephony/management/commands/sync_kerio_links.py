@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.telephony.sync import run_kerio_sync
+
+
+class Command(BaseCommand):
+    help = "Sync TelephonyLink with Kerio users (full diff, one bulk_update, recorded as KerioSyncRun)."
+
+    def handle(self, *args, **opts):
+        try:
+            run = run_kerio_sync()
+        except Exception as exc:
+            raise CommandError(f"Kerio sync failed: {exc}") from exc
+
+        if run is None:
+            self.stdout.write(self.style.WARNING("Another sync run is in progress, skipped."))
+            return
+
+        self.stdout.write(
+            f"kerio_users={run.kerio_users} links={run.links_total} linked={run.linked} matched={run.matched} "
+            f"updated={run.updated} disabled={run.disabled} missing_in_kerio={run.missing_in_kerio} "
+            f"unlinked_kerio_users={run.unlinked_kerio_users} conflicts={run.conflicts}"
+        )
+        for item in run.details.get("missing_in_kerio", []):
+            self.stdout.write(f"  missing in Kerio: {item['name']} (ext {item['extension'] or '-'})")
+        for item in run.details.get("conflicts", []):
+            self.stdout.write(f"  conflict: {item['name']} -> GUID {item['kerio_guid']} is linked elsewhere")
+        self.stdout.write(self.style.SUCCESS(f"Done in {run.duration_ms} ms (run #{run.pk})."))
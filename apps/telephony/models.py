@@ -1,7 +1,13 @@
+from django.conf import settings
 from django.db import models
 from django.utils.translation import gettext_lazy as _
 
 class TelephonyLink(models.Model):
+    class ProvisionStatus(models.TextChoices):
+        DONE = "done", _("Создан в Kerio")
+        SKIPPED = "skipped", _("Пропущен")
+        FAILED = "failed", _("Ошибка")
+
     employee = models.OneToOneField(
         "agency.Employee",
         on_delete=models.CASCADE,
@@ -27,9 +33,100 @@ class TelephonyLink(models.Model):
     sip_password_last4 = models.CharField(_("SIP пароль (последние 4)"), max_length=4, blank=True)
     sip_password_set_at = models.DateTimeField(_("SIP пароль установлен"), null=True, blank=True)
 
+    # последняя попытка создать сотрудника в Kerio (apps/telephony/provisioning.py)
+    provision_status = models.CharField(
+        _("Создание в Kerio"), max_length=16, choices=ProvisionStatus.choices, blank=True, db_index=True
+    )
+    provision_error = models.TextField(_("Ошибка создания в Kerio"), blank=True)
+    provision_attempted_at = models.DateTimeField(_("Попытка создания в Kerio"), null=True, blank=True)
+
     class Meta:
         verbose_name = _("Связка с телефонией")
         verbose_name_plural = _("Связки с телефонией")
 
     def __str__(self):
         return f"{self.employee_id} -> {self.kerio_guid or '-'}"
+
+
+class KerioSnapshot(models.Model):
+    """
+    Одна строка (pk=1): последний снимок пользователей и внутренних номеров Kerio.
+    Справочник отдаётся из снимка сразу, устаревший снимок обновляется в фоне
+    (apps/telephony/snapshot.py).
+    """
+    users = models.JSONField(_("Пользователи Kerio"), default=list, blank=True)
+    extensions = models.JSONField(_("Внутренние номера Kerio"), default=list, blank=True)
+    fetched_at = models.DateTimeField(_("Получен"), null=True, blank=True)
+    duration_ms = models.PositiveIntegerField(_("Длительность загрузки, мс"), default=0)
+
+    # захват фонового обновления (один на все процессы) и последняя ошибка
+    refresh_started_at = models.DateTimeField(_("Обновление начато"), null=True, blank=True)
+    last_error = models.TextField(_("Последняя ошибка"), blank=True)
+    last_error_at = models.DateTimeField(_("Время ошибки"), null=True, blank=True)
+
+    class Meta:
+        verbose_name = _("Снимок Kerio")
+        verbose_name_plural = _("Снимок Kerio")
+
+    def __str__(self):
+        return f"{self.fetched_at or '-'}: {len(self.users)} users, {len(self.extensions)} extensions"
+
+
+class KerioSyncRun(models.Model):
+    """
+    Запуск синхронизации связок с Kerio (apps/telephony/sync.py): счётчики diff,
+    длительность и списки расхождений (details, усечены).
+    """
+
+    class Status(models.TextChoices):
+        RUNNING = "running", _("Выполняется")
+        SUCCESS = "success", _("Успешно")
+        FAILED = "failed", _("Ошибка")
+
+    class Trigger(models.TextChoices):
+        COMMAND = "command", _("Команда / расписание")
+        PANEL = "panel", _("Панель")
+
+    status = models.CharField(_("Статус"), max_length=16, choices=Status.choices, default=Status.RUNNING, db_index=True)
+    trigger = models.CharField(_("Источник"), max_length=16, choices=Trigger.choices, default=Trigger.COMMAND)
+    started_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="+",
+        verbose_name=_("Запустил"),
+    )
+
+    started_at = models.DateTimeField(_("Начало"), auto_now_add=True, db_index=True)
+    finished_at = models.DateTimeField(_("Окончание"), null=True, blank=True)
+    duration_ms = models.PositiveIntegerField(_("Длительность, мс"), default=0)
+
+    kerio_users = models.PositiveIntegerField(_("Пользователей в Kerio"), default=0)
+    links_total = models.PositiveIntegerField(_("Связок"), default=0)
+    linked = models.PositiveIntegerField(_("Связаны"), default=0)
+    matched = models.PositiveIntegerField(_("Сопоставлены по номеру"), default=0)
+    updated = models.PositiveIntegerField(_("Обновлено"), default=0)
+    disabled = models.PositiveIntegerField(_("Отключены в Kerio"), default=0)
+    missing_in_kerio = models.PositiveIntegerField(_("Нет в Kerio"), default=0)
+    unlinked_kerio_users = models.PositiveIntegerField(_("Kerio без сотрудника"), default=0)
+    conflicts = models.PositiveIntegerField(_("Конфликты"), default=0)
+
+    details = models.JSONField(_("Расхождения"), default=dict, blank=True)
+    error = models.TextField(_("Ошибка"), blank=True)
+
+    class Meta:
+        verbose_name = _("Синхронизация Kerio")
+        verbose_name_plural = _("Синхронизации Kerio")
+        ordering = ("-started_at",)
+        constraints = [
+            # один запуск за раз: второй INSERT со status=running падает (sync.start_kerio_sync_run)
+            models.UniqueConstraint(
+                fields=["status"],
+                condition=models.Q(status="running"),
+                name="uniq_kerio_sync_running",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.started_at:%Y-%m-%d %H:%M} {self.status}"
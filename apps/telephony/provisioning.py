@@ -0,0 +1,113 @@
+# apps/telephony/provisioning.py
+#
+# Массовое создание сотрудников в Kerio (новый отдел и т.п.).
+#
+#   - один Extensions.get на всю пачку: существующие номера известны заранее;
+#   - уже привязанные (есть kerio_guid) пропускаются, как и повторный запуск;
+#   - связки без номера, с повторяющимся в пачке номером или с номером, который
+#     уже назначен пользователю Kerio, сразу получают ошибку — без вызовов Kerio;
+#   - остальные создаются в пуле из KERIO_PROVISION_WORKERS потоков через общий
+#     клиент (один логин, get_kerio_client);
+#   - итог каждой связки — в TelephonyLink.provision_status / provision_error,
+#     упавшие повторяются через --failed (manage.py provision_kerio_links).
+from __future__ import annotations
+
+import logging
+
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from .models import TelephonyLink
+from .services import fetch_kerio_extension_numbers, provision_employee_to_kerio
+
+logger = logging.getLogger(__name__)
+
+Status = TelephonyLink.ProvisionStatus
+
+
+def _record(link_id: int, status: str, error: str = "") -> None:
+    TelephonyLink.objects.filter(pk=link_id).update(
+        provision_status=status,
+        provision_error=error[:2000],
+        provision_attempted_at=timezone.now(),
+    )
+
+
+def _provision_one(link: TelephonyLink, existing_extensions: Dict[str, dict]) -> str:
+    try:
+        provision_employee_to_kerio(link, existing_extensions)
+    except Exception as exc:
+        logger.warning("Kerio provisioning failed for link %s: %s", link.pk, exc)
+        _record(link.pk, Status.FAILED, str(exc))
+        return Status.FAILED
+    else:
+        _record(link.pk, Status.DONE)
+        return Status.DONE
+    finally:
+        # поток пула держит своё соединение с БД — закрываем после каждой связки
+        connection.close()
+
+
+def provision_links(link_ids: Iterable[int], *, workers: int | None = None) -> Dict[str, int]:
+    """
+    Возвращает счётчики {"done": n, "skipped": n, "failed": n}.
+    Если не удался общий Extensions.get, ожидающие связки помечаются FAILED
+    и исключение пробрасывается.
+    """
+    links: List[TelephonyLink] = list(
+        TelephonyLink.objects
+        .select_related("employee", "employee__user")
+        .filter(pk__in=list(link_ids))
+        .order_by("pk")
+    )
+    counts: Counter = Counter({Status.DONE: 0, Status.SKIPPED: 0, Status.FAILED: 0})
+    if not links:
+        return dict(counts)
+
+    pending: List[TelephonyLink] = []
+    for link in links:
+        if link.kerio_guid:
+            _record(link.pk, Status.SKIPPED, f"Уже привязан к Kerio (GUID {link.kerio_guid})")
+            counts[Status.SKIPPED] += 1
+        elif not str(link.extension or "").strip():
+            _record(link.pk, Status.FAILED, "Не заполнен внутренний номер")
+            counts[Status.FAILED] += 1
+        else:
+            pending.append(link)
+
+    by_extension = Counter(str(link.extension).strip() for link in pending)
+    duplicates = {ext for ext, n in by_extension.items() if n > 1}
+    if duplicates:
+        for link in [x for x in pending if str(x.extension).strip() in duplicates]:
+            _record(link.pk, Status.FAILED, f"Номер {str(link.extension).strip()} повторяется у нескольких сотрудников")
+            counts[Status.FAILED] += 1
+        pending = [x for x in pending if str(x.extension).strip() not in duplicates]
+
+    if not pending:
+        return dict(counts)
+
+    try:
+        existing_extensions = fetch_kerio_extension_numbers()
+    except Exception as exc:
+        # Kerio недоступен ещё до создания: связки должны попасть под --failed
+        for link in pending:
+            _record(link.pk, Status.FAILED, f"Kerio недоступен: {exc}")
+        raise
+    workers = workers or settings.KERIO_PROVISION_WORKERS
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="kerio-provision") as pool:
+        for status in pool.map(lambda link: _provision_one(link, existing_extensions), pending):
+            counts[status] += 1
+
+    return dict(counts)
+
+
+def failed_link_ids() -> List[int]:
+    return list(
+        TelephonyLink.objects.filter(provision_status=Status.FAILED, kerio_guid__isnull=True)
+        .order_by("pk").values_list("pk", flat=True)
+    )
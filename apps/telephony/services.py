@@ -2,29 +2,32 @@
 from __future__ import annotations
 import secrets
 import string
+from django.db.models import Case, Q, QuerySet, When
+from django.db.models.functions import Lower
 from django.utils import timezone
-from typing import Any, Dict, List
-from .kerio_client import KerioOperatorClient
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterable, List, Tuple
+from .kerio_client import get_kerio_client
 from apps.agency.models import Employee
+from apps.panel.services.image_derivatives import derivative_url
 from .models import TelephonyLink
 
 from .crypto import encrypt_str
 
 
 
-def fetch_kerio_users_with_numbers() -> List[Dict[str, Any]]:
-    api = KerioOperatorClient()
-
-    params = {
-        "query": {
-            "start": 0,
-            "limit": -1,  # как в DevTools: -1 = все
-            "orderBy": [{"columnName": "USERNAME", "direction": "Asc"}],
-        }
+_USERS_GET = ("Users.get", {
+    "query": {
+        "start": 0,
+        "limit": -1,  # как в DevTools: -1 = все
+        "orderBy": [{"columnName": "USERNAME", "direction": "Asc"}],
     }
+})
+_EXTENSIONS_GET = ("Extensions.get", {
+    "query": {"start": 0, "limit": -1, "orderBy": [{"columnName": "telNum", "direction": "Asc"}]}
+})
+
 
-    result = api.call("Users.get", params)
+def _clean_kerio_users(result: Dict[str, Any]) -> List[Dict[str, Any]]:
     user_list = result.get("userList", []) or []
 
     cleaned: List[Dict[str, Any]] = []
@@ -50,51 +53,98 @@ def fetch_kerio_users_with_numbers() -> List[Dict[str, Any]]:
     return cleaned
 
 
-def fetch_kerio_extensions() -> list[dict]:
-    api = KerioOperatorClient()
-    params = {"query": {"start": 0, "limit": -1, "orderBy": [{"columnName": "telNum", "direction": "Asc"}]}}
-    result = api.call("Extensions.get", params)
+def _extension_list(result: Dict[str, Any]) -> list[dict]:
     return result.get("extensionList") or result.get("list") or result.get("extensions") or []
 
 
-def build_directory_rows() -> List[Dict[str, Any]]:
-    # Kerio users -> индексы
-    kerio_items = fetch_kerio_users_with_numbers()
-    by_guid = {x["guid"]: x for x in kerio_items if x.get("guid") is not None}
-    by_ext = {}
-    for x in kerio_items:
-        for n in x.get("numbers") or []:
-            by_ext[str(n).strip()] = x
+def fetch_kerio_users_with_numbers() -> List[Dict[str, Any]]:
+    return _clean_kerio_users(get_kerio_client().call(*_USERS_GET))
+
+
+def fetch_kerio_extensions() -> list[dict]:
+    return _extension_list(get_kerio_client().call(*_EXTENSIONS_GET))
 
-    rows: List[Dict[str, Any]] = []
 
-    employees = (
+def fetch_kerio_directory() -> Tuple[List[Dict[str, Any]], list[dict]]:
+    """
+    Пользователи и внутренние номера одним batch-запросом.
+    """
+    users, extensions = get_kerio_client().call_batch([_USERS_GET, _EXTENSIONS_GET])
+    return _clean_kerio_users(users), _extension_list(extensions)
+
+
+def directory_employees_qs(
+    index,
+    *,
+    q: str = "",
+    department_id: int | None = None,
+    extension: str = "",
+    status: str = "",
+) -> QuerySet:
+    """
+    Активные сотрудники справочника с фильтрами на стороне БД.
+    index — KerioSnapshotIndex (apps/telephony/snapshot.py): статус "отключён"
+    фильтруется по множествам отключённых GUID / номеров из снимка.
+    q делится на слова, каждое ищется в ФИО, логине, номерах.
+    status: "" | "active" | "disabled".
+    """
+    qs = (
         Employee.objects
-        .select_related("user", "department", "position")
-        .prefetch_related("telephony_link")
+        .select_related("user", "department", "position", "telephony_link")
         .filter(is_active=True)
     )
 
+    # "Иван Петров": каждое слово должно найтись хотя бы в одном из полей
+    words = Q()
+    for word in q.split():
+        words &= (
+            Q(last_name__icontains=word)
+            | Q(first_name__icontains=word)
+            | Q(middle_name__icontains=word)
+            | Q(user__username__icontains=word)
+            | Q(telephony_link__extension__startswith=word)
+            | Q(mobile_phone__icontains=word)
+        )
+    if words:
+        qs = qs.filter(words)
+    if department_id:
+        qs = qs.filter(department_id=department_id)
+    if extension:
+        qs = qs.filter(telephony_link__extension__startswith=extension)
+
+    if status in ("active", "disabled"):
+        # как KerioSnapshotIndex.lookup: по GUID, а если GUID нет в снимке — по номеру
+        disabled = Q(telephony_link__kerio_guid__in=index.disabled_guids) | (
+            Q(telephony_link__extension__in=index.disabled_exts)
+            & ~Q(telephony_link__kerio_guid__in=list(index.by_guid))
+        )
+        qs = qs.filter(disabled) if status == "disabled" else qs.exclude(disabled)
+
+    # пустые фамилии — в конец, как раньше при сортировке в Python
+    return qs.order_by(
+        Case(When(last_name__gt="", then=0), default=1),
+        Lower("last_name"),
+        Lower("first_name"),
+        "pk",
+    )
+
+
+def build_directory_rows(employees: Iterable[Employee], index) -> List[Dict[str, Any]]:
+    """
+    Строки таблицы только для текущей страницы; статус Kerio — из индекса снимка.
+    """
+    rows: List[Dict[str, Any]] = []
     for emp in employees:
         link = getattr(emp, "telephony_link", None)
 
         extension = (link.extension if link else "") or ""
         kerio_guid = link.kerio_guid if link else None
-
-        kerio = None
-        if kerio_guid:
-            kerio = by_guid.get(kerio_guid)
-        if kerio is None and extension:
-            kerio = by_ext.get(str(extension).strip())
-
-        kerio_disabled = bool(kerio.get("disabled")) if kerio else False
-
-        full_name = emp.user.get_full_name().strip() or emp.user.get_username()
+        kerio = index.lookup(kerio_guid, extension)
 
         rows.append({
             "employee_id": emp.id,
-            "photo": emp.photo.url if emp.photo else "",
-            "full_name": full_name,
+            "photo": derivative_url(emp.photo.name, "sm") if emp.photo else "",
+            "full_name": emp.user.get_full_name().strip() or emp.user.get_username(),
             "display_name": emp.display_name,
             "department": emp.department,
             "position": emp.position,
@@ -102,12 +152,9 @@ def build_directory_rows() -> List[Dict[str, Any]]:
             "email": emp.email or emp.user.email or "",
             "extension": extension,
             "kerio_guid": kerio_guid,
-            "kerio_disabled": kerio_disabled,
+            "kerio_disabled": bool(kerio.get("disabled")) if kerio else False,
             "sip_last4": getattr(link, "sip_password_last4", "") if link else "",
         })
-
-    # сортировка по ФИО
-    rows.sort(key=lambda x: (x["full_name"] == "", x["full_name"].lower()))
     return rows
 
 
@@ -116,7 +163,7 @@ def _gen_password(length: int = 16) -> str:
     return "".join(secrets.choice(alphabet) for _ in range(length))
 
 def kerio_create_extension(tel_num: str) -> dict:
-    api = KerioOperatorClient()
+    api = get_kerio_client()
 
     tel_num = str(tel_num).strip()
 
@@ -156,7 +203,7 @@ def kerio_create_user_with_extension(link: TelephonyLink) -> dict:
     pin = "".join(secrets.choice(string.digits) for _ in range(4))
     user_password = _gen_password(10) + "+1"  # Kerio любит спец-символы, ты уже видел "+"
 
-    api = KerioOperatorClient()
+    api = get_kerio_client()
 
     params = {
         "detail": {
@@ -206,12 +253,21 @@ def kerio_create_user_with_extension(link: TelephonyLink) -> dict:
     return {"kerio_guid": link.kerio_guid, "kerio_username": link.kerio_username}
 
 
-def provision_employee_to_kerio(link: TelephonyLink) -> dict:
+def fetch_kerio_extension_numbers() -> Dict[str, Dict[str, Any]]:
+    """
+    {внутренний номер: extension} — один Extensions.get перед созданием сотрудников.
+    """
+    return {str(e.get("telNum") or "").strip(): e for e in fetch_kerio_extensions() if e.get("telNum")}
+
+
+def provision_employee_to_kerio(link: TelephonyLink, existing_extensions: Dict[str, Dict[str, Any]] | None = None) -> dict:
     """
     Полный PUSH:
-    - если нет extension в Kerio, создаём его (Extensions.create)
+    - если нет extension в Kerio, создаём его (Extensions.create, SIP-пароль сохраняем у себя)
     - создаём пользователя и назначаем extension (Users.create)
     - сохраняем GUID у себя
+
+    existing_extensions — результат fetch_kerio_extension_numbers(), общий для пачки связок.
     """
     if link.kerio_guid:
         return {"status": "already_linked", "kerio_guid": link.kerio_guid}
@@ -220,13 +276,16 @@ def provision_employee_to_kerio(link: TelephonyLink) -> dict:
     if not ext:
         raise RuntimeError("Заполни внутренний номер (TelephonyLink.extension)")
 
-    # попробуем создать extension; если уже существует, Kerio вернёт error
-    # тогда можно либо ловить конкретный код ошибки, либо перед этим сделать Extensions.get и проверить.
-    try:
-        kerio_create_extension(ext)
-    except Exception:
-        # если номер уже существует — ок, идём дальше
-        pass
+    if existing_extensions is None:
+        existing_extensions = fetch_kerio_extension_numbers()
+
+    existing = existing_extensions.get(ext)
+    if existing is None:
+        kerio_create_extension_for_link(link)
+    elif existing.get("userGuid"):
+        raise RuntimeError(
+            f"Номер {ext} уже назначен пользователю Kerio (GUID {existing['userGuid']}) — запусти синхронизацию"
+        )
 
     return kerio_create_user_with_extension(link)
 
@@ -253,60 +312,16 @@ def kerio_create_extension_for_link(link: TelephonyLink) -> dict:
         }
     }
 
-    api = KerioOperatorClient()
+    # шифруем до создания: без ключа номер не должен появиться в Kerio с потерянным паролем
+    sip_password_enc = encrypt_str(sip_password)
+
+    api = get_kerio_client()
     api.call("Extensions.create", params)
 
     link.sip_username = tel_num
-    link.sip_password_enc = encrypt_str(sip_password)
+    link.sip_password_enc = sip_password_enc
     link.sip_password_last4 = sip_password[-4:]
     link.sip_password_set_at = timezone.now()
     link.save(update_fields=["sip_username", "sip_password_enc", "sip_password_last4", "sip_password_set_at"])
 
     return {"sip_username": tel_num, "sip_password": sip_password}
-
-
-def pull_sync_kerio_links() -> dict:
-    """
-    PULL: обновляет kerio_guid/kerio_username/kerio_disabled по extension или по guid.
-    """
-    kerio_items = fetch_kerio_users_with_numbers()
-
-    # index by guid and by extension
-    by_guid = {x["guid"]: x for x in kerio_items if x.get("guid") is not None}
-    by_ext = {}
-    for x in kerio_items:
-        for n in x.get("numbers") or []:
-            by_ext[str(n).strip()] = x
-
-    updated = 0
-    now = timezone.now()
-
-    for link in TelephonyLink.objects.select_related("employee", "employee__user"):
-        src = None
-        if link.kerio_guid:
-            src = by_guid.get(link.kerio_guid)
-
-        if src is None and link.extension:
-            src = by_ext.get(str(link.extension).strip())
-
-        if src is None:
-            continue
-
-        changed = False
-        if not link.kerio_guid and src.get("guid") is not None:
-            link.kerio_guid = int(src["guid"]); changed = True
-        if src.get("username") and link.kerio_username != src["username"]:
-            link.kerio_username = src["username"]; changed = True
-
-        kerio_disabled = bool(src.get("disabled", False))
-        if link.kerio_disabled != kerio_disabled:
-            link.kerio_disabled = kerio_disabled; changed = True
-
-        if changed:
-            link.last_sync_at = now
-            link.save(update_fields=["kerio_guid", "kerio_username", "kerio_disabled", "last_sync_at"])
-            updated += 1
-
-    return {"updated": updated, "total": len(kerio_items)}
-
-
@@ -0,0 +1,204 @@
+# apps/telephony/snapshot.py
+#
+# Снимок Kerio (KerioSnapshot, pk=1): пользователи с номерами и внутренние номера.
+#
+# Справочник и API номеров читают только снимок — без логина и Users.get на каждый
+# рендер. Снимок старше KERIO_SNAPSHOT_MAX_AGE_MINUTES обновляется в фоновом потоке;
+# запрос, заметивший это, отдаёт старые данные сразу. Обновление одно на все процессы:
+# его "захватывают" условным UPDATE по refresh_started_at, зависший захват
+# истекает через KERIO_SNAPSHOT_REFRESH_TIMEOUT_SECONDS. После ошибки повтор
+# не раньше чем через KERIO_SNAPSHOT_RETRY_SECONDS.
+#
+# Для справочника снимок индексируется один раз на процесс (kerio_snapshot_index):
+# GUID / номер -> пользователь Kerio, множества отключённых GUID и номеров.
+# Индекс перестраивается, только когда меняется fetched_at.
+#
+# По расписанию: manage.py refresh_kerio_snapshot.
+from __future__ import annotations
+
+import logging
+import threading
+import time
+
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import KerioSnapshot
+from .services import fetch_kerio_directory
+
+logger = logging.getLogger(__name__)
+
+
+def _clean_extension(e: Dict[str, Any]) -> Dict[str, Any]:
+    # в снимок не попадают SIP-пароли и прочие детали номера
+    return {
+        "guid": e.get("guid") or e.get("GUID"),
+        "tel_num": str(e.get("telNum") or e.get("TEL_NUM") or "").strip(),
+        "user_guid": e.get("userGuid"),
+        "description": (e.get("description") or "").strip(),
+    }
+
+
+def get_kerio_snapshot(*, force_refresh: bool = False) -> KerioSnapshot:
+    """
+    Текущий снимок (пустой, если Kerio ещё ни разу не опрашивался).
+    Устаревший снимок или force_refresh — запускает фоновое обновление.
+    """
+    # users/extensions (большие JSON) подгружаются только при обращении к ним
+    snapshot = KerioSnapshot.objects.defer("users", "extensions").filter(pk=1).first() or KerioSnapshot(pk=1)
+    if (force_refresh or needs_refresh(snapshot)) and schedule_kerio_snapshot_refresh():
+        snapshot.refresh_started_at = timezone.now()
+    return snapshot
+
+
+def needs_refresh(snapshot: KerioSnapshot) -> bool:
+    now = timezone.now()
+    if snapshot.refresh_started_at and not _refresh_expired(snapshot.refresh_started_at, now):
+        return False
+    if snapshot.last_error_at and now - snapshot.last_error_at < timedelta(seconds=settings.KERIO_SNAPSHOT_RETRY_SECONDS):
+        return False
+    if snapshot.fetched_at is None:
+        return True
+    return now - snapshot.fetched_at > timedelta(minutes=settings.KERIO_SNAPSHOT_MAX_AGE_MINUTES)
+
+
+def snapshot_status(snapshot: KerioSnapshot) -> Dict[str, Any]:
+    """
+    Для шаблона и JSON: возраст снимка, идёт ли обновление, последняя ошибка.
+    """
+    now = timezone.now()
+    age = int((now - snapshot.fetched_at).total_seconds()) if snapshot.fetched_at else None
+    refreshing = bool(snapshot.refresh_started_at) and not _refresh_expired(snapshot.refresh_started_at, now)
+    return {
+        "fetched_at": snapshot.fetched_at,
+        "age_seconds": age,
+        "stale": age is None or age > settings.KERIO_SNAPSHOT_MAX_AGE_MINUTES * 60,
+        "refreshing": refreshing,
+        "error": snapshot.last_error if snapshot.last_error_at else "",
+    }
+
+
+def _refresh_expired(started_at, now) -> bool:
+    return now - started_at > timedelta(seconds=settings.KERIO_SNAPSHOT_REFRESH_TIMEOUT_SECONDS)
+
+
+def _claim_refresh() -> bool:
+    now = timezone.now()
+    KerioSnapshot.objects.get_or_create(pk=1)
+    cutoff = now - timedelta(seconds=settings.KERIO_SNAPSHOT_REFRESH_TIMEOUT_SECONDS)
+    return bool(
+        KerioSnapshot.objects
+        .filter(pk=1)
+        .filter(Q(refresh_started_at__isnull=True) | Q(refresh_started_at__lt=cutoff))
+        .update(refresh_started_at=now)
+    )
+
+
+def _refresh_claimed() -> KerioSnapshot:
+    started = time.monotonic()
+    try:
+        users, extensions = fetch_kerio_directory()
+        extensions = [_clean_extension(e) for e in extensions]
+    except Exception as exc:
+        KerioSnapshot.objects.filter(pk=1).update(
+            refresh_started_at=None,
+            last_error=str(exc)[:2000],
+            last_error_at=timezone.now(),
+        )
+        raise
+
+    KerioSnapshot.objects.filter(pk=1).update(
+        users=users,
+        extensions=extensions,
+        fetched_at=timezone.now(),
+        duration_ms=int((time.monotonic() - started) * 1000),
+        refresh_started_at=None,
+        last_error="",
+        last_error_at=None,
+    )
+    return KerioSnapshot.objects.get(pk=1)
+
+
+def refresh_kerio_snapshot() -> KerioSnapshot | None:
+    """
+    Синхронное обновление (команда, cron). None — обновление уже идёт в другом месте.
+    """
+    if not _claim_refresh():
+        return None
+    return _refresh_claimed()
+
+
+def _refresh_in_background() -> None:
+    try:
+        snapshot = _refresh_claimed()
+        logger.info("Kerio snapshot refreshed: %s users in %s ms", len(snapshot.users), snapshot.duration_ms)
+    except Exception:
+        logger.exception("Kerio snapshot refresh failed")
+    finally:
+        connections.close_all()
+
+
+def schedule_kerio_snapshot_refresh() -> bool:
+    """
+    False — обновление уже идёт (в этом или другом процессе).
+    """
+    if not _claim_refresh():
+        return False
+    threading.Thread(target=_refresh_in_background, name="kerio-snapshot", daemon=True).start()
+    return True
+
+
+
+@dataclass
+class KerioSnapshotIndex:
+    fetched_at: Optional[datetime] = None
+    by_guid: Dict[int, Dict[str, Any]] = field(default_factory=dict)
+    by_ext: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    disabled_guids: set = field(default_factory=set)
+    disabled_exts: set = field(default_factory=set)
+
+    def lookup(self, kerio_guid: Optional[int], extension: str) -> Optional[Dict[str, Any]]:
+        """
+        Пользователь Kerio для связки: по GUID, иначе по внутреннему номеру.
+        """
+        kerio = self.by_guid.get(kerio_guid) if kerio_guid else None
+        if kerio is None and extension:
+            kerio = self.by_ext.get(str(extension).strip())
+        return kerio
+
+
+def build_kerio_snapshot_index(users: List[Dict[str, Any]], fetched_at: Optional[datetime] = None) -> KerioSnapshotIndex:
+    index = KerioSnapshotIndex(fetched_at=fetched_at)
+    for x in users:
+        numbers = [str(n).strip() for n in x.get("numbers") or []]
+        if x.get("guid") is not None:
+            index.by_guid[x["guid"]] = x
+        for n in numbers:
+            index.by_ext[n] = x
+        if x.get("disabled"):
+            if x.get("guid") is not None:
+                index.disabled_guids.add(x["guid"])
+            index.disabled_exts.update(numbers)
+    return index
+
+
+_index_lock = threading.Lock()
+_index: Dict[str, Any] = {"index": None}
+
+
+def kerio_snapshot_index(snapshot: KerioSnapshot) -> KerioSnapshotIndex:
+    with _index_lock:
+        index = _index["index"]
+        if index is not None and index.fetched_at == snapshot.fetched_at:
+            return index
+
+    index = build_kerio_snapshot_index(snapshot.users or [], snapshot.fetched_at)
+    with _index_lock:
+        _index["index"] = index
+    return index
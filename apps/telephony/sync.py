@@ -0,0 +1,216 @@
+# apps/telephony/sync.py
+#
+# Синхронизация TelephonyLink с пользователями Kerio.
+#
+# Diff считается целиком в памяти (compute_kerio_link_diff): связаны по GUID,
+# впервые сопоставлены по внутреннему номеру, отключены в Kerio, сотрудники, которых
+# нет в Kerio, пользователи Kerio без сотрудника, конфликты (GUID уже занят другой
+# связкой). Изменения применяются одним bulk_update, итог пишется в KerioSyncRun.
+#
+# Запуск: manage.py sync_kerio_links (по расписанию); кнопка в панели только
+# создаёт запуск и выполняет его в фоновом потоке. Одновременно выполняется
+# один запуск; "running" старше KERIO_SYNC_STALE_SECONDS считается брошенным.
+from __future__ import annotations
+
+import logging
+import threading
+import time
+
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from django.db import IntegrityError, connections, transaction
+from django.utils import timezone
+
+from .models import KerioSyncRun, TelephonyLink
+from .services import fetch_kerio_users_with_numbers
+
+logger = logging.getLogger(__name__)
+
+SYNC_FIELDS = ["kerio_guid", "kerio_username", "kerio_disabled", "last_sync_at"]
+# сколько расхождений каждого вида хранить в KerioSyncRun.details
+DETAILS_LIMIT = 200
+
+
+@dataclass
+class KerioLinkDiff:
+    changed: List[TelephonyLink] = field(default_factory=list)
+    linked: int = 0
+    matched: int = 0
+    disabled: int = 0
+    not_configured: int = 0
+    missing_in_kerio: List[Dict[str, Any]] = field(default_factory=list)
+    unlinked_kerio_users: List[Dict[str, Any]] = field(default_factory=list)
+    conflicts: List[Dict[str, Any]] = field(default_factory=list)
+
+
+def _link_info(link: TelephonyLink) -> Dict[str, Any]:
+    user = link.employee.user
+    return {
+        "link_id": link.pk,
+        "employee_id": link.employee_id,
+        "name": user.get_full_name().strip() or user.get_username(),
+        "extension": link.extension,
+        "kerio_guid": link.kerio_guid,
+    }
+
+
+def compute_kerio_link_diff(kerio_items: List[Dict[str, Any]], links: List[TelephonyLink], now=None) -> KerioLinkDiff:
+    """
+    Меняет связки в памяти (guid, username, disabled, last_sync_at) и возвращает
+    их в diff.changed — сохранять вызывающему.
+    """
+    now = now or timezone.now()
+    by_guid = {x["guid"]: x for x in kerio_items if x.get("guid") is not None}
+    by_ext = {}
+    for x in kerio_items:
+        for n in x.get("numbers") or []:
+            by_ext[str(n).strip()] = x
+
+    diff = KerioLinkDiff()
+    taken_guids = {link.kerio_guid for link in links if link.kerio_guid}
+    seen_guids = set()
+
+    for link in links:
+        extension = str(link.extension or "").strip()
+        changed = False
+
+        if link.kerio_guid:
+            src = by_guid.get(link.kerio_guid)
+            if src is None:
+                # GUID — главный ключ: пользователь удалён в Kerio, перепривязку по номеру не делаем
+                diff.missing_in_kerio.append(_link_info(link))
+                continue
+            diff.linked += 1
+        elif extension:
+            src = by_ext.get(extension)
+            if src is None or src.get("guid") is None:
+                diff.missing_in_kerio.append(_link_info(link))
+                continue
+            guid = int(src["guid"])
+            if guid in taken_guids:
+                diff.conflicts.append({**_link_info(link), "kerio_guid": guid, "kerio_username": src.get("username")})
+                continue
+            link.kerio_guid = guid
+            taken_guids.add(guid)
+            diff.matched += 1
+            changed = True
+        else:
+            diff.not_configured += 1
+            continue
+
+        seen_guids.add(link.kerio_guid)
+
+        if src.get("username") and link.kerio_username != src["username"]:
+            link.kerio_username = src["username"]
+            changed = True
+
+        kerio_disabled = bool(src.get("disabled", False))
+        if kerio_disabled:
+            diff.disabled += 1
+        if link.kerio_disabled != kerio_disabled:
+            link.kerio_disabled = kerio_disabled
+            changed = True
+
+        if changed:
+            link.last_sync_at = now
+            diff.changed.append(link)
+
+    diff.unlinked_kerio_users = [
+        {"guid": x["guid"], "username": x.get("username"), "full_name": x.get("full_name"), "numbers": x.get("numbers")}
+        for x in kerio_items
+        if x.get("guid") is not None and x["guid"] not in seen_guids and x["guid"] not in taken_guids
+    ]
+    return diff
+
+
+def start_kerio_sync_run(trigger: str = KerioSyncRun.Trigger.COMMAND, user=None) -> Optional[KerioSyncRun]:
+    """
+    None — другой запуск ещё выполняется.
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=settings.KERIO_SYNC_STALE_SECONDS)
+    KerioSyncRun.objects.filter(status=KerioSyncRun.Status.RUNNING, started_at__lt=stale).update(
+        status=KerioSyncRun.Status.FAILED, finished_at=now, error="Abandoned: no result within KERIO_SYNC_STALE_SECONDS",
+    )
+    # select_for_update по running ничего не блокирует, когда запусков нет, — два
+    # одновременных старта (cron + кнопка) прошли бы оба; решает частичный
+    # уникальный индекс uniq_kerio_sync_running
+    try:
+        with transaction.atomic():
+            return KerioSyncRun.objects.create(trigger=trigger, started_by=user)
+    except IntegrityError:
+        return None
+
+
+def execute_kerio_sync_run(run: KerioSyncRun) -> KerioSyncRun:
+    started = time.monotonic()
+    try:
+        kerio_items = fetch_kerio_users_with_numbers()
+        links = list(TelephonyLink.objects.select_related("employee", "employee__user").order_by("pk"))
+        diff = compute_kerio_link_diff(kerio_items, links)
+
+        with transaction.atomic():
+            TelephonyLink.objects.bulk_update(diff.changed, SYNC_FIELDS, batch_size=500)
+
+            run.status = KerioSyncRun.Status.SUCCESS
+            run.kerio_users = len(kerio_items)
+            run.links_total = len(links)
+            run.linked = diff.linked
+            run.matched = diff.matched
+            run.updated = len(diff.changed)
+            run.disabled = diff.disabled
+            run.missing_in_kerio = len(diff.missing_in_kerio)
+            run.unlinked_kerio_users = len(diff.unlinked_kerio_users)
+            run.conflicts = len(diff.conflicts)
+            run.details = {
+                "not_configured": diff.not_configured,
+                "missing_in_kerio": diff.missing_in_kerio[:DETAILS_LIMIT],
+                "unlinked_kerio_users": diff.unlinked_kerio_users[:DETAILS_LIMIT],
+                "conflicts": diff.conflicts[:DETAILS_LIMIT],
+            }
+            _finish(run, started)
+    except Exception as exc:
+        run.status = KerioSyncRun.Status.FAILED
+        run.error = str(exc)[:2000]
+        _finish(run, started)
+        raise
+    return run
+
+
+def _finish(run: KerioSyncRun, started: float) -> None:
+    run.finished_at = timezone.now()
+    run.duration_ms = int((time.monotonic() - started) * 1000)
+    run.save()
+
+
+def run_kerio_sync(trigger: str = KerioSyncRun.Trigger.COMMAND, user=None) -> Optional[KerioSyncRun]:
+    run = start_kerio_sync_run(trigger, user)
+    if run is None:
+        return None
+    return execute_kerio_sync_run(run)
+
+
+def _execute_in_background(run: KerioSyncRun) -> None:
+    try:
+        execute_kerio_sync_run(run)
+    except Exception:
+        logger.exception("Kerio sync run %s failed", run.pk)
+    finally:
+        connections.close_all()
+
+
+def start_kerio_sync_in_background(user=None) -> Optional[KerioSyncRun]:
+    """
+    Для кнопки в панели: запуск создаётся сразу, выполняется в фоновом потоке.
+    """
+    run = start_kerio_sync_run(KerioSyncRun.Trigger.PANEL, user)
+    if run is not None:
+        threading.Thread(target=_execute_in_background, args=(run,), name="kerio-sync", daemon=True).start()
+    return run
+
+
+def last_kerio_sync_run() -> Optional[KerioSyncRun]:
+    return KerioSyncRun.objects.order_by("-started_at").first()
@@ -1,3 +1,159 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+import requests
+
+from django.contrib.auth import get_user_model
+from django.contrib.messages import get_messages
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from apps.agency.models import Employee
+from apps.telephony.kerio_client import KerioApiError, KerioOperatorClient
+from apps.telephony.kerio_fake import FakeKerioServer
+from apps.telephony.models import TelephonyLink
+from apps.telephony.provisioning import failed_link_ids, provision_links
+from apps.telephony.services import build_directory_rows, directory_employees_qs
+from apps.telephony.snapshot import build_kerio_snapshot_index
+
+
+def _employee(username: str, last_name: str, first_name: str, *, extension: str = "", kerio_guid=None) -> Employee:
+    user = get_user_model().objects.create_user(username=username)
+    emp = Employee.objects.create(user=user, last_name=last_name, first_name=first_name, is_active=True)
+    link = emp.telephony_link
+    link.extension = extension
+    link.kerio_guid = kerio_guid
+    link.save()
+    return emp
+
+
+class DirectoryEmployeesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.ivan = _employee("ivanov", "Петров", "Иван", extension="101", kerio_guid=1)
+        cls.petr = _employee("petrov", "Иванов", "Пётр", extension="102", kerio_guid=2)
+        # GUID связки устарел (в снимке его нет) — Kerio находится по номеру
+        cls.stale = _employee("stale", "Сидоров", "Олег", extension="103", kerio_guid=99)
+        cls.no_guid = _employee("noguid", "Козлов", "Антон", extension="104")
+
+        cls.index = build_kerio_snapshot_index([
+            {"guid": 1, "numbers": ["101"], "disabled": False},
+            {"guid": 2, "numbers": ["102"], "disabled": True},
+            {"guid": 3, "numbers": ["103", "104"], "disabled": True},
+        ])
+
+    def _ids(self, **filters):
+        return set(directory_employees_qs(self.index, **filters).values_list("pk", flat=True))
+
+    def test_each_word_of_query_must_match(self):
+        self.assertEqual(self._ids(q="Иван Петров"), {self.ivan.pk})
+        self.assertEqual(self._ids(q="  Петров  Иван "), {self.ivan.pk})
+        self.assertEqual(self._ids(q="Иван"), {self.ivan.pk, self.petr.pk})
+        self.assertEqual(self._ids(q="Иван 102"), {self.petr.pk})
+        self.assertEqual(self._ids(q="Иван Сидоров"), set())
+
+    def test_status_filter_agrees_with_lookup(self):
+        rows = build_directory_rows(directory_employees_qs(self.index), self.index)
+        disabled_in_rows = {row["employee_id"] for row in rows if row["kerio_disabled"]}
+
+        self.assertEqual(disabled_in_rows, {self.petr.pk, self.stale.pk, self.no_guid.pk})
+        self.assertEqual(self._ids(status="disabled"), disabled_in_rows)
+        self.assertEqual(self._ids(status="active"), {self.ivan.pk})
+
+
+_USERS_GET = ("Users.get", {"query": {"start": 0, "limit": -1}})
+_EXTENSIONS_GET = ("Extensions.get", {"query": {"start": 0, "limit": -1}})
+
+
+class KerioClientTests(SimpleTestCase):
+    def setUp(self):
+        self.server = FakeKerioServer(users=3).start()
+        self.addCleanup(self.server.stop)
+        self.api = KerioOperatorClient(self.server.url, self.server.username, self.server.password, verify_ssl=False)
+        self.addCleanup(self.api.sess.close)
+
+    def test_token_is_reused(self):
+        for _ in range(3):
+            self.api.call(*_USERS_GET)
+        self.assertEqual(self.api.logins, 1)
+
+    def test_expired_token_relogins_once(self):
+        self.api.call(*_USERS_GET)
+        self.server.expire_tokens()
+        result = self.api.call(*_USERS_GET)
+
+        self.assertEqual(self.api.logins, 2)
+        self.assertEqual(len(result["userList"]), 3)
+
+    def test_http_401_relogins_once(self):
+        self.api.call(*_USERS_GET)
+        self.server.fail_next_requests(1, status=401)
+        self.api.call(*_USERS_GET)
+        self.assertEqual(self.api.logins, 2)
+
+    def test_gateway_error_is_raised_without_relogin(self):
+        self.api.call(*_USERS_GET)
+        self.server.fail_next_requests(1)
+        with self.assertRaises(requests.HTTPError):
+            self.api.call(*_USERS_GET)
+        self.assertEqual(self.api.logins, 1)
+
+    def test_batch_returns_results_in_order(self):
+        users, extensions = self.api.call_batch([_USERS_GET, _EXTENSIONS_GET])
+
+        self.assertEqual(len(users["userList"]), 3)
+        self.assertEqual(len(extensions["extensionList"]), 3)
+        self.assertEqual(self.server.stats()["http_requests"], 2)  # логин + пакет
+
+    def test_batch_relogins_after_expiry(self):
+        self.api.call(*_USERS_GET)
+        self.server.expire_tokens()
+        users, _extensions = self.api.call_batch([_USERS_GET, _EXTENSIONS_GET])
+
+        self.assertEqual(self.api.logins, 2)
+        self.assertEqual(len(users["userList"]), 3)
+
+    def test_batch_relogins_after_http_401(self):
+        self.api.call(*_USERS_GET)
+        self.server.fail_next_requests(1, status=403)
+        users, _extensions = self.api.call_batch([_USERS_GET, _EXTENSIONS_GET])
+
+        self.assertEqual(self.api.logins, 2)
+        self.assertEqual(len(users["userList"]), 3)
+
+    def test_batch_errors_in_place(self):
+        results = self.api.call_batch([_USERS_GET, ("Nope.get", None)], raise_errors=False)
+
+        self.assertEqual(len(results[0]["userList"]), 3)
+        self.assertIsInstance(results[1], KerioApiError)
+        with self.assertRaises(KerioApiError):
+            self.api.call_batch([_USERS_GET, ("Nope.get", None)])
+
+
+@mock.patch(
+    "apps.telephony.provisioning.fetch_kerio_extension_numbers",
+    side_effect=requests.ConnectionError("Kerio is down"),
+)
+class ProvisionKerioDownTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.emp = _employee("newbie", "Новиков", "Нурали", extension="201")
+        cls.link = cls.emp.telephony_link
+
+    def test_pending_links_are_marked_failed(self, _fetch):
+        with self.assertRaises(requests.ConnectionError):
+            provision_links([self.link.pk])
+
+        self.link.refresh_from_db()
+        self.assertEqual(self.link.provision_status, TelephonyLink.ProvisionStatus.FAILED)
+        self.assertIn("Kerio is down", self.link.provision_error)
+        self.assertEqual(failed_link_ids(), [self.link.pk])
+
+    def test_push_button_shows_error_instead_of_500(self, _fetch):
+        self.client.force_login(self.emp.user)
+        response = self.client.post(
+            reverse("telephony:push_create_user", args=[self.link.pk]), HTTP_HOST="localhost"
+        )
+
+        self.assertRedirects(response, reverse("telephony:directory_page"), fetch_redirect_response=False)
+        texts = [str(m) for m in get_messages(response.wsgi_request)]
+        self.assertTrue(any(t.startswith("Ошибка Kerio provision") for t in texts), texts)
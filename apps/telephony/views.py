@@ -1,19 +1,30 @@
+from urllib.parse import urlencode
+
+from django.conf import settings
 from django.contrib import messages
+from django.core.paginator import Paginator
 from django.http import JsonResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.views.decorators.http import require_GET, require_POST
 
+from apps.agency.models import Department
 from .models import TelephonyLink
-from .services import fetch_kerio_users_with_numbers, pull_sync_kerio_links, provision_employee_to_kerio, \
-    build_directory_rows
+from .provisioning import provision_links
+from .services import build_directory_rows, directory_employees_qs
+from .snapshot import get_kerio_snapshot, kerio_snapshot_index, schedule_kerio_snapshot_refresh, snapshot_status
+from .sync import last_kerio_sync_run, start_kerio_sync_in_background
 from ..users.decorators import agency_required
 
 
 @require_POST
 @agency_required
 def pull_sync(request):
-    res = pull_sync_kerio_links()
-    messages.success(request, f"Синхронизация Kerio завершена. Обновлено: {res['updated']}")
+    # сама синхронизация — в фоне (или manage.py sync_kerio_links по расписанию)
+    run = start_kerio_sync_in_background(user=request.user)
+    if run is None:
+        messages.info(request, "Синхронизация Kerio уже выполняется.")
+    else:
+        messages.success(request, "Синхронизация Kerio запущена. Итог появится на этой странице.")
     return redirect("telephony:directory_page")
 
 
@@ -27,10 +38,16 @@ def push_create_user(request, link_id: int):
         return redirect("telephony:directory_page")
 
     try:
-        out = provision_employee_to_kerio(link)
-        messages.success(request, f"Создан в Kerio. GUID: {out.get('kerio_guid')}")
+        res = provision_links([link.pk], workers=1)
     except Exception as e:
         messages.error(request, f"Ошибка Kerio provision: {e}")
+        return redirect("telephony:directory_page")
+    link.refresh_from_db()
+    if res["done"]:
+        messages.success(request, f"Создан в Kerio. GUID: {link.kerio_guid}")
+        schedule_kerio_snapshot_refresh()
+    else:
+        messages.error(request, f"Ошибка Kerio provision: {link.provision_error}")
 
     return redirect("telephony:directory_page")
 
@@ -38,7 +55,8 @@ def push_create_user(request, link_id: int):
 @require_GET
 @agency_required
 def kerio_numbers_api(request):
-    items = fetch_kerio_users_with_numbers()
+    snapshot = get_kerio_snapshot()
+    items = list(snapshot.users or [])
 
     show_disabled = request.GET.get("show_disabled") == "1"
     if not show_disabled:
@@ -48,17 +66,62 @@ def kerio_numbers_api(request):
     if only_with_numbers:
         items = [x for x in items if x["numbers"]]
 
-    return JsonResponse({"count": len(items), "items": items})
+    status = snapshot_status(snapshot)
+    return JsonResponse({
+        "count": len(items),
+        "items": items,
+        "fetched_at": status["fetched_at"],
+        "age_seconds": status["age_seconds"],
+        "refreshing": status["refreshing"],
+    })
+
+
+def _int_or_none(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _directory_context(request) -> dict:
+    # "Обновить" в шаблоне просит свежий снимок; ответ всё равно из текущего
+    snapshot = get_kerio_snapshot(force_refresh=request.GET.get("refresh") == "1")
+    index = kerio_snapshot_index(snapshot)
+
+    filters = {
+        "q": (request.GET.get("q") or "").strip(),
+        "department": _int_or_none(request.GET.get("department")),
+        "extension": (request.GET.get("extension") or "").strip(),
+        "status": request.GET.get("status") or "",
+    }
+    qs = directory_employees_qs(
+        index,
+        q=filters["q"],
+        department_id=filters["department"],
+        extension=filters["extension"],
+        status=filters["status"],
+    )
+    page_obj = Paginator(qs, settings.TELEPHONY_DIRECTORY_PAGE_SIZE).get_page(request.GET.get("page") or 1)
+
+    return {
+        "items": build_directory_rows(page_obj.object_list, index),
+        "page_obj": page_obj,
+        "filters": filters,
+        "filters_qs": urlencode({k: v for k, v in filters.items() if v}),
+        "snapshot": snapshot_status(snapshot),
+        "last_sync": last_kerio_sync_run(),
+    }
 
 
 @require_GET
 @agency_required
 def directory_page(request):
-    items = build_directory_rows()
-    return render(request, "telephony/directory.html", {"items": items})
+    context = _directory_context(request)
+    context["departments"] = Department.objects.filter(is_active=True).order_by("name")
+    return render(request, "telephony/directory.html", context)
+
 
 @require_GET
 @agency_required
 def directory_table(request):
-    items = build_directory_rows()
-    return render(request, "telephony/_directory_table.html", {"items": items})
+    return render(request, "telephony/_directory_table.html", _directory_context(request))
@@ -1,6 +1,12 @@
 from django.contrib import admin
 
-from .models import TelegramProfile, TelegramChatBinding
+from .models import (
+    TelegramProfile,
+    TelegramChatBinding,
+    TelegramFsmState,
+    TelegramNotificationDigestItem,
+    TelegramRequestSubmission,
+)
 
 
 @admin.register(TelegramProfile)
@@ -36,7 +42,32 @@ class TelegramProfileAdmin(admin.ModelAdmin):
 
 @admin.register(TelegramChatBinding)
 class TelegramChatBindingAdmin(admin.ModelAdmin):
-    list_display = ("title", "chat_id", "chat_type", "department", "is_active", "created_at")
+    list_display = ("title", "chat_id", "chat_type", "department", "digest_minutes", "is_active", "created_at")
     list_filter = ("chat_type", "is_active", "created_at")
     search_fields = ("title", "chat_id")
-    autocomplete_fields = ("department",)
\ No newline at end of file
+    autocomplete_fields = ("department",)
+
+
+@admin.register(TelegramFsmState)
+class TelegramFsmStateAdmin(admin.ModelAdmin):
+    list_display = ("user_id", "chat_id", "state", "updated_at")
+    list_filter = ("state",)
+    search_fields = ("user_id", "chat_id")
+    readonly_fields = ("updated_at",)
+
+
+@admin.register(TelegramRequestSubmission)
+class TelegramRequestSubmissionAdmin(admin.ModelAdmin):
+    list_display = ("idempotency_key", "telegram_user_id", "status", "request", "attempts", "created_at")
+    list_filter = ("status", "created_at")
+    search_fields = ("idempotency_key", "telegram_user_id", "request__public_id")
+    raw_id_fields = ("request",)
+    readonly_fields = ("created_at", "updated_at")
+
+
+@admin.register(TelegramNotificationDigestItem)
+class TelegramNotificationDigestItemAdmin(admin.ModelAdmin):
+    list_display = ("chat_binding", "request", "created_at")
+    list_filter = ("chat_binding",)
+    raw_id_fields = ("request",)
+    readonly_fields = ("created_at",)
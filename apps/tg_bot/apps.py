@@ -5,3 +5,6 @@ class TgBotConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.tg_bot"
     verbose_name = _("Телеграм бот")
+
+    def ready(self):
+        from . import signals  # noqa
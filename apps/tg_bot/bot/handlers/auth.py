@@ -5,7 +5,6 @@ from aiogram.types import Message, ReplyKeyboardRemove
 from aiogram.fsm.context import FSMContext
 
 from apps.tg_bot.services import verify_telegram_user_by_phone, set_telegram_profile_email
-from apps.tg_bot.selectors import get_user_bot_language
 from apps.tg_bot.bot.utils.db import database_sync_to_async as sync_to_async
 from apps.tg_bot.bot.keyboards.reply import (
     contact_request_keyboard,
@@ -14,6 +13,7 @@ from apps.tg_bot.bot.keyboards.reply import (
 from apps.tg_bot.bot.states.request_states import AuthStates, RegistrationStates
 from apps.tg_bot.bot.utils.i18n import tr
 from apps.tg_bot.bot.utils.phone import normalize_uz_phone
+from apps.tg_bot.bot.utils.profile_context import ProfileContext
 
 router = Router()
 
@@ -36,9 +36,9 @@ async def _process_phone_verification(
     message: Message,
     state: FSMContext,
     raw_phone: str,
+    lang: str,
 ):
     tg_user = message.from_user
-    lang = await sync_to_async(get_user_bot_language)(tg_user.id if tg_user else 0)
 
     if not _is_private_chat(message):
         await state.clear()
@@ -119,10 +119,10 @@ async def _process_phone_verification(
 
 
 @router.message(AuthStates.waiting_for_contact, F.contact)
-async def handle_contact_verification(message: Message, state: FSMContext):
+async def handle_contact_verification(message: Message, state: FSMContext, profile_ctx: ProfileContext):
     tg_user = message.from_user
     contact = message.contact
-    lang = await sync_to_async(get_user_bot_language)(tg_user.id if tg_user else 0)
+    lang = profile_ctx.lang
 
     if not _is_private_chat(message):
         await state.clear()
@@ -155,13 +155,14 @@ async def handle_contact_verification(message: Message, state: FSMContext):
         message=message,
         state=state,
         raw_phone=raw_phone,
+        lang=profile_ctx.lang,
     )
 
 
 @router.message(AuthStates.waiting_for_email)
-async def handle_email_after_phone_verification(message: Message, state: FSMContext):
+async def handle_email_after_phone_verification(message: Message, state: FSMContext, profile_ctx: ProfileContext):
     tg_user = message.from_user
-    lang = await sync_to_async(get_user_bot_language)(tg_user.id if tg_user else 0)
+    lang = profile_ctx.lang
 
     if not _is_private_chat(message):
         await state.clear()
@@ -202,11 +203,12 @@ async def handle_email_after_phone_verification(message: Message, state: FSMCont
 
 
 @router.message(AuthStates.waiting_for_contact)
-async def handle_manual_phone_during_auth(message: Message, state: FSMContext):
+async def handle_manual_phone_during_auth(message: Message, state: FSMContext, profile_ctx: ProfileContext):
     raw_phone = (message.text or "").strip()
 
     await _process_phone_verification(
         message=message,
         state=state,
         raw_phone=raw_phone,
+        lang=profile_ctx.lang,
     )
@@ -1,23 +1,21 @@
 from aiogram import Router, F
 from aiogram.filters import Command
-from aiogram.types import Message
+from aiogram.types import CallbackQuery, Message
 
-from apps.tg_bot.selectors import (
-    get_verified_telegram_profile_by_user_id,
-    get_recent_requests_for_profile,
-    get_user_bot_language,
-)
+from apps.tg_bot.selectors import get_recent_requests_for_profile
 from apps.tg_bot.services import bind_group_chat, format_request_short_text
+from apps.tg_bot.bot.keyboards.inline import NOOP_CALLBACK
 from apps.tg_bot.bot.keyboards.reply import main_menu_keyboard
 from apps.tg_bot.bot.utils.db import database_sync_to_async as sync_to_async
 from apps.tg_bot.bot.utils.i18n import tr
+from apps.tg_bot.bot.utils.profile_context import ProfileContext
 
 router = Router()
 
 
 @router.message(F.text.in_(["ℹ️ Помощь", "ℹ️ Yordam"]))
-async def help_handler(message: Message):
-    lang = await sync_to_async(get_user_bot_language)(message.from_user.id if message.from_user else 0)
+async def help_handler(message: Message, profile_ctx: ProfileContext):
+    lang = profile_ctx.lang
     await message.answer(
         tr(lang, "help_text"),
         reply_markup=main_menu_keyboard(lang),
@@ -25,10 +23,10 @@ async def help_handler(message: Message):
 
 
 @router.message(F.text.in_(["📄 Мои обращения", "📄 Mening murojaatlarim"]))
-async def my_requests_handler(message: Message):
-    lang = await sync_to_async(get_user_bot_language)(message.from_user.id if message.from_user else 0)
+async def my_requests_handler(message: Message, profile_ctx: ProfileContext):
+    lang = profile_ctx.lang
 
-    profile = await sync_to_async(get_verified_telegram_profile_by_user_id)(message.from_user.id)
+    profile = profile_ctx.verified_profile
     if not profile:
         await message.answer(tr(lang, "verify_first"))
         return
@@ -53,8 +51,8 @@ async def my_requests_handler(message: Message):
 
 
 @router.message(Command("bind_group"))
-async def bind_group_handler(message: Message):
-    lang = await sync_to_async(get_user_bot_language)(message.from_user.id if message.from_user else 0)
+async def bind_group_handler(message: Message, profile_ctx: ProfileContext):
+    lang = profile_ctx.lang
 
     if message.chat.type not in ("group", "supergroup"):
         await message.answer(tr(lang, "bind_group_only"))
@@ -69,3 +67,9 @@ async def bind_group_handler(message: Message):
     )
 
     await message.answer(tr(lang, "group_bound"))
+
+
+@router.callback_query(F.data == NOOP_CALLBACK)
+async def noop_callback_handler(callback: CallbackQuery):
+    # номер страницы в клавиатуре — просто убираем "часики" у кнопки
+    await callback.answer()
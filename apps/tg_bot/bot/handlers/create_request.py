@@ -4,40 +4,30 @@ from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
 
 from apps.tg_bot.bot.keyboards.reply import main_menu_keyboard
+from apps.tg_bot.bot.keyboards.cache import problem_directions_markup
 from apps.tg_bot.bot.keyboards.inline import (
-    problem_directions_keyboard,
     attachment_actions_keyboard,
     confirm_request_keyboard,
 )
 from apps.tg_bot.bot.states.request_states import RequestCreateStates
+from apps.tg_bot.bot.submissions import SubmissionWorker
 from apps.tg_bot.bot.utils.files import (
     MAX_ATTACH_BYTES,
     is_allowed_filename,
     build_safe_photo_name,
-    download_telegram_attachments,
+    attachment_stager,
 )
 from apps.tg_bot.bot.utils.db import database_sync_to_async as sync_to_async
-from apps.tg_bot.bot.utils.notifications import notify_request_created
-from apps.tg_bot.bot.utils.i18n import tr, get_i18n_attr, translate_request_status
+from apps.tg_bot.bot.utils.i18n import tr, get_i18n_attr
+from apps.tg_bot.bot.utils.profile_context import ProfileContext
 from apps.tg_bot.bot.utils.session_guard import is_session_expired
 from apps.tg_bot.bot.utils.recovery import reset_user_dialog
-from apps.tg_bot.selectors import (
-    get_verified_telegram_profile_by_user_id,
-    get_problem_directions,
-    get_problem_direction_by_id,
-    get_user_bot_language,
-    get_company_request_context,
-)
-from apps.tg_bot.services import create_request_from_telegram_profile
+from apps.tg_bot.selectors import get_problem_direction_by_id
+from apps.tg_bot.services import enqueue_telegram_submission
 
 router = Router()
 
 
-async def _require_verified_profile(message_or_callback):
-    tg_user = message_or_callback.from_user
-    return await sync_to_async(get_verified_telegram_profile_by_user_id)(tg_user.id)
-
-
 async def _build_preview_text(state: FSMContext, lang: str) -> str:
     data = await state.get_data()
     attachments_meta = data.get("attachments_meta", [])
@@ -53,18 +43,20 @@ async def _build_preview_text(state: FSMContext, lang: str) -> str:
 
 
 @router.message(F.text.in_(["➕ Создать обращение", "➕ Murojaat yaratish"]))
-async def create_request_entry_handler(message: Message, state: FSMContext):
-    lang = await sync_to_async(get_user_bot_language)(message.from_user.id if message.from_user else 0)
-    profile = await _require_verified_profile(message)
+async def create_request_entry_handler(message: Message, state: FSMContext, profile_ctx: ProfileContext):
+    lang = profile_ctx.lang
+    profile = profile_ctx.verified_profile
 
     if not profile:
         await message.answer(tr(lang, "verify_first"))
         return
 
+    # новое обращение поверх незаконченного: его загрузки больше не нужны
+    attachment_stager.forget((await state.get_data()).get("attachments_meta", []))
     await state.clear()
 
-    items = await sync_to_async(list)(get_problem_directions())
-    if not items:
+    markup = await problem_directions_markup(lang)
+    if markup is None:
         await message.answer(
             tr(lang, "problem_directions_not_configured"),
             reply_markup=main_menu_keyboard(lang),
@@ -76,13 +68,28 @@ async def create_request_entry_handler(message: Message, state: FSMContext):
 
     await message.answer(
         tr(lang, "request_step_1_short"),
-        reply_markup=problem_directions_keyboard(items, lang),
+        reply_markup=markup,
     )
 
 
+@router.callback_query(RequestCreateStates.choosing_problem_direction, F.data.startswith("cr:pdp:"))
+async def page_problem_directions(callback: CallbackQuery, state: FSMContext, profile_ctx: ProfileContext):
+    data = await state.get_data()
+    if is_session_expired(data):
+        await reset_user_dialog(callback, state, reason_key="session_recovered", use_alert=True)
+        return
+
+    page = int(callback.data.split(":")[-1])
+    markup = await problem_directions_markup(profile_ctx.lang, page=page)
+    if markup is not None:
+        await callback.message.edit_reply_markup(reply_markup=markup)
+    await callback.answer()
+
+
 @router.callback_query(F.data == "cr:cancel")
-async def cancel_create_request(callback: CallbackQuery, state: FSMContext):
-    lang = await sync_to_async(get_user_bot_language)(callback.from_user.id if callback.from_user else 0)
+async def cancel_create_request(callback: CallbackQuery, state: FSMContext, profile_ctx: ProfileContext):
+    lang = profile_ctx.lang
+    attachment_stager.forget((await state.get_data()).get("attachments_meta", []))
     await state.clear()
     await callback.message.answer(
         tr(lang, "request_cancelled"),
@@ -92,13 +99,13 @@ async def cancel_create_request(callback: CallbackQuery, state: FSMContext):
 
 
 @router.callback_query(RequestCreateStates.choosing_problem_direction, F.data.startswith("cr:pd:"))
-async def choose_problem_direction(callback: CallbackQuery, state: FSMContext):
+async def choose_problem_direction(callback: CallbackQuery, state: FSMContext, profile_ctx: ProfileContext):
     data = await state.get_data()
     if is_session_expired(data):
         await reset_user_dialog(callback, state, reason_key="session_recovered", use_alert=True)
         return
 
-    lang = await sync_to_async(get_user_bot_language)(callback.from_user.id if callback.from_user else 0)
+    lang = profile_ctx.lang
     item_id = int(callback.data.split(":")[-1])
     item = await sync_to_async(get_problem_direction_by_id)(item_id)
 
@@ -118,13 +125,13 @@ async def choose_problem_direction(callback: CallbackQuery, state: FSMContext):
 
 
 @router.message(RequestCreateStates.typing_description)
-async def input_description(message: Message, state: FSMContext):
+async def input_description(message: Message, state: FSMContext, profile_ctx: ProfileContext):
     data = await state.get_data()
     if is_session_expired(data):
         await reset_user_dialog(message, state, reason_key="session_recovered")
         return
 
-    lang = await sync_to_async(get_user_bot_language)(message.from_user.id if message.from_user else 0)
+    lang = profile_ctx.lang
     text = (message.text or "").strip()
 
     if len(text) < 10:
@@ -144,13 +151,13 @@ async def input_description(message: Message, state: FSMContext):
 
 
 @router.message(RequestCreateStates.uploading_files, F.document)
-async def upload_document(message: Message, state: FSMContext):
+async def upload_document(message: Message, state: FSMContext, profile_ctx: ProfileContext):
     data = await state.get_data()
     if is_session_expired(data):
         await reset_user_dialog(message, state, reason_key="session_recovered")
         return
 
-    lang = await sync_to_async(get_user_bot_language)(message.from_user.id if message.from_user else 0)
+    lang = profile_ctx.lang
     doc = message.document
     filename = doc.file_name or "document"
     file_size = doc.file_size or 0
@@ -164,11 +171,14 @@ async def upload_document(message: Message, state: FSMContext):
         return
 
     attachments_meta = data.get("attachments_meta", [])
-    attachments_meta.append({
+    item = {
         "file_id": doc.file_id,
         "filename": filename,
         "kind": "document",
-    })
+    }
+    # качаем сразу, пока пользователь добавляет остальные файлы
+    item["staging_id"] = attachment_stager.start(message.bot, item)
+    attachments_meta.append(item)
     await state.update_data(
         attachments_meta=attachments_meta,
         last_step_at=timezone.now().isoformat(),
@@ -181,13 +191,13 @@ async def upload_document(message: Message, state: FSMContext):
 
 
 @router.message(RequestCreateStates.uploading_files, F.photo)
-async def upload_photo(message: Message, state: FSMContext):
+async def upload_photo(message: Message, state: FSMContext, profile_ctx: ProfileContext):
     data = await state.get_data()
     if is_session_expired(data):
         await reset_user_dialog(message, state, reason_key="session_recovered")
         return
 
-    lang = await sync_to_async(get_user_bot_language)(message.from_user.id if message.from_user else 0)
+    lang = profile_ctx.lang
     photo = message.photo[-1]
     file_size = photo.file_size or 0
 
@@ -198,11 +208,14 @@ async def upload_photo(message: Message, state: FSMContext):
     filename = build_safe_photo_name(photo.file_unique_id, fallback=photo.file_id)
 
     attachments_meta = data.get("attachments_meta", [])
-    attachments_meta.append({
+    item = {
         "file_id": photo.file_id,
         "filename": filename,
         "kind": "photo",
-    })
+    }
+    # качаем сразу, пока пользователь добавляет остальные файлы
+    item["staging_id"] = attachment_stager.start(message.bot, item)
+    attachments_meta.append(item)
     await state.update_data(
         attachments_meta=attachments_meta,
         last_step_at=timezone.now().isoformat(),
@@ -215,8 +228,8 @@ async def upload_photo(message: Message, state: FSMContext):
 
 
 @router.message(RequestCreateStates.uploading_files)
-async def upload_files_fallback(message: Message):
-    lang = await sync_to_async(get_user_bot_language)(message.from_user.id if message.from_user else 0)
+async def upload_files_fallback(message: Message, profile_ctx: ProfileContext):
+    lang = profile_ctx.lang
     await message.answer(
         tr(lang, "upload_file_hint"),
         reply_markup=attachment_actions_keyboard(lang),
@@ -224,13 +237,13 @@ async def upload_files_fallback(message: Message):
 
 
 @router.callback_query(RequestCreateStates.uploading_files, F.data == "cr:file:skip")
-async def skip_files(callback: CallbackQuery, state: FSMContext):
+async def skip_files(callback: CallbackQuery, state: FSMContext, profile_ctx: ProfileContext):
     data = await state.get_data()
     if is_session_expired(data):
         await reset_user_dialog(callback, state, reason_key="session_recovered", use_alert=True)
         return
 
-    lang = await sync_to_async(get_user_bot_language)(callback.from_user.id if callback.from_user else 0)
+    lang = profile_ctx.lang
     await state.update_data(
         attachments_meta=[],
         last_step_at=timezone.now().isoformat(),
@@ -242,13 +255,13 @@ async def skip_files(callback: CallbackQuery, state: FSMContext):
 
 
 @router.callback_query(RequestCreateStates.uploading_files, F.data == "cr:file:done")
-async def finish_files(callback: CallbackQuery, state: FSMContext):
+async def finish_files(callback: CallbackQuery, state: FSMContext, profile_ctx: ProfileContext):
     data = await state.get_data()
     if is_session_expired(data):
         await reset_user_dialog(callback, state, reason_key="session_recovered", use_alert=True)
         return
 
-    lang = await sync_to_async(get_user_bot_language)(callback.from_user.id if callback.from_user else 0)
+    lang = profile_ctx.lang
     await state.update_data(last_step_at=timezone.now().isoformat())
     preview = await _build_preview_text(state, lang)
     await state.set_state(RequestCreateStates.confirming)
@@ -257,66 +270,49 @@ async def finish_files(callback: CallbackQuery, state: FSMContext):
 
 
 @router.callback_query(RequestCreateStates.confirming, F.data == "cr:confirm")
-async def confirm_request(callback: CallbackQuery, state: FSMContext):
+async def confirm_request(
+    callback: CallbackQuery,
+    state: FSMContext,
+    profile_ctx: ProfileContext,
+    submission_worker: SubmissionWorker,
+):
     data = await state.get_data()
     if is_session_expired(data):
         await reset_user_dialog(callback, state, reason_key="session_recovered", use_alert=True)
         return
 
-    lang = await sync_to_async(get_user_bot_language)(callback.from_user.id if callback.from_user else 0)
-    profile = await _require_verified_profile(callback)
-
-    if not profile:
-        await state.clear()
-        await callback.message.answer(tr(lang, "verify_first"))
-        await callback.answer()
-        return
+    lang = profile_ctx.lang
+    profile = profile_ctx.verified_profile
 
-    company = getattr(profile, "company", None)
-    if not company:
+    if not profile or not profile.company_id:
         await state.clear()
         await callback.message.answer(tr(lang, "verify_first"))
         await callback.answer()
         return
 
-    problem_direction = await sync_to_async(get_problem_direction_by_id)(data["problem_direction_id"])
-
-    company_ctx = await sync_to_async(get_company_request_context)(company.id)
-    if not company_ctx:
-        await state.clear()
-        await callback.message.answer(tr(lang, "verify_first"))
-        await callback.answer()
-        return
-
-    category = company_ctx["category"]
-    region = company_ctx["region"]
-    district = company_ctx["district"]
-    directions = company_ctx["directions"]
-
-    attachments_meta = data.get("attachments_meta", [])
-    attachments = await download_telegram_attachments(callback.bot, attachments_meta)
-
-    req = await sync_to_async(create_request_from_telegram_profile)(
-        profile=profile,
-        problem_direction=problem_direction,
-        category=category,
-        region=region,
-        district=district,
-        directions=directions,
-        description=data["description"],
-        attachments=attachments,
+    # одна карточка подтверждения = одно обращение, сколько бы раз ни нажали "Отправить"
+    result = await sync_to_async(enqueue_telegram_submission)(
+        idempotency_key=f"{callback.message.chat.id}:{callback.message.message_id}",
+        telegram_user_id=callback.from_user.id,
+        chat_id=callback.message.chat.id,
+        message_id=callback.message.message_id,
+        lang=lang,
+        payload={
+            "problem_direction_id": data["problem_direction_id"],
+            "description": data["description"],
+            "attachments_meta": data.get("attachments_meta", []),
+        },
     )
+    await state.clear()
 
-    await notify_request_created(callback.bot, req.id)
+    if not result.created:
+        await callback.answer(tr(lang, "request_already_submitted"))
+        return
 
-    await state.clear()
-    await callback.message.answer(
-        tr(
-            lang,
-            "request_created_success",
-            request_number=req.public_id or req.pk,
-            status=translate_request_status(req.status, lang),
-        ),
-        reply_markup=main_menu_keyboard(lang),
-    )
-    await callback.answer()
+    # в воркер — до вызовов Bot API: их ошибка не должна оставить отправку в queued
+    card_ready = submission_worker.submit(result.submission.pk, hold_card=True)
+    try:
+        await callback.message.edit_text(tr(lang, "request_processing"))
+        await callback.answer()
+    finally:
+        card_ready.set()
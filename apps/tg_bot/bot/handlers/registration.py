@@ -9,30 +9,26 @@ from apps.tg_bot.bot.keyboards.reply import (
     contact_request_keyboard,
     main_menu_keyboard,
 )
-from apps.tg_bot.bot.keyboards.inline import (
-    reg_regions_keyboard,
-    reg_districts_keyboard,
-    reg_categories_keyboard,
-    reg_directions_keyboard,
-    reg_confirm_keyboard,
+from apps.tg_bot.bot.keyboards.cache import (
+    reg_categories_markup,
+    reg_directions_markup,
+    reg_districts_markup,
+    reg_regions_markup,
 )
+from apps.tg_bot.bot.keyboards.inline import reg_confirm_keyboard
 from apps.tg_bot.bot.states.request_states import RegistrationStates
 from apps.tg_bot.bot.utils.db import database_sync_to_async as sync_to_async
 from apps.tg_bot.bot.utils.i18n import tr, get_i18n_attr
+from apps.tg_bot.bot.utils.profile_context import ProfileContext
 from apps.tg_bot.bot.utils.session_guard import is_session_expired
 from apps.tg_bot.bot.utils.recovery import reset_user_dialog
 from apps.tg_bot.selectors import (
     find_company_by_inn,
     get_company_direction_ids,
-    get_regions,
     get_region_by_id,
-    get_districts_by_region,
     get_district_by_id,
-    get_categories,
     get_category_by_id,
-    get_directions_by_category,
     get_directions_by_ids,
-    get_user_bot_language,
 )
 from apps.tg_bot.services import register_or_bind_telegram_profile_by_inn
 
@@ -66,13 +62,13 @@ async def _registration_preview(state: FSMContext, lang: str = "uz") -> str:
 
 
 @router.message(RegistrationStates.waiting_for_inn)
-async def input_inn(message: Message, state: FSMContext):
+async def input_inn(message: Message, state: FSMContext, profile_ctx: ProfileContext):
     data = await state.get_data()
     if is_session_expired(data):
         await reset_user_dialog(message, state, reason_key="session_recovered")
         return
 
-    lang = await sync_to_async(get_user_bot_language)(message.from_user.id if message.from_user else 0)
+    lang = profile_ctx.lang
     inn = "".join(ch for ch in (message.text or "") if ch.isdigit())
 
     if len(inn) < 9:
@@ -102,11 +98,10 @@ async def input_inn(message: Message, state: FSMContext):
             last_step_at=timezone.now().isoformat(),
         )
 
-        regions = await sync_to_async(list)(get_regions())
         await state.set_state(RegistrationStates.choosing_region)
         await message.answer(
             tr(lang, "company_found", company_name=company.name),
-            reply_markup=reg_regions_keyboard(regions, allow_skip=True, lang=lang),
+            reply_markup=await reg_regions_markup(lang, allow_skip=True),
         )
         return
 
@@ -126,13 +121,13 @@ async def input_inn(message: Message, state: FSMContext):
 
 
 @router.message(RegistrationStates.waiting_for_company_name)
-async def input_company_name(message: Message, state: FSMContext):
+async def input_company_name(message: Message, state: FSMContext, profile_ctx: ProfileContext):
     data = await state.get_data()
     if is_session_expired(data):
         await reset_user_dialog(message, state, reason_key="session_recovered")
         return
 
-    lang = await sync_to_async(get_user_bot_language)(message.from_user.id if message.from_user else 0)
+    lang = profile_ctx.lang
     company_name = (message.text or "").strip()
 
     if len(company_name) < 3:
@@ -144,22 +139,21 @@ async def input_company_name(message: Message, state: FSMContext):
         last_step_at=timezone.now().isoformat(),
     )
 
-    regions = await sync_to_async(list)(get_regions())
     await state.set_state(RegistrationStates.choosing_region)
     await message.answer(
         tr(lang, "choose_company_region"),
-        reply_markup=reg_regions_keyboard(regions, allow_skip=False, lang=lang),
+        reply_markup=await reg_regions_markup(lang, allow_skip=False),
     )
 
 
 @router.callback_query(RegistrationStates.choosing_region, F.data.startswith("reg:reg:"))
-async def choose_reg_region(callback: CallbackQuery, state: FSMContext):
+async def choose_reg_region(callback: CallbackQuery, state: FSMContext, profile_ctx: ProfileContext):
     data = await state.get_data()
     if is_session_expired(data):
         await reset_user_dialog(callback, state, reason_key="session_recovered", use_alert=True)
         return
 
-    lang = await sync_to_async(get_user_bot_language)(callback.from_user.id if callback.from_user else 0)
+    lang = profile_ctx.lang
     token = callback.data.split(":")[-1]
 
     if token == "skip":
@@ -185,43 +179,41 @@ async def choose_reg_region(callback: CallbackQuery, state: FSMContext):
         district_name=None,
         last_step_at=timezone.now().isoformat(),
     )
-    districts = await sync_to_async(list)(get_districts_by_region(region.id))
     await state.set_state(RegistrationStates.choosing_district)
     await callback.message.edit_text(
         tr(lang, "choose_company_district"),
-        reply_markup=reg_districts_keyboard(districts, allow_skip=allow_skip, lang=lang),
+        reply_markup=await reg_districts_markup(region.id, lang, allow_skip=allow_skip),
     )
     await callback.answer()
 
 
 @router.callback_query(RegistrationStates.choosing_district, F.data == "reg:back:region")
-async def reg_back_to_region(callback: CallbackQuery, state: FSMContext):
+async def reg_back_to_region(callback: CallbackQuery, state: FSMContext, profile_ctx: ProfileContext):
     data = await state.get_data()
     if is_session_expired(data):
         await reset_user_dialog(callback, state, reason_key="session_recovered", use_alert=True)
         return
 
-    lang = await sync_to_async(get_user_bot_language)(callback.from_user.id if callback.from_user else 0)
+    lang = profile_ctx.lang
     allow_skip = bool(data.get("company_exists"))
 
-    regions = await sync_to_async(list)(get_regions())
     await state.set_state(RegistrationStates.choosing_region)
     await state.update_data(last_step_at=timezone.now().isoformat())
     await callback.message.edit_text(
         tr(lang, "choose_company_region"),
-        reply_markup=reg_regions_keyboard(regions, allow_skip=allow_skip, lang=lang),
+        reply_markup=await reg_regions_markup(lang, allow_skip=allow_skip),
     )
     await callback.answer()
 
 
 @router.callback_query(RegistrationStates.choosing_district, F.data.startswith("reg:dist:"))
-async def choose_reg_district(callback: CallbackQuery, state: FSMContext):
+async def choose_reg_district(callback: CallbackQuery, state: FSMContext, profile_ctx: ProfileContext):
     data = await state.get_data()
     if is_session_expired(data):
         await reset_user_dialog(callback, state, reason_key="session_recovered", use_alert=True)
         return
 
-    lang = await sync_to_async(get_user_bot_language)(callback.from_user.id if callback.from_user else 0)
+    lang = profile_ctx.lang
     token = callback.data.split(":")[-1]
 
     if token == "skip":
@@ -249,13 +241,13 @@ async def choose_reg_district(callback: CallbackQuery, state: FSMContext):
 
 
 @router.message(RegistrationStates.waiting_for_fio)
-async def input_fio(message: Message, state: FSMContext):
+async def input_fio(message: Message, state: FSMContext, profile_ctx: ProfileContext):
     data = await state.get_data()
     if is_session_expired(data):
         await reset_user_dialog(message, state, reason_key="session_recovered")
         return
 
-    lang = await sync_to_async(get_user_bot_language)(message.from_user.id if message.from_user else 0)
+    lang = profile_ctx.lang
     fio = " ".join((message.text or "").strip().split())
 
     if len(fio) < 5:
@@ -272,13 +264,13 @@ async def input_fio(message: Message, state: FSMContext):
 
 
 @router.message(RegistrationStates.waiting_for_email)
-async def input_email(message: Message, state: FSMContext):
+async def input_email(message: Message, state: FSMContext, profile_ctx: ProfileContext):
     data = await state.get_data()
     if is_session_expired(data):
         await reset_user_dialog(message, state, reason_key="session_recovered")
         return
 
-    lang = await sync_to_async(get_user_bot_language)(message.from_user.id if message.from_user else 0)
+    lang = profile_ctx.lang
     email = _normalize_email(message.text or "")
 
     try:
@@ -294,39 +286,32 @@ async def input_email(message: Message, state: FSMContext):
         last_step_at=timezone.now().isoformat(),
     )
 
-    categories = await sync_to_async(list)(get_categories())
     await state.set_state(RegistrationStates.choosing_category)
     await message.answer(
         tr(lang, "choose_category"),
-        reply_markup=reg_categories_keyboard(categories, allow_skip=allow_skip, lang=lang),
+        reply_markup=await reg_categories_markup(lang, allow_skip=allow_skip),
     )
 
 
 @router.callback_query(RegistrationStates.choosing_category, F.data.startswith("reg:cat:"))
-async def choose_reg_category(callback: CallbackQuery, state: FSMContext):
+async def choose_reg_category(callback: CallbackQuery, state: FSMContext, profile_ctx: ProfileContext):
     data = await state.get_data()
     if is_session_expired(data):
         await reset_user_dialog(callback, state, reason_key="session_recovered", use_alert=True)
         return
 
-    lang = await sync_to_async(get_user_bot_language)(callback.from_user.id if callback.from_user else 0)
+    lang = profile_ctx.lang
     token = callback.data.split(":")[-1]
 
     if token == "skip":
-        existing_category_id = data.get("category_id")
-        if existing_category_id:
-            directions = await sync_to_async(list)(get_directions_by_category(existing_category_id))
-        else:
-            directions = []
-
         await state.set_state(RegistrationStates.choosing_directions)
-        await state.update_data(last_step_at=timezone.now().isoformat())
+        await state.update_data(directions_page=0, last_step_at=timezone.now().isoformat())
         await callback.message.edit_text(
             tr(lang, "choose_directions"),
-            reply_markup=reg_directions_keyboard(
-                directions,
+            reply_markup=await reg_directions_markup(
+                data.get("category_id"),
+                lang,
                 selected_ids=set(data.get("direction_ids", [])),
-                lang=lang,
             ),
         )
         await callback.answer()
@@ -343,26 +328,26 @@ async def choose_reg_category(callback: CallbackQuery, state: FSMContext):
         category_id=category.id,
         category_name=get_i18n_attr(category, "name", lang),
         direction_ids=[],
+        directions_page=0,
         last_step_at=timezone.now().isoformat(),
     )
 
-    directions = await sync_to_async(list)(get_directions_by_category(category.id))
     await state.set_state(RegistrationStates.choosing_directions)
     await callback.message.edit_text(
         tr(lang, "choose_directions"),
-        reply_markup=reg_directions_keyboard(directions, selected_ids=set(), lang=lang),
+        reply_markup=await reg_directions_markup(category.id, lang, selected_ids=set()),
     )
     await callback.answer()
 
 
 @router.callback_query(RegistrationStates.choosing_directions, F.data.startswith("reg:dir:"))
-async def choose_reg_directions(callback: CallbackQuery, state: FSMContext):
+async def choose_reg_directions(callback: CallbackQuery, state: FSMContext, profile_ctx: ProfileContext):
     data = await state.get_data()
     if is_session_expired(data):
         await reset_user_dialog(callback, state, reason_key="session_recovered", use_alert=True)
         return
 
-    lang = await sync_to_async(get_user_bot_language)(callback.from_user.id if callback.from_user else 0)
+    lang = profile_ctx.lang
     token = callback.data.split(":")[-1]
     selected_ids = set(data.get("direction_ids", []))
     category_id = data.get("category_id")
@@ -394,19 +379,98 @@ async def choose_reg_directions(callback: CallbackQuery, state: FSMContext):
         last_step_at=timezone.now().isoformat(),
     )
 
-    directions = []
-    if category_id:
-        directions = await sync_to_async(list)(get_directions_by_category(category_id))
-
     await callback.message.edit_reply_markup(
-        reply_markup=reg_directions_keyboard(directions, selected_ids=selected_ids, lang=lang)
+        reply_markup=await reg_directions_markup(
+            category_id,
+            lang,
+            selected_ids=selected_ids,
+            page=data.get("directions_page", 0),
+        )
     )
     await callback.answer(tr(lang, "updated_list"))
 
 
+# ---------------- страницы длинных списков ----------------
+
+@router.callback_query(RegistrationStates.choosing_region, F.data.startswith("reg:regp:"))
+async def page_reg_regions(callback: CallbackQuery, state: FSMContext, profile_ctx: ProfileContext):
+    data = await state.get_data()
+    if is_session_expired(data):
+        await reset_user_dialog(callback, state, reason_key="session_recovered", use_alert=True)
+        return
+
+    page = int(callback.data.split(":")[-1])
+    await callback.message.edit_reply_markup(
+        reply_markup=await reg_regions_markup(
+            profile_ctx.lang,
+            allow_skip=bool(data.get("company_exists")),
+            page=page,
+        )
+    )
+    await callback.answer()
+
+
+@router.callback_query(RegistrationStates.choosing_district, F.data.startswith("reg:distp:"))
+async def page_reg_districts(callback: CallbackQuery, state: FSMContext, profile_ctx: ProfileContext):
+    data = await state.get_data()
+    if is_session_expired(data):
+        await reset_user_dialog(callback, state, reason_key="session_recovered", use_alert=True)
+        return
+
+    page = int(callback.data.split(":")[-1])
+    await callback.message.edit_reply_markup(
+        reply_markup=await reg_districts_markup(
+            data.get("region_id"),
+            profile_ctx.lang,
+            allow_skip=bool(data.get("company_exists")),
+            page=page,
+        )
+    )
+    await callback.answer()
+
+
+@router.callback_query(RegistrationStates.choosing_category, F.data.startswith("reg:catp:"))
+async def page_reg_categories(callback: CallbackQuery, state: FSMContext, profile_ctx: ProfileContext):
+    data = await state.get_data()
+    if is_session_expired(data):
+        await reset_user_dialog(callback, state, reason_key="session_recovered", use_alert=True)
+        return
+
+    page = int(callback.data.split(":")[-1])
+    await callback.message.edit_reply_markup(
+        reply_markup=await reg_categories_markup(
+            profile_ctx.lang,
+            allow_skip=bool(data.get("company_exists")),
+            page=page,
+        )
+    )
+    await callback.answer()
+
+
+@router.callback_query(RegistrationStates.choosing_directions, F.data.startswith("reg:dirp:"))
+async def page_reg_directions(callback: CallbackQuery, state: FSMContext, profile_ctx: ProfileContext):
+    data = await state.get_data()
+    if is_session_expired(data):
+        await reset_user_dialog(callback, state, reason_key="session_recovered", use_alert=True)
+        return
+
+    page = int(callback.data.split(":")[-1])
+    # переключение галочки перерисовывает ту страницу, на которой пользователь
+    await state.update_data(directions_page=page, last_step_at=timezone.now().isoformat())
+    await callback.message.edit_reply_markup(
+        reply_markup=await reg_directions_markup(
+            data.get("category_id"),
+            profile_ctx.lang,
+            selected_ids=set(data.get("direction_ids", [])),
+            page=page,
+        )
+    )
+    await callback.answer()
+
+
 @router.callback_query(F.data == "reg:cancel")
-async def cancel_registration(callback: CallbackQuery, state: FSMContext):
-    lang = await sync_to_async(get_user_bot_language)(callback.from_user.id if callback.from_user else 0)
+async def cancel_registration(callback: CallbackQuery, state: FSMContext, profile_ctx: ProfileContext):
+    lang = profile_ctx.lang
     await state.clear()
 
     if callback.message.chat.type != "private":
@@ -424,13 +488,13 @@ async def cancel_registration(callback: CallbackQuery, state: FSMContext):
 
 
 @router.callback_query(RegistrationStates.confirming, F.data == "reg:confirm")
-async def confirm_registration(callback: CallbackQuery, state: FSMContext):
+async def confirm_registration(callback: CallbackQuery, state: FSMContext, profile_ctx: ProfileContext):
     data = await state.get_data()
     if is_session_expired(data):
         await reset_user_dialog(callback, state, reason_key="session_recovered", use_alert=True)
         return
 
-    lang = await sync_to_async(get_user_bot_language)(callback.from_user.id if callback.from_user else 0)
+    lang = profile_ctx.lang
     tg_user = callback.from_user
 
     region = await sync_to_async(get_region_by_id)(data["region_id"]) if data.get("region_id") else None
@@ -3,12 +3,9 @@ from aiogram.filters import CommandStart
 from aiogram.types import Message
 from aiogram.fsm.context import FSMContext
 
-from apps.tg_bot.selectors import (
-    get_verified_telegram_profile_by_user_id,
-    get_telegram_profile_by_user_id,
-)
 from apps.tg_bot.services import set_telegram_profile_bot_language
 from apps.tg_bot.bot.utils.db import database_sync_to_async as sync_to_async
+from apps.tg_bot.bot.utils.profile_context import ProfileContext
 from apps.tg_bot.bot.keyboards.reply import (
     contact_request_keyboard,
     main_menu_keyboard,
@@ -24,9 +21,9 @@ def _is_private_chat(message: Message) -> bool:
     return message.chat.type == "private"
 
 
-async def _show_after_language_change(message: Message, state: FSMContext, lang: str):
+async def _show_after_language_change(message: Message, state: FSMContext, lang: str, profile_ctx: ProfileContext):
     tg_user = message.from_user
-    verified_profile = await sync_to_async(get_verified_telegram_profile_by_user_id)(tg_user.id)
+    verified_profile = profile_ctx.verified_profile
 
     if verified_profile:
         company_name = verified_profile.company.name if verified_profile.company else "—"
@@ -72,7 +69,7 @@ async def _show_after_language_change(message: Message, state: FSMContext, lang:
 
 
 @router.message(CommandStart())
-async def cmd_start(message: Message, state: FSMContext):
+async def cmd_start(message: Message, state: FSMContext, profile_ctx: ProfileContext):
     await state.clear()
 
     tg_user = message.from_user
@@ -84,7 +81,7 @@ async def cmd_start(message: Message, state: FSMContext):
         await message.answer(tr("uz", "private_chat_required"))
         return
 
-    profile = await sync_to_async(get_telegram_profile_by_user_id)(tg_user.id)
+    profile = profile_ctx.profile
 
     if not profile:
         await state.set_state(AuthStates.choosing_language)
@@ -95,7 +92,7 @@ async def cmd_start(message: Message, state: FSMContext):
         return
 
     lang = profile.bot_language or "uz"
-    verified_profile = await sync_to_async(get_verified_telegram_profile_by_user_id)(tg_user.id)
+    verified_profile = profile_ctx.verified_profile
 
     if verified_profile:
         company_name = verified_profile.company.name if verified_profile.company else "—"
@@ -125,18 +122,14 @@ async def cmd_start(message: Message, state: FSMContext):
 
 
 @router.message(F.text.in_(["🌐 Изменить язык", "🌐 Tilni o‘zgartirish"]))
-async def open_language_menu(message: Message, state: FSMContext):
+async def open_language_menu(message: Message, state: FSMContext, profile_ctx: ProfileContext):
     if not _is_private_chat(message):
         await state.clear()
         await message.answer(tr("uz", "private_chat_required"))
         return
 
     await state.set_state(AuthStates.choosing_language)
-    current_lang = "uz"
-    if message.from_user:
-        profile = await sync_to_async(get_telegram_profile_by_user_id)(message.from_user.id)
-        if profile and profile.bot_language:
-            current_lang = profile.bot_language
+    current_lang = profile_ctx.lang
 
     await message.answer(
         tr(current_lang, "language_menu_hint"),
@@ -145,7 +138,7 @@ async def open_language_menu(message: Message, state: FSMContext):
 
 
 @router.message(AuthStates.choosing_language, F.text.in_(["🇷🇺 Русский", "🇺🇿 O‘zbekcha"]))
-async def choose_language_handler(message: Message, state: FSMContext):
+async def choose_language_handler(message: Message, state: FSMContext, profile_ctx: ProfileContext):
     tg_user = message.from_user
     if not tg_user:
         await message.answer("Не удалось определить пользователя Telegram.")
@@ -168,4 +161,4 @@ async def choose_language_handler(message: Message, state: FSMContext):
         language_code=tg_user.language_code or "",
     )
 
-    await _show_after_language_change(message, state, lang)
+    await _show_after_language_change(message, state, lang, profile_ctx)
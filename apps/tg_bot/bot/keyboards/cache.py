@@ -0,0 +1,176 @@
+# apps/tg_bot/bot/keyboards/cache.py
+#
+# Готовые inline-клавиатуры справочников (проблемные направления, регионы, районы,
+# категории, направления) в памяти процесса бота.
+#
+# Всё проштамповано версией справочников (apps/companies/reference_cache.py):
+# сигналы увеличивают версию после commit, бот сверяется с ней не чаще
+# REFERENCE_CACHE_CHECK_SECONDS и при изменении сбрасывает все клавиатуры.
+# Список справочника загружается один раз на (язык, параметры) — один вызов в пул
+# потоков БД, дальше разметка каждой страницы строится и хранится без БД.
+#
+# Направления — мультивыбор с галочками пользователя: кэшируются пары (id, название),
+# разметка собирается на каждый вызов.
+from __future__ import annotations
+
+import math
+import time
+
+from collections.abc import Callable
+from typing import Any
+
+from aiogram.types import InlineKeyboardMarkup
+from django.conf import settings
+from django.utils import translation
+
+from apps.companies import reference_cache
+from apps.tg_bot.bot.keyboards.inline import (
+    problem_directions_keyboard,
+    reg_categories_keyboard,
+    reg_directions_keyboard,
+    reg_districts_keyboard,
+    reg_regions_keyboard,
+)
+from apps.tg_bot.bot.utils.db import database_sync_to_async
+from apps.tg_bot.bot.utils.i18n import get_i18n_attr
+
+# все обращения — из одного event loop бота, блокировки не нужны
+_state: dict[str, Any] = {"version": None, "checked_at": 0.0, "built_at": 0.0}
+_cache: dict[tuple, Any] = {}
+
+
+async def _sync_version() -> None:
+    now = time.monotonic()
+    if _state["version"] is not None and now - _state["checked_at"] < settings.REFERENCE_CACHE_CHECK_SECONDS:
+        return
+
+    version = await database_sync_to_async(reference_cache.current_version)()
+    expired = now - _state["built_at"] > settings.REFERENCE_CACHE_MAX_AGE_SECONDS
+    if version != _state["version"] or expired:
+        _cache.clear()
+        _state["built_at"] = now
+    _state["version"] = version
+    _state["checked_at"] = now
+
+
+def clear_keyboard_cache() -> None:
+    _cache.clear()
+    _state["version"] = None
+
+
+async def _items(key: tuple, lang: str, load: Callable[[], list]) -> list:
+    await _sync_version()
+    if key in _cache:
+        return _cache[key]
+
+    def build():
+        # name/title у modeltranslation-полей сортируются по активному языку
+        with translation.override(lang):
+            return list(load())
+
+    items = await database_sync_to_async(build)()
+    _cache[key] = items
+    return items
+
+
+async def _paged(
+    key: tuple,
+    lang: str,
+    load: Callable[[], list],
+    variant: tuple,
+    render: Callable[[list, int], Any],
+    page: int,
+) -> Any:
+    """
+    variant — параметры разметки (allow_skip ...). Номер страницы из callback
+    приводится к допустимому диапазону до построения ключа.
+    """
+    items = await _items(key, lang, load)
+    pages = max(math.ceil(len(items) / settings.TELEGRAM_KEYBOARD_PAGE_SIZE), 1)
+    page = min(max(page, 0), pages - 1)
+    markup_key = (*key, *variant, "page", page)
+    if markup_key not in _cache:
+        _cache[markup_key] = render(items, page)
+    return _cache[markup_key]
+
+
+# ---------------- клавиатуры ----------------
+
+async def problem_directions_markup(lang: str, page: int = 0) -> InlineKeyboardMarkup | None:
+    """
+    None — проблемные направления не настроены.
+    """
+    return await _paged(
+        ("problem_directions", lang),
+        lang,
+        reference_cache.get_problem_directions,
+        (),
+        lambda items, p: problem_directions_keyboard(items, lang, page=p) if items else None,
+        page,
+    )
+
+
+async def reg_regions_markup(lang: str, *, allow_skip: bool, page: int = 0) -> InlineKeyboardMarkup:
+    return await _paged(
+        ("regions", lang),
+        lang,
+        reference_cache.get_regions,
+        (allow_skip,),
+        lambda items, p: reg_regions_keyboard(items, allow_skip=allow_skip, lang=lang, page=p),
+        page,
+    )
+
+
+async def reg_districts_markup(region_id: int, lang: str, *, allow_skip: bool, page: int = 0) -> InlineKeyboardMarkup:
+    def load():
+        return sorted(reference_cache.get_districts(region_id), key=lambda d: get_i18n_attr(d, "name", lang))
+
+    return await _paged(
+        ("districts", lang, region_id),
+        lang,
+        load,
+        (allow_skip,),
+        lambda items, p: reg_districts_keyboard(items, allow_skip=allow_skip, lang=lang, page=p),
+        page,
+    )
+
+
+async def reg_categories_markup(lang: str, *, allow_skip: bool, page: int = 0) -> InlineKeyboardMarkup:
+    return await _paged(
+        ("categories", lang),
+        lang,
+        reference_cache.get_categories,
+        (allow_skip,),
+        lambda items, p: reg_categories_keyboard(items, allow_skip=allow_skip, lang=lang, page=p),
+        page,
+    )
+
+
+async def reg_directions_markup(
+    category_id: int | None,
+    lang: str,
+    *,
+    selected_ids: set[int],
+    page: int = 0,
+) -> InlineKeyboardMarkup:
+    def load():
+        if not category_id:
+            return []
+        return [
+            (item.id, get_i18n_attr(item, "title", lang))
+            for item in reference_cache.get_directions(category_id)
+        ]
+
+    items = await _items(("directions", lang, category_id or 0), lang, load)
+    return reg_directions_keyboard(items, selected_ids=selected_ids, lang=lang, page=page)
+
+
+async def warm_up_keyboards() -> None:
+    """
+    Первые страницы общих клавиатур на всех языках — при старте бота.
+    """
+    for lang, _name in settings.LANGUAGES:
+        await problem_directions_markup(lang)
+        for allow_skip in (False, True):
+            await reg_regions_markup(lang, allow_skip=allow_skip)
+            await reg_categories_markup(lang, allow_skip=allow_skip)
@@ -1,16 +1,46 @@
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
+from django.conf import settings
 
 from apps.tg_bot.bot.utils.i18n import tr, get_i18n_attr
 
+# кнопка-номер страницы: отвечаем на callback и ничего не делаем (handlers/common.py)
+NOOP_CALLBACK = "kb:noop"
 
-def problem_directions_keyboard(problem_directions, lang: str = "uz") -> InlineKeyboardMarkup:
+
+def _page_items(items, page: int, page_size: int | None = None) -> tuple[list, int, int]:
+    """
+    (элементы страницы, всего страниц, page в допустимом диапазоне).
+    """
+    items = list(items)
+    page_size = page_size or settings.TELEGRAM_KEYBOARD_PAGE_SIZE
+    pages = max((len(items) + page_size - 1) // page_size, 1)
+    page = min(max(page, 0), pages - 1)
+    return items[page * page_size:(page + 1) * page_size], pages, page
+
+
+def _pager_rows(prefix: str, page: int, pages: int) -> list[list[InlineKeyboardButton]]:
+    # ◀️ 2/5 ▶️; callback_data = f"{prefix}:{номер страницы}"
+    if pages <= 1:
+        return []
+    row = []
+    if page > 0:
+        row.append(InlineKeyboardButton(text="◀️", callback_data=f"{prefix}:{page - 1}"))
+    row.append(InlineKeyboardButton(text=f"{page + 1}/{pages}", callback_data=NOOP_CALLBACK))
+    if page < pages - 1:
+        row.append(InlineKeyboardButton(text="▶️", callback_data=f"{prefix}:{page + 1}"))
+    return [row]
+
+
+def problem_directions_keyboard(problem_directions, lang: str = "uz", page: int = 0) -> InlineKeyboardMarkup:
+    items, pages, page = _page_items(problem_directions, page)
     rows = [
         [InlineKeyboardButton(
             text=get_i18n_attr(item, "name", lang),
             callback_data=f"cr:pd:{item.id}"
         )]
-        for item in problem_directions
+        for item in items
     ]
+    rows += _pager_rows("cr:pdp", page, pages)
     rows.append([InlineKeyboardButton(text=tr(lang, "cancel"), callback_data="cr:cancel")])
     return InlineKeyboardMarkup(inline_keyboard=rows)
 
@@ -90,28 +120,32 @@ def confirm_request_keyboard(lang: str = "uz") -> InlineKeyboardMarkup:
     )
 
 
-def reg_regions_keyboard(regions, allow_skip: bool = False, lang: str = "uz") -> InlineKeyboardMarkup:
+def reg_regions_keyboard(regions, allow_skip: bool = False, lang: str = "uz", page: int = 0) -> InlineKeyboardMarkup:
+    items, pages, page = _page_items(regions, page)
     rows = [
         [InlineKeyboardButton(
             text=get_i18n_attr(item, "name", lang),
             callback_data=f"reg:reg:{item.id}"
         )]
-        for item in regions
+        for item in items
     ]
+    rows += _pager_rows("reg:regp", page, pages)
     if allow_skip:
         rows.append([InlineKeyboardButton(text=tr(lang, "skip"), callback_data="reg:reg:skip")])
     rows.append([InlineKeyboardButton(text=tr(lang, "cancel"), callback_data="reg:cancel")])
     return InlineKeyboardMarkup(inline_keyboard=rows)
 
 
-def reg_districts_keyboard(districts, allow_skip: bool = False, lang: str = "uz") -> InlineKeyboardMarkup:
+def reg_districts_keyboard(districts, allow_skip: bool = False, lang: str = "uz", page: int = 0) -> InlineKeyboardMarkup:
+    items, pages, page = _page_items(districts, page)
     rows = [
         [InlineKeyboardButton(
             text=get_i18n_attr(item, "name", lang),
             callback_data=f"reg:dist:{item.id}"
         )]
-        for item in districts
+        for item in items
     ]
+    rows += _pager_rows("reg:distp", page, pages)
     rows.append([InlineKeyboardButton(text=tr(lang, "back"), callback_data="reg:back:region")])
     if allow_skip:
         rows.append([InlineKeyboardButton(text=tr(lang, "skip"), callback_data="reg:dist:skip")])
@@ -119,33 +153,46 @@ def reg_districts_keyboard(districts, allow_skip: bool = False, lang: str = "uz"
     return InlineKeyboardMarkup(inline_keyboard=rows)
 
 
-def reg_categories_keyboard(categories, allow_skip: bool = False, lang: str = "uz") -> InlineKeyboardMarkup:
+def reg_categories_keyboard(categories, allow_skip: bool = False, lang: str = "uz", page: int = 0) -> InlineKeyboardMarkup:
+    items, pages, page = _page_items(categories, page)
     rows = [
         [InlineKeyboardButton(
             text=get_i18n_attr(item, "name", lang),
             callback_data=f"reg:cat:{item.id}"
         )]
-        for item in categories
+        for item in items
     ]
+    rows += _pager_rows("reg:catp", page, pages)
     if allow_skip:
         rows.append([InlineKeyboardButton(text=tr(lang, "skip"), callback_data="reg:cat:skip")])
     rows.append([InlineKeyboardButton(text=tr(lang, "cancel"), callback_data="reg:cancel")])
     return InlineKeyboardMarkup(inline_keyboard=rows)
 
 
-def reg_directions_keyboard(directions, selected_ids: set[int] | None = None, lang: str = "uz") -> InlineKeyboardMarkup:
+def reg_directions_keyboard(
+    directions,
+    selected_ids: set[int] | None = None,
+    lang: str = "uz",
+    page: int = 0,
+) -> InlineKeyboardMarkup:
+    """
+    directions — объекты Direction или готовые пары (id, title) из keyboards/cache.py.
+    """
     selected_ids = selected_ids or set()
+    items, pages, page = _page_items(directions, page)
     rows = []
 
-    for item in directions:
-        checked = "✅ " if item.id in selected_ids else ""
+    for item in items:
+        item_id, title = item if isinstance(item, tuple) else (item.id, get_i18n_attr(item, "title", lang))
+        checked = "✅ " if item_id in selected_ids else ""
         rows.append([
             InlineKeyboardButton(
-                text=f"{checked}{get_i18n_attr(item, 'title', lang)}",
-                callback_data=f"reg:dir:{item.id}",
+                text=f"{checked}{title}",
+                callback_data=f"reg:dir:{item_id}",
             )
         ])
 
+    rows += _pager_rows("reg:dirp", page, pages)
     rows.append([InlineKeyboardButton(text=tr(lang, "done"), callback_data="reg:dir:done")])
     rows.append([InlineKeyboardButton(text=tr(lang, "skip"), callback_data="reg:dir:skip")])
     rows.append([InlineKeyboardButton(text=tr(lang, "cancel"), callback_data="reg:cancel")])
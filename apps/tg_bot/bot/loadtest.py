@@ -0,0 +1,413 @@
+# apps/tg_bot/bot/loadtest.py
+#
+# Нагрузочный прогон бота без сети (manage.py tg_bot_load_test).
+#
+# Настоящий Dispatcher из build_dispatcher() + FakeBotSession: синтетические
+# пользователи проходят авторизацию по телефону или регистрацию по ИНН, создают
+# обращение и открывают "Мои обращения". Каждый пользователь шлёт апдейты
+# последовательно, пользователи — параллельно (не больше concurrency).
+#
+# Замеры: задержка каждого шага (feed_update целиком, с middleware) и каждого
+# хендлера, SQL-запросы на шаг (db_execute_wrapper), ожидание в пуле потоков БД.
+#
+# По умолчанию команда работает во временной тестовой БД. С настроенной БД
+# (--use-configured-db, только при DEBUG или --allow-write-db) всё созданное
+# удаляется после прогона (cleanup_load_test_data). Синтетические пользователи —
+# отрицательные id: Telegram таких пользователям не выдаёт.
+from __future__ import annotations
+
+import asyncio
+import itertools
+import random
+import time
+
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any
+
+from aiogram import BaseMiddleware, Bot, Dispatcher
+from aiogram.dispatcher.event.handler import HandlerObject
+from aiogram.types import TelegramObject, Update
+from django.db import transaction
+from django.db.models import Q
+
+from apps.agency.models import Department, ProblemDirection
+from apps.companies.models import Category, Company, Direction, District, EmployeeCompany, Region
+from apps.companies.normalization import company_name_key, norm_inn_key, person_name_key
+from apps.requests.models import Request
+from apps.tg_bot.bot.utils.db import db_execute_wrapper
+from apps.tg_bot.models import TelegramFsmState, TelegramProfile, TelegramRequestSubmission
+
+LOADTEST_NAME = "Loadtest"
+DEFAULT_USER_ID_BASE = -2_000_000_000
+
+
+@dataclass(frozen=True)
+class LoadTestFixture:
+    problem_direction_id: int
+    region_id: int
+    district_id: int
+    category_id: int
+    direction_id: int
+
+
+def auth_phone(index: int) -> str:
+    return f"+99890{index:07d}"
+
+
+def registration_phone(index: int) -> str:
+    return f"+99891{index:07d}"
+
+
+@transaction.atomic
+def seed_load_test_data(users: int) -> LoadTestFixture:
+    """
+    Справочники "Loadtest" и компании с сотрудниками для авторизации по телефону
+    (по одной на пользователя, с email — шаг ввода email не нужен).
+    Повторный вызов дозаполняет недостающее.
+    """
+    department, _ = Department.objects.get_or_create(name=LOADTEST_NAME)
+    problem_direction, _ = ProblemDirection.objects.get_or_create(
+        name=LOADTEST_NAME, defaults={"department": department}
+    )
+    region, _ = Region.objects.get_or_create(name=LOADTEST_NAME)
+    district, _ = District.objects.get_or_create(name=LOADTEST_NAME, region=region)
+    category, _ = Category.objects.get_or_create(name=LOADTEST_NAME)
+    direction, _ = Direction.objects.get_or_create(title=LOADTEST_NAME, category=category)
+
+    inns = {f"6{i:08d}": i for i in range(users)}
+    existing = set(Company.objects.filter(inn__in=inns).values_list("inn", flat=True))
+    # bulk_create без save(): ключи поиска заполняем сами
+    Company.objects.bulk_create([
+        Company(
+            name=f"{LOADTEST_NAME} {i}",
+            name_key=company_name_key(f"{LOADTEST_NAME} {i}"),
+            inn=inn,
+            inn_key=norm_inn_key(inn),
+            region=region,
+            district=district,
+        )
+        for inn, i in inns.items()
+        if inn not in existing
+    ], batch_size=500)
+
+    with_employee = set(
+        EmployeeCompany.objects.filter(company__inn__in=inns).values_list("company__inn", flat=True)
+    )
+    EmployeeCompany.objects.bulk_create([
+        EmployeeCompany(
+            company=company,
+            first_name="Load",
+            last_name=f"Test{inns[company.inn]}",
+            name_key=person_name_key(f"Test{inns[company.inn]}", "Load", None),
+            phone=auth_phone(inns[company.inn]),
+            email=f"loadtest{inns[company.inn]}@example.com",
+        )
+        for company in Company.objects.filter(inn__in=inns).exclude(inn__in=with_employee).only("id", "inn")
+    ], batch_size=500)
+
+    return LoadTestFixture(
+        problem_direction_id=problem_direction.pk,
+        region_id=region.pk,
+        district_id=district.pk,
+        category_id=category.pk,
+        direction_id=direction.pk,
+    )
+
+
+def reset_load_test_users(user_ids: list[int]) -> None:
+    """
+    Синтетические пользователи каждый прогон начинают с /start без профиля.
+    """
+    TelegramProfile.objects.filter(telegram_user_id__in=user_ids).delete()
+    TelegramFsmState.objects.filter(user_id__in=user_ids).delete()
+    TelegramRequestSubmission.objects.filter(telegram_user_id__in=user_ids).delete()
+
+
+@transaction.atomic
+def cleanup_load_test_data(user_ids: list[int], users: int) -> dict:
+    """
+    Удаляет всё, что создали seed_load_test_data и прогон: обращения синтетических
+    пользователей, их профили/FSM/заявки, компании (засеянные и зарегистрированные
+    в диалоге) и справочники "Loadtest".
+    """
+    profiles = TelegramProfile.objects.filter(telegram_user_id__in=user_ids)
+    seeded_inns = [f"6{i:08d}" for i in range(users)]
+    company_ids = set(profiles.exclude(company=None).values_list("company_id", flat=True))
+    company_ids |= set(Company.objects.filter(inn__in=seeded_inns).values_list("pk", flat=True))
+
+    requests = Request.objects.filter(Q(telegram_profile__in=profiles) | Q(company_id__in=company_ids))
+    deleted = {"requests": requests.delete()[1].get(Request._meta.label, 0)}
+    reset_load_test_users(user_ids)
+    # EmployeeCompany и прочее — каскадом от компании
+    deleted["companies"] = Company.objects.filter(pk__in=company_ids).delete()[1].get(Company._meta.label, 0)
+
+    Direction.objects.filter(title=LOADTEST_NAME).delete()
+    Category.objects.filter(name=LOADTEST_NAME).delete()
+    District.objects.filter(name=LOADTEST_NAME).delete()
+    Region.objects.filter(name=LOADTEST_NAME).delete()
+    ProblemDirection.objects.filter(name=LOADTEST_NAME).delete()
+    Department.objects.filter(name=LOADTEST_NAME).delete()
+    return deleted
+
+
+def count_created_requests(user_ids: list[int]) -> int:
+    return TelegramRequestSubmission.objects.filter(
+        telegram_user_id__in=user_ids,
+        status=TelegramRequestSubmission.Status.DONE,
+    ).count()
+
+
+# ---------------- апдейты ----------------
+
+class SyntheticUser:
+    """
+    Собирает апдейты от имени одного пользователя Telegram (приватный чат).
+    """
+
+    _update_ids = itertools.count(1)
+
+    def __init__(self, user_id: int):
+        self.user_id = user_id
+        self._message_ids = itertools.count(1)
+        # карточка, которую бот редактирует по callback-ам (как в реальном диалоге)
+        self.card_message_id = 1
+
+    def _base_message(self) -> dict:
+        return {
+            "message_id": next(self._message_ids),
+            "date": int(datetime.now(timezone.utc).timestamp()),
+            "chat": {"id": self.user_id, "type": "private"},
+            "from": {"id": self.user_id, "is_bot": False, "first_name": "Load", "language_code": "ru"},
+        }
+
+    def text(self, text: str) -> dict:
+        message = self._base_message()
+        message["text"] = text
+        self.card_message_id = message["message_id"]
+        return {"update_id": next(self._update_ids), "message": message}
+
+    def contact(self, phone: str) -> dict:
+        message = self._base_message()
+        message["contact"] = {"phone_number": phone, "first_name": "Load", "user_id": self.user_id}
+        return {"update_id": next(self._update_ids), "message": message}
+
+    def callback(self, data: str) -> dict:
+        update_id = next(self._update_ids)
+        return {
+            "update_id": update_id,
+            "callback_query": {
+                "id": str(update_id),
+                "from": {"id": self.user_id, "is_bot": False, "first_name": "Load", "language_code": "ru"},
+                "chat_instance": str(self.user_id),
+                "data": data,
+                "message": {
+                    "message_id": self.card_message_id,
+                    "date": int(datetime.now(timezone.utc).timestamp()),
+                    "chat": {"id": self.user_id, "type": "private"},
+                    "text": "card",
+                },
+            },
+        }
+
+
+Step = tuple[str, dict]
+
+
+def auth_steps(user: SyntheticUser, index: int) -> list[Step]:
+    return [
+        ("start", user.text("/start")),
+        ("language", user.text("🇷🇺 Русский")),
+        ("auth.contact", user.contact(auth_phone(index))),
+    ]
+
+
+def registration_steps(user: SyntheticUser, index: int, fixture: LoadTestFixture, run_tag: int) -> list[Step]:
+    inn = f"7{(run_tag * 100000 + index) % 10 ** 8:08d}"
+    return [
+        ("start", user.text("/start")),
+        ("language", user.text("🇷🇺 Русский")),
+        ("auth.phone_unknown", user.text(registration_phone(index))),
+        ("reg.inn", user.text(inn)),
+        ("reg.company_name", user.text(f"{LOADTEST_NAME} new {inn}")),
+        ("reg.region", user.callback(f"reg:reg:{fixture.region_id}")),
+        ("reg.district", user.callback(f"reg:dist:{fixture.district_id}")),
+        ("reg.fio", user.text("Testov Load Loadovich")),
+        ("reg.email", user.text(f"loadtest-new{index}@example.com")),
+        ("reg.category", user.callback(f"reg:cat:{fixture.category_id}")),
+        ("reg.direction", user.callback(f"reg:dir:{fixture.direction_id}")),
+        ("reg.directions_done", user.callback("reg:dir:done")),
+        ("reg.confirm", user.callback("reg:confirm")),
+    ]
+
+
+def request_steps(user: SyntheticUser, fixture: LoadTestFixture) -> list[Step]:
+    return [
+        ("cr.entry", user.text("➕ Создать обращение")),
+        ("cr.problem_direction", user.callback(f"cr:pd:{fixture.problem_direction_id}")),
+        ("cr.description", user.text("Нагрузочный тест: описание проблемы достаточной длины")),
+        ("cr.skip_files", user.callback("cr:file:skip")),
+        ("cr.confirm", user.callback("cr:confirm")),
+        ("my_requests", user.text("📄 Мои обращения")),
+    ]
+
+
+# ---------------- замеры ----------------
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(int(len(values) * q), len(values) - 1)]
+
+
+@dataclass
+class Samples:
+    durations: list[float] = field(default_factory=list)
+    queries: list[int] = field(default_factory=list)
+    errors: int = 0
+
+    def summary(self) -> dict:
+        d = self.durations
+        return {
+            "count": len(d),
+            "p50_ms": round(percentile(d, 0.50) * 1000, 2),
+            "p95_ms": round(percentile(d, 0.95) * 1000, 2),
+            "p99_ms": round(percentile(d, 0.99) * 1000, 2),
+            "max_ms": round(max(d, default=0.0) * 1000, 2),
+            "queries_avg": round(sum(self.queries) / len(self.queries), 1) if self.queries else None,
+            "errors": self.errors,
+        }
+
+
+class LoadTestRecorder:
+    def __init__(self):
+        self.steps: dict[str, Samples] = {}
+        self.handlers: dict[str, Samples] = {}
+
+    def step(self, label: str) -> Samples:
+        return self.steps.setdefault(label, Samples())
+
+    def handler(self, name: str) -> Samples:
+        return self.handlers.setdefault(name, Samples())
+
+
+class HandlerTimingMiddleware(BaseMiddleware):
+    """
+    Inner middleware: время самого хендлера, без outer middleware и фильтров.
+    """
+
+    def __init__(self, recorder: LoadTestRecorder):
+        self.recorder = recorder
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        handler_obj: HandlerObject | None = data.get("handler")
+        name = handler_obj.callback.__name__ if handler_obj else "unknown"
+        samples = self.recorder.handler(name)
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception:
+            # дальше исключение проглотит errors-роутер, поэтому считаем здесь
+            samples.errors += 1
+            raise
+        finally:
+            samples.durations.append(time.perf_counter() - started)
+
+
+def install_handler_timing(dp: Dispatcher, recorder: LoadTestRecorder) -> None:
+    # inner middleware родительского роутера действуют и во включённых роутерах
+    middleware = HandlerTimingMiddleware(recorder)
+    dp.message.middleware(middleware)
+    dp.callback_query.middleware(middleware)
+
+
+# ---------------- прогон ----------------
+
+@dataclass
+class LoadTestConfig:
+    users: int
+    concurrency: int
+    user_id_base: int
+    registration_share: float = 0.3
+    think_time: float = 0.0
+    seed: int = 0
+
+
+async def run_user(
+    bot: Bot,
+    dp: Dispatcher,
+    recorder: LoadTestRecorder,
+    steps: list[Step],
+    think_time: float,
+) -> None:
+    for label, raw in steps:
+        queries = 0
+
+        def count_query(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        samples = recorder.step(label)
+        token = db_execute_wrapper.set(count_query)
+        started = time.perf_counter()
+        try:
+            await dp.feed_update(bot, Update.model_validate(raw, context={"bot": bot}))
+        except Exception:
+            samples.errors += 1
+        finally:
+            samples.durations.append(time.perf_counter() - started)
+            samples.queries.append(queries)
+            db_execute_wrapper.reset(token)
+
+        if think_time:
+            await asyncio.sleep(random.uniform(0, think_time * 2))
+
+
+def build_user_steps(config: LoadTestConfig, fixture: LoadTestFixture) -> list[list[Step]]:
+    rnd = random.Random(config.seed)
+    # ИНН регистраций уникальны для прогона: компания из прошлого прогона увела бы
+    # диалог в ветку "компания найдена"
+    run_tag = int(time.time()) % 1000
+    plans = []
+    for index in range(config.users):
+        user = SyntheticUser(config.user_id_base + index)
+        if rnd.random() < config.registration_share:
+            steps = registration_steps(user, index, fixture, run_tag)
+        else:
+            steps = auth_steps(user, index)
+        plans.append(steps + request_steps(user, fixture))
+    return plans
+
+
+async def run_load_test(
+    bot: Bot,
+    dp: Dispatcher,
+    plans: list[list[Step]],
+    *,
+    concurrency: int,
+    think_time: float = 0.0,
+) -> tuple[LoadTestRecorder, float]:
+    recorder = LoadTestRecorder()
+    install_handler_timing(dp, recorder)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def limited(steps: list[Step]) -> None:
+        async with semaphore:
+            await run_user(bot, dp, recorder, steps, think_time)
+
+    await dp.emit_startup(bot=bot)
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(limited(steps) for steps in plans))
+    finally:
+        # дожидаемся фонового создания обращений (SubmissionWorker.stop)
+        await dp.emit_shutdown(bot=bot)
+    return recorder, time.perf_counter() - started
@@ -1,12 +1,19 @@
 import asyncio
 import logging
+import signal
 
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
 from django.conf import settings
 
 from apps.tg_bot.bot.handlers import start, auth, common, create_request, registration, recovery, errors
+from apps.tg_bot.bot.keyboards.cache import warm_up_keyboards
+from apps.tg_bot.bot.storage import DjangoFsmStorage, build_fsm_storage, run_fsm_maintenance
+from apps.tg_bot.bot.submissions import SubmissionWorker
+from apps.tg_bot.bot.utils.antiflood import AntifloodMiddleware, install_antiflood
 from apps.tg_bot.bot.utils.db import DjangoDbConnectionMiddleware
+from apps.tg_bot.bot.utils.notifications import run_notification_digests
+from apps.tg_bot.bot.utils.profile_context import ProfileContextMiddleware
 
 logger = logging.getLogger(__name__)
 
@@ -22,8 +29,13 @@ def build_bot() -> Bot:
 
 
 def build_dispatcher() -> Dispatcher:
-    dp = Dispatcher()
+    storage = build_fsm_storage()
+    dp = Dispatcher(storage=storage)
+    if settings.TELEGRAM_ANTIFLOOD_ENABLED:
+        # до FSMContextMiddleware: отброшенный апдейт не должен доходить до БД
+        install_antiflood(dp, AntifloodMiddleware())
     dp.update.outer_middleware(DjangoDbConnectionMiddleware())
+    dp.update.outer_middleware(ProfileContextMiddleware())
 
     dp.include_router(start.router)
     dp.include_router(auth.router)
@@ -33,9 +45,69 @@ def build_dispatcher() -> Dispatcher:
     dp.include_router(recovery.router)
     dp.include_router(errors.router)
 
+    dp.startup.register(_warm_up_keyboards)
+    _setup_submission_worker(dp)
+    _setup_notification_digests(dp)
+    if isinstance(storage, DjangoFsmStorage):
+        _setup_fsm_maintenance(dp, storage)
+
     return dp
 
 
+async def _warm_up_keyboards():
+    try:
+        await warm_up_keyboards()
+    except Exception:
+        # БД может быть недоступна при старте — клавиатуры соберутся по первому запросу
+        logger.warning("Keyboard cache warm-up failed", exc_info=True)
+
+
+def _setup_submission_worker(dp: Dispatcher) -> None:
+    worker = SubmissionWorker()
+    # попадает в data хендлеров как submission_worker
+    dp["submission_worker"] = worker
+
+    async def on_startup(bot: Bot):
+        await worker.start(bot)
+
+    async def on_shutdown():
+        await worker.stop()
+
+    dp.startup.register(on_startup)
+    dp.shutdown.register(on_shutdown)
+
+
+def _setup_notification_digests(dp: Dispatcher) -> None:
+    tasks: list[asyncio.Task] = []
+
+    async def on_startup(bot: Bot):
+        tasks.append(asyncio.create_task(run_notification_digests(bot)))
+
+    async def on_shutdown():
+        for task in tasks:
+            task.cancel()
+        tasks.clear()
+
+    dp.startup.register(on_startup)
+    dp.shutdown.register(on_shutdown)
+
+
+def _setup_fsm_maintenance(dp: Dispatcher, storage: DjangoFsmStorage) -> None:
+    tasks: list[asyncio.Task] = []
+
+    async def on_startup():
+        tasks.append(asyncio.create_task(run_fsm_maintenance(storage)))
+
+    async def on_shutdown():
+        for task in tasks:
+            task.cancel()
+        tasks.clear()
+        await storage.close()
+
+    dp.startup.register(on_startup)
+    dp.shutdown.register(on_shutdown)
+
+
 async def _run_polling():
     bot = build_bot()
     dp = build_dispatcher()
@@ -47,9 +119,55 @@ async def _run_polling():
         await bot.session.close()
 
 
-def run_polling():
+def _setup_logging():
     logging.basicConfig(
         level=logging.INFO,
         format="%(asctime)s | %(levelname)s | %(name)s | %(message)s",
     )
+
+
+def run_polling():
+    _setup_logging()
     asyncio.run(_run_polling())
+
+
+async def _run_webhook(host: str, port: int, shard: int, register: bool):
+    from aiohttp import web
+
+    from apps.tg_bot.bot.webhook import build_webhook_app, set_webhook
+
+    bot = build_bot()
+    dp = build_dispatcher()
+    if register:
+        await set_webhook(bot, dp)
+
+    app = build_webhook_app(bot, dp, shard=shard)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+
+    # SIGTERM/SIGINT (деплой, systemd stop) -> штатная остановка: runner.cleanup()
+    # запускает on_shutdown приложения — дорабатываются принятые апдейты (Telegram
+    # их уже не пришлёт повторно) и сбрасывается FSM-хранилище
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            # Windows / не главный поток — остаётся KeyboardInterrupt
+            pass
+
+    logger.info("Starting Telegram bot webhook on %s:%s (shard %s)...", host, port, shard)
+    try:
+        await site.start()
+        await stop.wait()
+        logger.info("Stopping Telegram bot webhook, draining accepted updates...")
+    finally:
+        await runner.cleanup()
+        await bot.session.close()
+
+
+def run_webhook(host: str, port: int, shard: int = 0, register: bool = False):
+    _setup_logging()
+    asyncio.run(_run_webhook(host, port, shard, register))
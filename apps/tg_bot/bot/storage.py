@@ -0,0 +1,231 @@
+# apps/tg_bot/bot/storage.py
+#
+# FSM-хранилище aiogram в нашей БД (TelegramFsmState): диалоги переживают
+# рестарт/деплой, и несколько процессов бота видят одно и то же состояние.
+#
+# Каждая запись — атомарный read-modify-write одной строки под select_for_update,
+# поэтому воркеры могут делить таблицу. Чтение всегда идёт в БД (строка по
+# уникальному ключу), в памяти держим только отложенные "касания".
+#
+# Коалесцирование: хендлеры почти на каждом шаге зовут
+# update_data(last_step_at=...). Если кроме last_step_at ничего не меняется,
+# а строку мы писали меньше TELEGRAM_FSM_TOUCH_SECONDS назад — значение
+# откладывается в память и уходит в БД вместе со следующей настоящей записью
+# (или фоновым flush). Сессия живёт SESSION_TTL_MINUTES, отставание last_step_at
+# на несколько секунд в БД ничего не меняет.
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+
+from datetime import timedelta
+from typing import Any, Mapping
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from apps.tg_bot.bot.utils.db import database_sync_to_async
+from apps.tg_bot.bot.utils.session_guard import SESSION_TTL_MINUTES
+from apps.tg_bot.models import TelegramFsmState
+
+logger = logging.getLogger(__name__)
+
+TOUCH_KEYS = frozenset({"last_step_at"})
+
+_UNSET = object()
+
+
+def _row_key(key: StorageKey) -> dict:
+    return {
+        "bot_id": key.bot_id,
+        "chat_id": key.chat_id,
+        "user_id": key.user_id,
+        "thread_id": key.thread_id or 0,
+        "business_connection_id": key.business_connection_id or "",
+        "destiny": key.destiny,
+    }
+
+
+def _state_name(state: StateType) -> str | None:
+    return state.state if isinstance(state, State) else state
+
+
+# ---------------- sync-часть (поток БД) ----------------
+
+def _load(row_key: dict) -> tuple[str | None, dict]:
+    row = TelegramFsmState.objects.filter(**row_key).values_list("state", "data").first()
+    if row is None:
+        return None, {}
+    return row[0], dict(row[1] or {})
+
+
+def _write_once(row_key: dict, state, data, merge) -> dict:
+    with transaction.atomic():
+        obj = TelegramFsmState.objects.select_for_update().filter(**row_key).first()
+        if obj is None:
+            obj = TelegramFsmState(**row_key)
+
+        if state is not _UNSET:
+            obj.state = state
+        if data is not None:
+            obj.data = data
+        if merge:
+            obj.data = {**(obj.data or {}), **merge}
+
+        # state.clear() -> пустая строка не нужна
+        if obj.state is None and not obj.data:
+            if obj.pk:
+                obj.delete()
+            return {}
+
+        obj.save()
+        return dict(obj.data)
+
+
+def _write(row_key: dict, *, state=_UNSET, data: dict | None = None, merge: dict | None = None) -> dict:
+    try:
+        return _write_once(row_key, state, data, merge)
+    except IntegrityError:
+        # другой воркер успел вставить строку с тем же ключом — теперь она есть, блокируем её
+        return _write_once(row_key, state, data, merge)
+
+
+def _flush_touches(items: list[tuple[dict, dict]]) -> None:
+    for row_key, values in items:
+        with transaction.atomic():
+            obj = TelegramFsmState.objects.select_for_update().filter(**row_key).first()
+            if obj is None:
+                continue
+            obj.data = {**(obj.data or {}), **values}
+            obj.save(update_fields=["data", "updated_at"])
+
+
+def cleanup_expired_states(*, ttl_minutes: int | None = None) -> int:
+    """
+    Удаляет состояния, которые не менялись дольше SESSION_TTL_MINUTES + запас.
+    Запас нужен, чтобы пользователь, вернувшийся к просроченному диалогу,
+    ещё получил "session_recovered", а не немую реакцию.
+    """
+    if ttl_minutes is None:
+        ttl_minutes = SESSION_TTL_MINUTES + settings.TELEGRAM_FSM_CLEANUP_GRACE_MINUTES
+    border = timezone.now() - timedelta(minutes=ttl_minutes)
+    deleted, _ = TelegramFsmState.objects.filter(updated_at__lt=border).delete()
+    return deleted
+
+
+# ---------------- storage ----------------
+
+class DjangoFsmStorage(BaseStorage):
+    def __init__(self, *, touch_seconds: int | None = None, touch_keys=TOUCH_KEYS):
+        self.touch_seconds = settings.TELEGRAM_FSM_TOUCH_SECONDS if touch_seconds is None else touch_seconds
+        self.touch_keys = frozenset(touch_keys)
+        # ключ строки (tuple) -> отложенные значения / момент последней записи (monotonic)
+        self._touches: dict[tuple, dict] = {}
+        self._written_at: dict[tuple, float] = {}
+
+    @staticmethod
+    def _tkey(row_key: dict) -> tuple:
+        return tuple(row_key.values())
+
+    def _mark_written(self, tkey: tuple) -> None:
+        self._written_at[tkey] = time.monotonic()
+
+    def _recently_written(self, tkey: tuple) -> bool:
+        at = self._written_at.get(tkey)
+        return at is not None and time.monotonic() - at < self.touch_seconds
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        row_key = _row_key(key)
+        tkey = self._tkey(row_key)
+        await database_sync_to_async(_write)(
+            row_key, state=_state_name(state), merge=self._touches.pop(tkey, None)
+        )
+        self._mark_written(tkey)
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        state, _data = await database_sync_to_async(_load)(_row_key(key))
+        return state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        row_key = _row_key(key)
+        tkey = self._tkey(row_key)
+        # data заменяется целиком — отложенные касания больше не актуальны
+        self._touches.pop(tkey, None)
+        await database_sync_to_async(_write)(row_key, data=dict(data))
+        self._mark_written(tkey)
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        row_key = _row_key(key)
+        _state, data = await database_sync_to_async(_load)(row_key)
+        pending = self._touches.get(self._tkey(row_key))
+        if pending:
+            data.update(pending)
+        return data
+
+    async def update_data(self, key: StorageKey, data: Mapping[str, Any]) -> dict[str, Any]:
+        row_key = _row_key(key)
+        tkey = self._tkey(row_key)
+        data = dict(data)
+
+        if data and data.keys() <= self.touch_keys and self._recently_written(tkey):
+            self._touches.setdefault(tkey, {}).update(data)
+            return await self.get_data(key)
+
+        merge = {**self._touches.pop(tkey, {}), **data}
+        result = await database_sync_to_async(_write)(row_key, merge=merge)
+        self._mark_written(tkey)
+        return result
+
+    async def flush(self) -> int:
+        """
+        Пишет отложенные касания в БД. Зовётся фоновой задачей и при остановке.
+        """
+        now = time.monotonic()
+        self._written_at = {k: at for k, at in self._written_at.items() if now - at < self.touch_seconds}
+
+        touches, self._touches = self._touches, {}
+        if not touches:
+            return 0
+
+        fields = ("bot_id", "chat_id", "user_id", "thread_id", "business_connection_id", "destiny")
+        items = [(dict(zip(fields, tkey)), values) for tkey, values in touches.items()]
+        await database_sync_to_async(_flush_touches)(items)
+        return len(items)
+
+    async def close(self) -> None:
+        try:
+            await self.flush()
+        except Exception:
+            logger.warning("FSM storage: failed to flush pending touches", exc_info=True)
+
+
+async def run_fsm_maintenance(storage: DjangoFsmStorage) -> None:
+    """
+    Фоновая задача бота: flush касаний и чистка просроченных состояний.
+    Запускается в каждом воркере — DELETE идемпотентен.
+    """
+    cleanup_every = settings.TELEGRAM_FSM_CLEANUP_INTERVAL_SECONDS
+    tick = min(cleanup_every, storage.touch_seconds or cleanup_every)
+    cleaned_at = time.monotonic()
+    while True:
+        await asyncio.sleep(tick)
+        try:
+            await storage.flush()
+            if time.monotonic() - cleaned_at >= cleanup_every:
+                cleaned_at = time.monotonic()
+                deleted = await database_sync_to_async(cleanup_expired_states)()
+                if deleted:
+                    logger.info("FSM storage: %s expired state(s) removed", deleted)
+        except Exception:
+            logger.warning("FSM storage maintenance failed", exc_info=True)
+
+
+def build_fsm_storage() -> BaseStorage:
+    if settings.TELEGRAM_FSM_STORAGE == "memory":
+        return MemoryStorage()
+    return DjangoFsmStorage()
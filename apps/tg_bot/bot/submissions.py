@@ -0,0 +1,178 @@
+# apps/tg_bot/bot/submissions.py
+#
+# Фоновая обработка подтверждённых обращений. Хендлер cr:confirm только ставит
+# TelegramRequestSubmission в очередь и меняет карточку на "обрабатывается";
+# воркер создаёт обращение, рассылает уведомления в группы и дописывает
+# в ту же карточку итоговый номер.
+#
+# Очередь в памяти процесса, источник истины — таблица: при старте и затем раз
+# в TELEGRAM_SUBMISSION_SWEEP_SECONDS воркер забирает всё, что осталось в queued
+# (хендлер упал до submit, рестарт), зависло в processing или создано, но
+# не разослано в группы (done, notified=False) — такому обращению повторяются
+# только уведомление и карточка. Двойную обработку исключает claim_telegram_submission.
+#
+# Хендлер вызывает submit() сразу после постановки в очередь, до вызовов Bot API,
+# и держит карточку (hold_card), пока сам не поменяет её на "обрабатывается":
+# иначе быстрый воркер мог бы записать итог раньше, а хендлер — затереть его.
+from __future__ import annotations
+
+import asyncio
+import logging
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
+from django.conf import settings
+
+from apps.tg_bot.bot.utils.db import database_sync_to_async as sync_to_async
+from apps.tg_bot.bot.utils.files import AttachmentTooLarge, download_telegram_attachments, release_attachments
+from apps.tg_bot.bot.utils.i18n import tr, translate_request_status
+from apps.tg_bot.bot.utils.notifications import notify_request_created
+from apps.tg_bot.models import TelegramRequestSubmission
+from apps.tg_bot.services import (
+    claim_telegram_submission,
+    complete_telegram_submission,
+    fail_telegram_submission,
+    get_pending_telegram_submission_ids,
+    mark_telegram_submission_notified,
+)
+
+logger = logging.getLogger(__name__)
+
+
+CARD_HOLD_TIMEOUT = 10
+
+
+async def _edit_card(
+    bot: Bot,
+    submission: TelegramRequestSubmission,
+    text: str,
+    card_ready: asyncio.Event | None = None,
+) -> None:
+    if card_ready is not None:
+        try:
+            await asyncio.wait_for(card_ready.wait(), timeout=CARD_HOLD_TIMEOUT)
+        except asyncio.TimeoutError:
+            pass
+    try:
+        await bot.edit_message_text(chat_id=submission.chat_id, message_id=submission.message_id, text=text)
+    except (TelegramBadRequest, TelegramForbiddenError):
+        # карточку удалили / бота заблокировали — пишем новым сообщением, если можно
+        try:
+            await bot.send_message(chat_id=submission.chat_id, text=text)
+        except (TelegramBadRequest, TelegramForbiddenError):
+            logger.info("Cannot deliver submission %s result to chat %s", submission.pk, submission.chat_id)
+
+
+async def process_submission(bot: Bot, submission_id: int, card_ready: asyncio.Event | None = None) -> None:
+    submission = await sync_to_async(claim_telegram_submission)(submission_id)
+    if submission is None:
+        return
+
+    lang = submission.lang
+    if submission.status == TelegramRequestSubmission.Status.DONE:
+        # обращение уже создано (упали до уведомления) — только рассылка и карточка
+        req = submission.request
+    else:
+        try:
+            attachments = await download_telegram_attachments(bot, submission.payload.get("attachments_meta", []))
+            try:
+                req = await sync_to_async(complete_telegram_submission)(submission.pk, attachments=attachments)
+            finally:
+                release_attachments(attachments)
+        except AttachmentTooLarge:
+            await sync_to_async(fail_telegram_submission)(submission.pk, "attachment too large")
+            await _edit_card(bot, submission, tr(lang, "file_too_large"), card_ready)
+            return
+        except Exception as exc:
+            logger.exception("Telegram submission %s failed", submission.pk)
+            await sync_to_async(fail_telegram_submission)(submission.pk, repr(exc))
+            await _edit_card(bot, submission, tr(lang, "request_submit_failed"), card_ready)
+            return
+
+    if not submission.notified:
+        await notify_request_created(bot, req.id)
+        await sync_to_async(mark_telegram_submission_notified)(submission.pk)
+
+    await _edit_card(
+        bot,
+        submission,
+        tr(
+            lang,
+            "request_created_success",
+            request_number=req.public_id or req.pk,
+            status=translate_request_status(req.status, lang),
+        ),
+        card_ready,
+    )
+
+
+class SubmissionWorker:
+    def __init__(self, *, concurrency: int | None = None):
+        self.concurrency = concurrency or settings.TELEGRAM_SUBMISSION_WORKERS
+        self.bot: Bot | None = None
+        self._queue: asyncio.Queue[int] = asyncio.Queue()
+        self._tasks: list[asyncio.Task] = []
+        # в очереди или в работе у этого процесса — повторно не ставим
+        self._scheduled: set[int] = set()
+        self._card_ready: dict[int, asyncio.Event] = {}
+
+    def submit(self, submission_id: int, *, hold_card: bool = False) -> asyncio.Event | None:
+        """
+        hold_card — вызывающий ещё меняет карточку: итог запишется после event.set().
+        """
+        event = None
+        if hold_card:
+            event = self._card_ready.setdefault(submission_id, asyncio.Event())
+        if submission_id not in self._scheduled:
+            self._scheduled.add(submission_id)
+            self._queue.put_nowait(submission_id)
+        return event
+
+    async def start(self, bot: Bot) -> None:
+        self.bot = bot
+        self._tasks = [asyncio.create_task(self._run()) for _ in range(self.concurrency)]
+        self._tasks.append(asyncio.create_task(self._sweep_loop()))
+        await self.sweep()
+
+    async def sweep(self) -> int:
+        """
+        Ставит в очередь queued, зависшие processing и не разосланные done из БД.
+        Возвращает число новых.
+        """
+        ids = await sync_to_async(get_pending_telegram_submission_ids)()
+        new = [pk for pk in ids if pk not in self._scheduled]
+        for submission_id in new:
+            self.submit(submission_id)
+        return len(new)
+
+    async def _sweep_loop(self) -> None:
+        while True:
+            await asyncio.sleep(settings.TELEGRAM_SUBMISSION_SWEEP_SECONDS)
+            try:
+                picked = await self.sweep()
+                if picked:
+                    logger.info("Submission sweep picked up %s submissions", picked)
+            except Exception:
+                logger.exception("Submission sweep failed")
+
+    async def stop(self, timeout: float = 30) -> None:
+        # даём дописать уже принятые отправки, остальное подберёт следующий старт
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Submission queue not drained on shutdown: %s left", self._queue.qsize())
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+
+    async def _run(self) -> None:
+        while True:
+            submission_id = await self._queue.get()
+            try:
+                await process_submission(self.bot, submission_id, self._card_ready.get(submission_id))
+            except Exception:
+                logger.exception("Submission worker crashed on %s", submission_id)
+            finally:
+                self._scheduled.discard(submission_id)
+                self._card_ready.pop(submission_id, None)
+                self._queue.task_done()
@@ -0,0 +1,109 @@
+# apps/tg_bot/bot/testing.py
+#
+# Бот без сети: для прогона записанных апдейтов и нагрузочных замеров.
+from __future__ import annotations
+
+import asyncio
+import itertools
+import json
+
+from collections.abc import AsyncGenerator
+from datetime import datetime, timezone
+from typing import Any, get_args
+
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import TelegramMethod
+from aiogram.types import File, Message, User
+
+FAKE_BOT_TOKEN = "4242:fake-token-for-offline-runs"
+
+
+class FakeBotSession(BaseSession):
+    """
+    Отвечает на методы Bot API правдоподобными объектами и запоминает вызовы.
+    latency — имитация задержки сети на каждый вызов.
+    """
+
+    def __init__(self, *, latency: float = 0.0, file_content: bytes = b"fake-file-content", **kwargs):
+        super().__init__(**kwargs)
+        self.latency = latency
+        self.file_content = file_content
+        self.requests: list[TelegramMethod] = []
+        self._message_ids = itertools.count(1)
+
+    async def close(self) -> None:
+        pass
+
+    async def make_request(self, bot: Bot, method: TelegramMethod, timeout: int | None = None) -> Any:
+        self.requests.append(method)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._fake_result(bot, method)
+
+    async def stream_content(
+        self,
+        url: str,
+        headers: dict[str, Any] | None = None,
+        timeout: int = 30,
+        chunk_size: int = 65536,
+        raise_for_status: bool = True,
+    ) -> AsyncGenerator[bytes, None]:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        yield self.file_content
+
+    def _fake_result(self, bot: Bot, method: TelegramMethod) -> Any:
+        returning = method.__returning__
+        options = get_args(returning) or (returning,)
+
+        if Message in options:
+            return self._fake_message(bot, method)
+        if File in options:
+            file_id = getattr(method, "file_id", "fake")
+            return File(file_id=file_id, file_unique_id=file_id, file_size=len(self.file_content),
+                        file_path=f"fake/{file_id}")
+        if User in options:
+            return User(id=bot.id, is_bot=True, first_name="fake-bot", username="fake_bot")
+        if bool in options:
+            return True
+        if list in {getattr(o, "__origin__", None) for o in options}:
+            return []
+        return None
+
+    def _fake_message(self, bot: Bot, method: TelegramMethod) -> Message:
+        chat_id = getattr(method, "chat_id", None) or 0
+        try:
+            chat_id = int(chat_id)
+        except (TypeError, ValueError):
+            chat_id = 0
+        message_id = getattr(method, "message_id", None) or next(self._message_ids)
+        return Message.model_validate(
+            {
+                "message_id": message_id,
+                "date": datetime.now(timezone.utc),
+                "chat": {"id": chat_id, "type": "private" if chat_id > 0 else "group"},
+                "from": {"id": bot.id, "is_bot": True, "first_name": "fake-bot"},
+                "text": getattr(method, "text", None) or getattr(method, "caption", None),
+            },
+            context={"bot": bot},
+        )
+
+    def method_counts(self) -> dict[str, int]:
+        counts: dict[str, int] = {}
+        for m in self.requests:
+            name = type(m).__name__
+            counts[name] = counts.get(name, 0) + 1
+        return counts
+
+
+def build_fake_bot(*, latency: float = 0.0) -> Bot:
+    return Bot(token=FAKE_BOT_TOKEN, session=FakeBotSession(latency=latency))
+
+
+def load_updates(path: str) -> list[dict]:
+    """
+    jsonl: один апдейт Telegram на строку (так пишет TELEGRAM_WEBHOOK_RECORD_PATH).
+    """
+    with open(path, encoding="utf-8") as fh:
+        return [json.loads(line) for line in fh if line.strip()]
@@ -0,0 +1,190 @@
+# apps/tg_bot/bot/utils/antiflood.py
+#
+# Антифлуд и сброс нагрузки — middleware апдейтов, стоит до FSMContextMiddleware
+# (install_antiflood): Dispatcher регистрирует его в __init__, и при FSM-хранилище
+# в БД get_state() иначе шёл бы на каждый, даже отброшенный, апдейт.
+# Перед антифлудом — только встроенные ErrorsMiddleware и UserContextMiddleware
+# (event_from_user, без БД).
+#
+#   - у каждого пользователя два token bucket: сообщения и callback-и
+#     (TELEGRAM_ANTIFLOOD_*_RATE в секунду, запас *_BURST);
+#   - если в обработке уже TELEGRAM_ANTIFLOOD_MAX_IN_FLIGHT апдейтов, новые
+#     сообщения/callback-и отбрасываются сразу (процесс перегружен);
+#   - отброшенный апдейт не трогает БД; пользователь получает вежливое
+#     "подождите" не чаще раза в TELEGRAM_ANTIFLOOD_NOTICE_SECONDS,
+#     язык — из language_code Telegram.
+#
+# Счётчики — antiflood_stats.snapshot() (webhook /health, replay_tg_updates).
+from __future__ import annotations
+
+import logging
+import time
+
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from aiogram import BaseMiddleware, Dispatcher
+from aiogram.fsm.middleware import FSMContextMiddleware
+from aiogram.types import CallbackQuery, Message, TelegramObject, Update, User
+from django.conf import settings
+
+from apps.tg_bot.bot.utils.i18n import normalize_lang, tr
+
+logger = logging.getLogger(__name__)
+
+MESSAGE = "message"
+CALLBACK = "callback"
+
+
+class TokenBuckets:
+    """
+    Ведро на ключ; старые ключи вытесняются (LRU), память ограничена max_keys.
+    """
+
+    def __init__(self, *, rate: float, burst: int, max_keys: int):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[int, tuple[float, float]] = OrderedDict()
+
+    def consume(self, key: int, now: float | None = None) -> bool:
+        now = time.monotonic() if now is None else now
+        tokens, updated_at = self._buckets.get(key, (float(self.burst), now))
+        tokens = min(float(self.burst), tokens + (now - updated_at) * self.rate)
+        allowed = tokens >= 1.0
+        if allowed:
+            tokens -= 1.0
+
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return allowed
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class AntifloodStats:
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.passed = 0
+        self.shed_rate = {MESSAGE: 0, CALLBACK: 0}
+        self.shed_overload = 0
+        self.notices = 0
+        self.in_flight = 0
+        self.in_flight_max = 0
+
+    def snapshot(self) -> dict:
+        return {
+            "passed": self.passed,
+            "shed_rate_messages": self.shed_rate[MESSAGE],
+            "shed_rate_callbacks": self.shed_rate[CALLBACK],
+            "shed_overload": self.shed_overload,
+            "notices": self.notices,
+            "in_flight": self.in_flight,
+            "in_flight_max": self.in_flight_max,
+        }
+
+
+antiflood_stats = AntifloodStats()
+
+
+def _event_kind(update: Update) -> tuple[str | None, TelegramObject | None]:
+    if update.message is not None:
+        return MESSAGE, update.message
+    if update.callback_query is not None:
+        return CALLBACK, update.callback_query
+    return None, None
+
+
+class AntifloodMiddleware(BaseMiddleware):
+    def __init__(
+        self,
+        *,
+        stats: AntifloodStats | None = None,
+        max_in_flight: int | None = None,
+        notice_seconds: int | None = None,
+    ):
+        max_keys = settings.TELEGRAM_ANTIFLOOD_TRACKED_USERS
+        self.buckets = {
+            MESSAGE: TokenBuckets(
+                rate=settings.TELEGRAM_ANTIFLOOD_MESSAGE_RATE,
+                burst=settings.TELEGRAM_ANTIFLOOD_MESSAGE_BURST,
+                max_keys=max_keys,
+            ),
+            CALLBACK: TokenBuckets(
+                rate=settings.TELEGRAM_ANTIFLOOD_CALLBACK_RATE,
+                burst=settings.TELEGRAM_ANTIFLOOD_CALLBACK_BURST,
+                max_keys=max_keys,
+            ),
+        }
+        self.stats = stats or antiflood_stats
+        self.max_in_flight = settings.TELEGRAM_ANTIFLOOD_MAX_IN_FLIGHT if max_in_flight is None else max_in_flight
+        self.notice_seconds = settings.TELEGRAM_ANTIFLOOD_NOTICE_SECONDS if notice_seconds is None else notice_seconds
+        self._noticed_at: OrderedDict[int, float] = OrderedDict()
+        self._max_keys = max_keys
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        kind, inner = _event_kind(event) if isinstance(event, Update) else (None, None)
+        user: User | None = data.get("event_from_user")
+
+        if kind is not None and user is not None:
+            if self.max_in_flight and self.stats.in_flight >= self.max_in_flight:
+                self.stats.shed_overload += 1
+                await self._notice(inner, user)
+                return None
+            if not self.buckets[kind].consume(user.id):
+                self.stats.shed_rate[kind] += 1
+                await self._notice(inner, user)
+                return None
+
+        self.stats.passed += 1
+        self.stats.in_flight += 1
+        self.stats.in_flight_max = max(self.stats.in_flight_max, self.stats.in_flight)
+        try:
+            return await handler(event, data)
+        finally:
+            self.stats.in_flight -= 1
+
+    async def _notice(self, event: TelegramObject, user: User) -> None:
+        now = time.monotonic()
+        last = self._noticed_at.get(user.id)
+        if last is not None and now - last < self.notice_seconds:
+            return
+
+        self._noticed_at[user.id] = now
+        self._noticed_at.move_to_end(user.id)
+        while len(self._noticed_at) > self._max_keys:
+            self._noticed_at.popitem(last=False)
+
+        text = tr(normalize_lang(user.language_code), "too_many_requests")
+        self.stats.notices += 1
+        try:
+            if isinstance(event, CallbackQuery):
+                await event.answer(text, show_alert=False)
+            elif isinstance(event, Message) and event.chat.type == "private":
+                await event.answer(text)
+        except Exception:
+            logger.info("Antiflood notice to %s failed", user.id, exc_info=True)
+
+
+def install_antiflood(dp: Dispatcher, middleware: AntifloodMiddleware) -> None:
+    """
+    Ставит антифлуд перед FSMContextMiddleware: outer_middleware() дописывает
+    в конец, то есть уже после загрузки состояния FSM.
+    """
+    middlewares = dp.update.outer_middleware._middlewares
+    index = next(
+        (i for i, m in enumerate(middlewares) if isinstance(m, FSMContextMiddleware)),
+        len(middlewares),
+    )
+    middlewares.insert(index, middleware)
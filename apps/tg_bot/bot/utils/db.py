@@ -1,23 +1,171 @@
 from __future__ import annotations
 
+import threading
+import time
+
+from collections import deque
 from collections.abc import Awaitable, Callable
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
 from functools import wraps
 from typing import Any, ParamSpec, TypeVar, overload
 
 from aiogram import BaseMiddleware
 from aiogram.types import TelegramObject
 from asgiref.sync import sync_to_async
-from django.db import close_old_connections
+from django.conf import settings
+from django.db import close_old_connections, connection, connections
 
 P = ParamSpec("P")
 R = TypeVar("R")
 
 
+# ---------------- пул потоков для ORM ----------------
+#
+# Раньше все вызовы шли через thread_sensitive=True — один поток на весь бот.
+# Теперь ORM-вызовы выполняются в пуле из TELEGRAM_DB_POOL_SIZE потоков; у каждого
+# потока своё соединение Django, которое живёт между вызовами (CONN_MAX_AGE).
+# Проверка соединения (ошибки, возраст, CONN_HEALTH_CHECKS) — не чаще раза
+# в TELEGRAM_DB_CONN_CHECK_SECONDS на поток или сразу после ошибки.
+
+class DbExecutorStats:
+    """
+    Ожидание в очереди пула и время выполнения, секунды.
+    """
+
+    def __init__(self, sample_size: int = 2000):
+        self._lock = threading.Lock()
+        self.sample_size = sample_size
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.calls = 0
+            self.errors = 0
+            self.in_flight = 0
+            self.wait_total = 0.0
+            self.exec_total = 0.0
+            self.wait_max = 0.0
+            self.exec_max = 0.0
+            self._wait_sample: deque[float] = deque(maxlen=self.sample_size)
+            self._exec_sample: deque[float] = deque(maxlen=self.sample_size)
+
+    def started(self, wait: float) -> None:
+        with self._lock:
+            self.in_flight += 1
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+            self._wait_sample.append(wait)
+
+    def finished(self, duration: float, *, failed: bool) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            self.calls += 1
+            self.errors += int(failed)
+            self.exec_total += duration
+            self.exec_max = max(self.exec_max, duration)
+            self._exec_sample.append(duration)
+
+    @staticmethod
+    def _percentile(values: list[float], q: float) -> float:
+        if not values:
+            return 0.0
+        values = sorted(values)
+        return values[min(int(len(values) * q), len(values) - 1)]
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            wait, exec_ = list(self._wait_sample), list(self._exec_sample)
+            calls = self.calls or 1
+            return {
+                "pool_size": _executor_state["size"],
+                "calls": self.calls,
+                "errors": self.errors,
+                "in_flight": self.in_flight,
+                "wait_avg_ms": round(self.wait_total / calls * 1000, 2),
+                "wait_p95_ms": round(self._percentile(wait, 0.95) * 1000, 2),
+                "wait_max_ms": round(self.wait_max * 1000, 2),
+                "exec_avg_ms": round(self.exec_total / calls * 1000, 2),
+                "exec_p95_ms": round(self._percentile(exec_, 0.95) * 1000, 2),
+                "exec_max_ms": round(self.exec_max * 1000, 2),
+            }
+
+
+db_executor_stats = DbExecutorStats()
+
+# execute_wrapper Django для вызовов из текущего контекста (нагрузочный тест считает
+# SQL-запросы на шаг диалога). Контекст копируется в поток пула вместе с вызовом.
+db_execute_wrapper: ContextVar[Callable | None] = ContextVar("tg_db_execute_wrapper", default=None)
+
+_executor_lock = threading.Lock()
+_executor_state: dict[str, Any] = {"executor": None, "size": 0}
+_thread_local = threading.local()
+
+
+def configure_db_executor(max_workers: int | None = None) -> ThreadPoolExecutor:
+    """
+    Пересоздаёт пул (нагрузочный тест меряет разные размеры). Старый пул
+    дорабатывает начатые вызовы и закрывается.
+    """
+    size = max_workers or settings.TELEGRAM_DB_POOL_SIZE
+    with _executor_lock:
+        old = _executor_state["executor"]
+        _executor_state["executor"] = ThreadPoolExecutor(max_workers=size, thread_name_prefix="tg-bot-db")
+        _executor_state["size"] = size
+    if old is not None:
+        old.shutdown(wait=False)
+    return _executor_state["executor"]
+
+
+def close_db_executor(timeout: float = 10.0) -> None:
+    """
+    Закрывает соединения всех потоков пула и сам пул (перед удалением тестовой БД:
+    PostgreSQL не даст удалить базу с открытыми соединениями).
+    """
+    with _executor_lock:
+        executor, size = _executor_state["executor"], _executor_state["size"]
+        _executor_state["executor"] = None
+        _executor_state["size"] = 0
+    if executor is None:
+        return
+
+    # по задаче на поток: барьер не даёт одному потоку забрать две
+    barrier = threading.Barrier(size)
+
+    def close() -> None:
+        connections.close_all()
+        try:
+            barrier.wait(timeout)
+        except threading.BrokenBarrierError:
+            pass
+
+    for _ in range(size):
+        executor.submit(close)
+    executor.shutdown(wait=True)
+
+
+def get_db_executor() -> ThreadPoolExecutor:
+    executor = _executor_state["executor"]
+    if executor is None:
+        executor = configure_db_executor()
+    return executor
+
+
+def _prepare_thread_connections() -> None:
+    now = time.monotonic()
+    due = now - getattr(_thread_local, "checked_at", 0.0) >= settings.TELEGRAM_DB_CONN_CHECK_SECONDS
+    for conn in connections.all(initialized_only=True):
+        if due or conn.errors_occurred:
+            conn.close_if_unusable_or_obsolete()
+    if due:
+        _thread_local.checked_at = now
+
+
 @overload
 def database_sync_to_async(
     func: Callable[P, R],
     *,
-    thread_sensitive: bool = True,
+    thread_sensitive: bool = False,
 ) -> Callable[P, Awaitable[R]]:
     ...
 
@@ -26,7 +174,7 @@ def database_sync_to_async(
 def database_sync_to_async(
     func: None = None,
     *,
-    thread_sensitive: bool = True,
+    thread_sensitive: bool = False,
 ) -> Callable[[Callable[P, R]], Callable[P, Awaitable[R]]]:
     ...
 
@@ -34,18 +182,48 @@ def database_sync_to_async(
 def database_sync_to_async(
     func: Callable[P, R] | None = None,
     *,
-    thread_sensitive: bool = True,
+    thread_sensitive: bool = False,
 ):
+    """
+    thread_sensitive=True — старое поведение (общий поток asgiref, close_old_connections
+    до и после вызова); по умолчанию вызов уходит в пул get_db_executor().
+    """
+
     def decorator(inner: Callable[P, R]) -> Callable[P, Awaitable[R]]:
-        @wraps(inner)
-        def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
-            close_old_connections()
+        if thread_sensitive:
+            @wraps(inner)
+            def sensitive_wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+                close_old_connections()
+                try:
+                    return inner(*args, **kwargs)
+                finally:
+                    close_old_connections()
+
+            return sync_to_async(sensitive_wrapper, thread_sensitive=True)
+
+        def pooled_wrapper(submitted_at: float, *args: P.args, **kwargs: P.kwargs) -> R:
+            started_at = time.perf_counter()
+            db_executor_stats.started(started_at - submitted_at)
+            failed = True
             try:
-                return inner(*args, **kwargs)
+                _prepare_thread_connections()
+                execute_wrapper = db_execute_wrapper.get()
+                if execute_wrapper is None:
+                    result = inner(*args, **kwargs)
+                else:
+                    with connection.execute_wrapper(execute_wrapper):
+                        result = inner(*args, **kwargs)
+                failed = False
+                return result
             finally:
-                close_old_connections()
+                db_executor_stats.finished(time.perf_counter() - started_at, failed=failed)
+
+        @wraps(inner)
+        async def call(*args: P.args, **kwargs: P.kwargs) -> R:
+            runner = sync_to_async(pooled_wrapper, thread_sensitive=False, executor=get_db_executor())
+            return await runner(time.perf_counter(), *args, **kwargs)
 
-        return sync_to_async(wrapper, thread_sensitive=thread_sensitive)
+        return call
 
     if func is None:
         return decorator
@@ -1,9 +1,18 @@
 from __future__ import annotations
 
+import asyncio
+import hashlib
+import logging
 import os
-from io import BytesIO
+import time
+import uuid
 
-from django.core.files.base import ContentFile
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.core.files import File
+
+logger = logging.getLogger(__name__)
 
 MAX_ATTACH_MB = 10
 MAX_ATTACH_BYTES = MAX_ATTACH_MB * 1024 * 1024
@@ -21,27 +30,217 @@ def build_safe_photo_name(file_unique_id: str | None, fallback: str = "photo") -
     return f"{suffix}.jpg"
 
 
-async def download_telegram_attachments(bot, attachments_meta: list[dict]) -> list[ContentFile]:
-    result: list[ContentFile] = []
+# ---------------- staging ----------------
+#
+# Файл начинает качаться сразу в upload_document/upload_photo (фоновая задача,
+# не больше TELEGRAM_ATTACH_DOWNLOAD_CONCURRENCY одновременно) и пишется кусками
+# во временный каталог с проверкой размера и sha256. К моменту подтверждения
+# обращение только забирает готовые файлы; FileSystemStorage переносит их
+# в MEDIA_ROOT без копирования через память (temporary_file_path).
+#
+# Каталог локальный для процесса: при шардировании (webhook.py) все апдейты
+# пользователя приходят в один процесс. Если файла нет (рестарт) — докачиваем при submit.
+
+
+class AttachmentTooLarge(Exception):
+    pass
+
+
+@dataclass
+class StagedAttachment:
+    staging_id: str
+    path: str
+    filename: str
+    size: int = 0
+    sha256: str = ""
+
+
+class StagedFile(File):
+    """
+    File поверх файла из staging: storage перемещает его, а не читает в память.
+    """
+
+    def __init__(self, staged: StagedAttachment):
+        super().__init__(open(staged.path, "rb"), name=staged.filename)
+        self.staged = staged
+
+    def temporary_file_path(self) -> str:
+        return self.staged.path
 
-    for item in attachments_meta:
-        file_id = item["file_id"]
-        filename = item["filename"]
 
-        buffer = await bot.download(file_id)
-        if buffer is None:
-            continue
+def _staging_dir() -> str:
+    path = settings.TELEGRAM_ATTACH_STAGING_DIR
+    os.makedirs(path, exist_ok=True)
+    return path
 
-        if isinstance(buffer, BytesIO):
-            buffer.seek(0)
-            content = buffer.read()
-        else:
+
+class AttachmentStager:
+    def __init__(self):
+        self._tasks: dict[str, asyncio.Task] = {}
+        self._started_at: dict[str, float] = {}
+        self._semaphore: asyncio.Semaphore | None = None
+        self._cleaned_at = 0.0
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(settings.TELEGRAM_ATTACH_DOWNLOAD_CONCURRENCY)
+        return self._semaphore
+
+    def start(self, bot, item: dict) -> str:
+        """
+        Запускает фоновую загрузку и возвращает staging_id для attachments_meta.
+        """
+        self._cleanup_stale()
+        staging_id = uuid.uuid4().hex
+        task = asyncio.create_task(self._download(bot, staging_id, item))
+        self._tasks[staging_id] = task
+        self._started_at[staging_id] = time.monotonic()
+        # ошибку заберёт collect(); без этого asyncio ругается "exception was never retrieved"
+        task.add_done_callback(lambda t: t.exception() if not t.cancelled() else None)
+        return staging_id
+
+    async def _download(self, bot, staging_id: str, item: dict) -> StagedAttachment:
+        async with self._get_semaphore():
+            return await stream_to_staging(bot, staging_id, item)
+
+    async def collect(self, bot, attachments_meta: list[dict]) -> list[StagedAttachment]:
+        result: list[StagedAttachment] = []
+
+        for n, item in enumerate(attachments_meta):
+            staging_id = item.get("staging_id") or uuid.uuid4().hex
+            task = self._pop(staging_id)
             try:
-                buffer.seek(0)
-            except Exception:
-                pass
-            content = buffer.read()
+                staged = None
+                if task is not None:
+                    try:
+                        staged = await task
+                    except AttachmentTooLarge:
+                        raise
+                    except Exception:
+                        logger.warning("Staged download %s failed, retrying", staging_id, exc_info=True)
+                if staged is None:
+                    staged = await self._download(bot, staging_id, item)
+            except BaseException:
+                # обращение не создаётся: готовое и недокачанное не должно остаться в staging
+                discard_staged(result)
+                self.forget(attachments_meta[n + 1:])
+                raise
+            result.append(staged)
+
+        return result
+
+    def forget(self, attachments_meta: list[dict]) -> None:
+        """
+        Отмена/сброс диалога: останавливает загрузки и удаляет уже скачанные файлы.
+        """
+        for item in attachments_meta or []:
+            task = self._pop(item.get("staging_id") or "")
+            if task is not None:
+                self._drop_task(task)
+
+    def _pop(self, staging_id: str) -> asyncio.Task | None:
+        self._started_at.pop(staging_id, None)
+        return self._tasks.pop(staging_id, None)
+
+    @staticmethod
+    def _drop_task(task: asyncio.Task) -> None:
+        if not task.done():
+            task.cancel()  # stream_to_staging сам удалит недописанный файл
+        elif not task.cancelled() and task.exception() is None:
+            discard_staged([task.result()])
+
+    def _cleanup_stale(self) -> None:
+        now = time.monotonic()
+        if now - self._cleaned_at < 600:
+            return
+        self._cleaned_at = now
+
+        from apps.tg_bot.bot.utils.session_guard import SESSION_TTL_MINUTES
+
+        # загрузки диалогов, которые так и не дошли до collect() (отмена, истёкшая сессия)
+        task_border = now - SESSION_TTL_MINUTES * 60 * 2
+        for staging_id in [sid for sid, at in self._started_at.items() if at < task_border]:
+            task = self._pop(staging_id)
+            if task is not None:
+                self._drop_task(task)
+
+        border = time.time() - SESSION_TTL_MINUTES * 60 * 2
+        try:
+            for entry in os.scandir(_staging_dir()):
+                if entry.is_file() and entry.stat().st_mtime < border:
+                    os.unlink(entry.path)
+        except OSError:
+            logger.warning("Failed to clean attachment staging dir", exc_info=True)
+
+
+async def stream_to_staging(bot, staging_id: str, item: dict) -> StagedAttachment:
+    path = os.path.join(_staging_dir(), f"{staging_id}.part")
+    staged = StagedAttachment(staging_id=staging_id, path=path, filename=item["filename"])
+    digest = hashlib.sha256()
+
+    tg_file = await bot.get_file(item["file_id"])
+    if tg_file.file_size and tg_file.file_size > MAX_ATTACH_BYTES:
+        raise AttachmentTooLarge(item["filename"])
+
+    if bot.session.api.is_local:
+        chunks = _iter_local_file(bot.session.api.wrap_local_file.to_local(tg_file.file_path))
+    else:
+        chunks = bot.session.stream_content(
+            bot.session.api.file_url(bot.token, tg_file.file_path),
+            timeout=settings.TELEGRAM_ATTACH_DOWNLOAD_TIMEOUT,
+            chunk_size=65536,
+        )
+
+    try:
+        with open(path, "wb") as fh:
+            async for chunk in chunks:
+                staged.size += len(chunk)
+                if staged.size > MAX_ATTACH_BYTES:
+                    raise AttachmentTooLarge(item["filename"])
+                digest.update(chunk)
+                fh.write(chunk)
+    except BaseException:
+        _unlink_quietly(path)
+        raise
+
+    staged.sha256 = digest.hexdigest()
+    return staged
+
+
+async def _iter_local_file(path: str, chunk_size: int = 65536):
+    with open(path, "rb") as fh:
+        while chunk := fh.read(chunk_size):
+            yield chunk
+
+
+def _unlink_quietly(path: str) -> None:
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+attachment_stager = AttachmentStager()
+
+
+async def download_telegram_attachments(bot, attachments_meta: list[dict]) -> list[StagedFile]:
+    """
+    Готовые (или докачанные сейчас) файлы для create_request_from_telegram_profile.
+    После сохранения обращения вызывайте release_attachments().
+    """
+    staged = await attachment_stager.collect(bot, attachments_meta)
+    return [StagedFile(s) for s in staged]
+
+
+def discard_staged(staged: list[StagedAttachment]) -> None:
+    for s in staged:
+        _unlink_quietly(s.path)
 
-        result.append(ContentFile(content, name=filename))
 
-    return result
\ No newline at end of file
+def release_attachments(files: list[StagedFile]) -> None:
+    """
+    Закрывает файлы и удаляет то, что storage не перенёс (ошибка, не-файловый storage).
+    """
+    for f in files:
+        f.close()
+        _unlink_quietly(f.staged.path)
@@ -154,6 +154,10 @@ TEXTS = {
             "Статус: {status}\n\n"
             "Ваше обращение зарегистрировано в системе."
         ),
+        "request_processing": "⏳ Обращение принято и обрабатывается. Номер появится в этом сообщении.",
+        "request_already_submitted": "Обращение уже отправлено.",
+        "request_submit_failed": "Не удалось создать обращение. Попробуйте ещё раз через главное меню.",
+        "too_many_requests": "⏳ Слишком много сообщений. Подождите немного и повторите.",
 
         "status_new": "Новое",
         "status_registered": "Зарегистрировано",
@@ -332,6 +336,10 @@ TEXTS = {
             "Status: {status}\n\n"
             "Murojaatingiz tizimda ro‘yxatdan o‘tkazildi."
         ),
+        "request_processing": "⏳ Murojaat qabul qilindi va ishlanmoqda. Raqami shu xabarda paydo bo‘ladi.",
+        "request_already_submitted": "Murojaat allaqachon yuborilgan.",
+        "request_submit_failed": "Murojaatni yaratib bo‘lmadi. Bosh menyu orqali qayta urinib ko‘ring.",
+        "too_many_requests": "⏳ Juda ko‘p xabar yuborildi. Biroz kuting va qayta urinib ko‘ring.",
 
         "status_new": "Yangi",
         "status_registered": "Ro‘yxatdan o‘tkazilgan",
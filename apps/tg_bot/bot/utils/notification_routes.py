@@ -0,0 +1,65 @@
+# apps/tg_bot/bot/utils/notification_routes.py
+#
+# Таблица маршрутов уведомлений: отдел (None — общие группы) → группы.
+# Строится одним запросом и живёт в памяти процесса; сигналы TelegramChatBinding
+# (apps/tg_bot/signals.py) сбрасывают её после commit, изменения из других процессов
+# подхватываются не позже TELEGRAM_NOTIFY_ROUTES_TTL.
+from __future__ import annotations
+
+import threading
+import time
+
+from dataclasses import dataclass
+
+from django.conf import settings
+
+
+@dataclass(frozen=True)
+class NotificationRoute:
+    binding_id: int
+    chat_id: int
+    digest_minutes: int = 0
+
+
+_lock = threading.Lock()
+_state: dict = {"routes": None, "loaded_at": 0.0}
+
+
+def invalidate_notification_routes() -> None:
+    with _lock:
+        _state["routes"] = None
+
+
+def get_notification_routes() -> dict[int | None, list[NotificationRoute]]:
+    now = time.monotonic()
+    with _lock:
+        routes = _state["routes"]
+        if routes is not None and now - _state["loaded_at"] <= settings.TELEGRAM_NOTIFY_ROUTES_TTL:
+            return routes
+
+    from apps.tg_bot.selectors import get_active_notification_routes
+
+    routes: dict[int | None, list[NotificationRoute]] = {}
+    for binding_id, chat_id, department_id, digest_minutes in get_active_notification_routes():
+        routes.setdefault(department_id, []).append(
+            NotificationRoute(binding_id=binding_id, chat_id=chat_id, digest_minutes=digest_minutes)
+        )
+
+    with _lock:
+        _state["routes"] = routes
+        _state["loaded_at"] = now
+    return routes
+
+
+def get_routes_for_department(department_id: int | None) -> list[NotificationRoute]:
+    """
+    Общие группы + группы отдела, без повторов chat_id.
+    """
+    routes = get_notification_routes()
+    result: dict[int, NotificationRoute] = {}
+    for route in routes.get(None, []):
+        result.setdefault(route.chat_id, route)
+    if department_id:
+        for route in routes.get(department_id, []):
+            result.setdefault(route.chat_id, route)
+    return list(result.values())
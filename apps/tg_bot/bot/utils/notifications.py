@@ -1,18 +1,138 @@
+# apps/tg_bot/bot/utils/notifications.py
+#
+# Уведомления о новых обращениях в группы отделов.
+#
+#   - группы получают сообщение параллельно (не больше TELEGRAM_NOTIFY_CONCURRENCY
+#     одновременных запросов), но в одну группу — не чаще раза
+#     в TELEGRAM_NOTIFY_CHAT_INTERVAL секунд (лимит Telegram ~20 сообщений/мин на группу);
+#   - TelegramRetryAfter: группа "замораживается" на retry_after, сообщение повторяется;
+#   - бота исключили из группы — привязка отключается (is_active=False);
+#   - группа стала супергруппой — привязка получает новый chat_id;
+#   - группы с digest_minutes > 0 получают одну сводку раз в N минут
+#     (run_notification_digests, запускается вместе с ботом в каждом процессе;
+#     строки сводки забирает один процесс — collect_due_notification_digests).
+from __future__ import annotations
+
+import asyncio
 import logging
 
+from contextlib import asynccontextmanager
+
 from aiogram import Bot
-from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
+from aiogram.exceptions import (
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramMigrateToChat,
+    TelegramNetworkError,
+    TelegramRetryAfter,
+    TelegramServerError,
+)
+from django.conf import settings
 from django.db.utils import Error as DjangoDbError
 
-from apps.tg_bot.services import prepare_request_notification_payload
+from apps.tg_bot.services import (
+    collect_due_notification_digests,
+    deactivate_chat_binding,
+    delete_notification_digest_items,
+    release_notification_digest_items,
+    migrate_chat_binding,
+    route_request_notification,
+)
 from apps.tg_bot.bot.utils.db import database_sync_to_async as sync_to_async
 
 logger = logging.getLogger(__name__)
 
+# BadRequest, после которых писать в группу бессмысленно
+_DEAD_CHAT_ERRORS = ("chat not found", "group chat was deactivated", "not enough rights to send")
+
+
+class ChatPacer:
+    """
+    Очерёдность и интервал отправки по каждой группе + общий лимит параллельности.
+    """
+
+    def __init__(self, *, interval: float, concurrency: int):
+        self.interval = interval
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._locks: dict[int, asyncio.Lock] = {}
+        self._next_at: dict[int, float] = {}
+
+    def hold(self, chat_id: int, seconds: float) -> None:
+        loop = asyncio.get_running_loop()
+        self._next_at[chat_id] = max(self._next_at.get(chat_id, 0.0), loop.time() + seconds)
+
+    @asynccontextmanager
+    async def slot(self, chat_id: int):
+        loop = asyncio.get_running_loop()
+        lock = self._locks.setdefault(chat_id, asyncio.Lock())
+        async with lock:
+            delay = self._next_at.get(chat_id, 0.0) - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            try:
+                async with self._semaphore:
+                    yield
+            finally:
+                self.hold(chat_id, self.interval)
+
+
+_pacers: dict[asyncio.AbstractEventLoop, ChatPacer] = {}
+
+
+def get_chat_pacer() -> ChatPacer:
+    # asyncio-примитивы привязаны к циклу; у replay/нагрузочных прогонов цикл свой
+    loop = asyncio.get_running_loop()
+    pacer = _pacers.get(loop)
+    if pacer is None:
+        _pacers.clear()
+        pacer = _pacers[loop] = ChatPacer(
+            interval=settings.TELEGRAM_NOTIFY_CHAT_INTERVAL,
+            concurrency=settings.TELEGRAM_NOTIFY_CONCURRENCY,
+        )
+    return pacer
+
+
+async def send_to_chat(bot: Bot, chat_id: int, text: str) -> bool:
+    """
+    True — сообщение доставлено. False — группа недоступна или попытки исчерпаны.
+    """
+    pacer = get_chat_pacer()
+    attempts = settings.TELEGRAM_NOTIFY_MAX_ATTEMPTS
+
+    for attempt in range(1, attempts + 1):
+        try:
+            async with pacer.slot(chat_id):
+                await bot.send_message(chat_id=chat_id, text=text, disable_web_page_preview=True)
+            return True
+        except TelegramRetryAfter as exc:
+            logger.warning("Notify: flood control in chat %s, retry in %ss", chat_id, exc.retry_after)
+            pacer.hold(chat_id, exc.retry_after)
+        except TelegramMigrateToChat as exc:
+            new_chat_id = exc.migrate_to_chat_id
+            migrated = await sync_to_async(migrate_chat_binding)(chat_id, new_chat_id)
+            logger.info("Notify: chat %s migrated to %s (binding updated: %s)", chat_id, new_chat_id, migrated)
+            chat_id = new_chat_id
+        except TelegramForbiddenError:
+            await sync_to_async(deactivate_chat_binding)(chat_id)
+            logger.warning("Notify: bot was removed from chat %s, binding deactivated", chat_id)
+            return False
+        except TelegramBadRequest as exc:
+            if any(err in exc.message.lower() for err in _DEAD_CHAT_ERRORS):
+                await sync_to_async(deactivate_chat_binding)(chat_id)
+                logger.warning("Notify: chat %s is unavailable (%s), binding deactivated", chat_id, exc.message)
+            else:
+                logger.warning("Notify: chat %s rejected message: %s", chat_id, exc.message)
+            return False
+        except (TelegramNetworkError, TelegramServerError):
+            logger.warning("Notify: chat %s, attempt %s/%s failed", chat_id, attempt, attempts, exc_info=True)
+            pacer.hold(chat_id, attempt)
+
+    return False
+
 
 async def notify_request_created(bot: Bot, request_id: int) -> int:
     try:
-        payload = await sync_to_async(prepare_request_notification_payload)(request_id)
+        payload = await sync_to_async(route_request_notification)(request_id)
     except DjangoDbError:
         logger.exception("Failed to prepare Telegram request notification payload: request_id=%s", request_id)
         return 0
@@ -23,16 +143,44 @@ async def notify_request_created(bot: Bot, request_id: int) -> int:
     chat_ids = payload.get("chat_ids") or []
     text = payload.get("text") or ""
 
-    sent_count = 0
-    for chat_id in chat_ids:
+    results = await asyncio.gather(*(send_to_chat(bot, chat_id, text) for chat_id in chat_ids))
+    return sum(results)
+
+
+def _chunk_item_ids(chunks: list[dict]) -> list[int]:
+    return [pk for chunk in chunks for pk in chunk["item_ids"]]
+
+
+async def send_due_notification_digests(bot: Bot) -> int:
+    digests = await sync_to_async(collect_due_notification_digests)()
+
+    async def deliver(digest: dict) -> bool:
+        unsent = list(digest["chunks"])
+        try:
+            while unsent:
+                chunk = unsent[0]
+                if not await send_to_chat(bot, digest["chat_id"], chunk["text"]):
+                    # неотправленные строки остаются: отключённую группу почистит
+                    # следующий сбор, временный сбой — повторим на следующем тике
+                    await sync_to_async(release_notification_digest_items)(_chunk_item_ids(unsent))
+                    return False
+                # ушедшее сообщение больше не повторяем
+                unsent.pop(0)
+                await sync_to_async(delete_notification_digest_items)(chunk["item_ids"])
+        except asyncio.CancelledError:
+            # остановка процесса посреди отправки — не ждём TTL захвата
+            await asyncio.shield(sync_to_async(release_notification_digest_items)(_chunk_item_ids(unsent)))
+            raise
+        return True
+
+    results = await asyncio.gather(*(deliver(digest) for digest in digests))
+    return sum(results)
+
+
+async def run_notification_digests(bot: Bot) -> None:
+    while True:
+        await asyncio.sleep(settings.TELEGRAM_NOTIFY_DIGEST_CHECK_SECONDS)
         try:
-            await bot.send_message(
-                chat_id=chat_id,
-                text=text,
-                disable_web_page_preview=True,
-            )
-            sent_count += 1
-        except (TelegramBadRequest, TelegramForbiddenError):
-            continue
-
-    return sent_count
+            await send_due_notification_digests(bot)
+        except Exception:
+            logger.exception("Notification digest tick failed")
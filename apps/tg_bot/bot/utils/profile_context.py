@@ -0,0 +1,122 @@
+# apps/tg_bot/bot/utils/profile_context.py
+#
+# Профиль пользователя бота (язык, верификация, компания, сотрудник) загружается
+# один раз на апдейт — ProfileContextMiddleware кладёт его в data["profile_ctx"]:
+#
+#     async def handler(message: Message, profile_ctx: ProfileContext): ...
+#
+# Поверх — TTL/LRU кэш процесса по telegram_user_id. Сервисы бота сбрасывают
+# запись через сигналы TelegramProfile (apps/tg_bot/signals.py); изменения из других
+# процессов (админка, слияние компаний) бот увидит не позже TELEGRAM_PROFILE_CACHE_TTL.
+from __future__ import annotations
+
+import threading
+import time
+
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from typing import Any
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, User
+from django.conf import settings
+
+from apps.tg_bot.models import TelegramProfile
+from apps.tg_bot.bot.utils.db import database_sync_to_async
+
+DEFAULT_BOT_LANGUAGE = "uz"
+
+
+@dataclass(frozen=True)
+class ProfileContext:
+    telegram_user_id: int
+    profile: TelegramProfile | None = None
+
+    @property
+    def lang(self) -> str:
+        if self.profile and self.profile.bot_language:
+            return self.profile.bot_language
+        return DEFAULT_BOT_LANGUAGE
+
+    @property
+    def verified_profile(self) -> TelegramProfile | None:
+        """
+        То же, что get_verified_telegram_profile_by_user_id.
+        """
+        p = self.profile
+        return p if p and p.is_verified and p.is_active else None
+
+
+_lock = threading.Lock()
+_cache: OrderedDict[int, tuple[float, ProfileContext]] = OrderedDict()
+
+
+def _cache_get(user_id: int) -> ProfileContext | None:
+    now = time.monotonic()
+    with _lock:
+        item = _cache.get(user_id)
+        if item is None:
+            return None
+        loaded_at, ctx = item
+        if now - loaded_at > settings.TELEGRAM_PROFILE_CACHE_TTL:
+            del _cache[user_id]
+            return None
+        _cache.move_to_end(user_id)
+        return ctx
+
+
+def _cache_put(user_id: int, ctx: ProfileContext) -> None:
+    with _lock:
+        _cache[user_id] = (time.monotonic(), ctx)
+        _cache.move_to_end(user_id)
+        while len(_cache) > settings.TELEGRAM_PROFILE_CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+def invalidate_profile_context(telegram_user_id: int) -> None:
+    with _lock:
+        _cache.pop(telegram_user_id, None)
+
+
+def clear_profile_context_cache() -> None:
+    with _lock:
+        _cache.clear()
+
+
+def load_profile_context(telegram_user_id: int) -> ProfileContext:
+    from apps.tg_bot.selectors import get_telegram_profile_by_user_id
+
+    return ProfileContext(
+        telegram_user_id=telegram_user_id,
+        profile=get_telegram_profile_by_user_id(telegram_user_id),
+    )
+
+
+async def get_profile_context(telegram_user_id: int, *, refresh: bool = False) -> ProfileContext:
+    """
+    Попадание в кэш — без похода в поток БД.
+    """
+    if not telegram_user_id:
+        return ProfileContext(telegram_user_id=0)
+
+    if not refresh:
+        ctx = _cache_get(telegram_user_id)
+        if ctx is not None:
+            return ctx
+
+    ctx = await database_sync_to_async(load_profile_context)(telegram_user_id)
+    _cache_put(telegram_user_id, ctx)
+    return ctx
+
+
+class ProfileContextMiddleware(BaseMiddleware):
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: dict[str, Any],
+    ) -> Any:
+        user: User | None = data.get("event_from_user")
+        data["profile_ctx"] = await get_profile_context(user.id if user else 0)
+        return await handler(event, data)
@@ -3,20 +3,16 @@ import logging
 from aiogram.types import Message, CallbackQuery
 from aiogram.fsm.context import FSMContext
 
-from apps.tg_bot.selectors import (
-    get_user_bot_language,
-    get_verified_telegram_profile_by_user_id,
-)
-from apps.tg_bot.bot.utils.db import database_sync_to_async as sync_to_async
 from apps.tg_bot.bot.keyboards.reply import (
     main_menu_keyboard,
     contact_request_keyboard,
 )
 from apps.tg_bot.bot.states.request_states import AuthStates
+from apps.tg_bot.bot.utils.files import attachment_stager
 from apps.tg_bot.bot.utils.i18n import tr
+from apps.tg_bot.bot.utils.profile_context import DEFAULT_BOT_LANGUAGE, get_profile_context
 
 logger = logging.getLogger(__name__)
-DEFAULT_BOT_LANGUAGE = "uz"
 
 
 def _is_private_event(event: Message | CallbackQuery) -> bool:
@@ -45,18 +41,16 @@ async def reset_user_dialog(
     user = event.from_user
     user_id = user.id if user else 0
 
+    attachment_stager.forget((await state.get_data()).get("attachments_meta", []))
     await state.clear()
 
     try:
-        lang = await sync_to_async(get_user_bot_language)(user_id, default=DEFAULT_BOT_LANGUAGE)
-    except Exception:
-        logger.exception("Failed to load Telegram bot language during dialog recovery")
-        lang = DEFAULT_BOT_LANGUAGE
-
-    try:
-        profile = await sync_to_async(get_verified_telegram_profile_by_user_id)(user_id)
+        ctx = await get_profile_context(user_id)
+        lang = ctx.lang
+        profile = ctx.verified_profile
     except Exception:
         logger.exception("Failed to load Telegram profile during dialog recovery")
+        lang = DEFAULT_BOT_LANGUAGE
         profile = None
 
     text = tr(lang, reason_key)
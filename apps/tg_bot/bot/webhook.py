@@ -0,0 +1,245 @@
+# apps/tg_bot/bot/webhook.py
+#
+# Webhook-режим бота (aiohttp).
+#
+# Telegram получает 200 сразу после постановки апдейта в очередь, обработка идёт
+# в фоне:
+#   - апдейты одного пользователя обрабатываются строго по порядку (своя очередь);
+#   - разные пользователи — параллельно, не больше TELEGRAM_WEBHOOK_CONCURRENCY;
+#   - если в памяти уже TELEGRAM_WEBHOOK_MAX_PENDING апдейтов — отвечаем 503,
+#     Telegram повторит доставку позже.
+#
+# Шардирование: несколько процессов, у каждого свой номер (--shard) и общий список
+# TELEGRAM_WEBHOOK_SHARD_URLS. Пользователь закреплён за шардом
+# telegram_user_id % len(SHARD_URLS); чужой апдейт процесс пересылает владельцу,
+# поэтому порядок шагов диалога сохраняется при любом балансировщике перед ними.
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+
+from collections import deque
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+from aiogram.webhook.aiohttp_server import setup_application
+from aiohttp import ClientSession, ClientTimeout, web
+from django.conf import settings
+
+from apps.tg_bot.bot.utils.antiflood import antiflood_stats
+from apps.tg_bot.bot.utils.db import db_executor_stats
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+FORWARDED_HEADER = "X-Adli-Forwarded-Shard"
+
+
+def update_user_id(update: Update) -> int:
+    """
+    Ключ упорядочивания: пользователь, иначе чат, иначе 0 (общая очередь).
+    """
+    try:
+        event = update.event
+    except LookupError:
+        return 0
+    user = getattr(event, "from_user", None) or getattr(event, "user", None)
+    if user is not None:
+        return user.id
+    chat = getattr(event, "chat", None)
+    return chat.id if chat is not None else 0
+
+
+def shard_for_user(user_id: int, shards: int) -> int:
+    return abs(user_id) % shards if shards > 1 else 0
+
+
+class UpdateQueue:
+    """
+    Очереди по пользователям + общий семафор.
+    Воркер-задача существует только пока у пользователя есть апдейты.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[Update], Awaitable[Any]],
+        *,
+        concurrency: int,
+        max_pending: int,
+    ):
+        self._handler = handler
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._queues: dict[int, deque] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self.max_pending = max_pending
+        self.pending = 0
+        self.processed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def submit(self, user_id: int, update: Update) -> bool:
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            return False
+
+        self.pending += 1
+        queue = self._queues.get(user_id)
+        if queue is not None:
+            queue.append(update)
+            return True
+
+        self._queues[user_id] = deque([update])
+        task = asyncio.create_task(self._drain(user_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return True
+
+    async def _drain(self, user_id: int) -> None:
+        queue = self._queues[user_id]
+        try:
+            while queue:
+                update = queue[0]
+                try:
+                    async with self._semaphore:
+                        await self._handler(update)
+                    self.processed += 1
+                except Exception:
+                    self.failed += 1
+                    logger.exception("Webhook update %s failed", update.update_id)
+                finally:
+                    queue.popleft()
+                    self.pending -= 1
+        finally:
+            # между последним popleft и этой строкой await-ов нет — новый submit не потеряется
+            self._queues.pop(user_id, None)
+
+    async def join(self, timeout: float | None = None) -> None:
+        if self._tasks:
+            await asyncio.wait(set(self._tasks), timeout=timeout)
+
+    def stats(self) -> dict:
+        return {
+            "pending": self.pending,
+            "users": len(self._queues),
+            "processed": self.processed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+        }
+
+
+def _record(update_data: dict) -> None:
+    path = settings.TELEGRAM_WEBHOOK_RECORD_PATH
+    if not path:
+        return
+    with open(path, "a", encoding="utf-8") as fh:
+        fh.write(json.dumps(update_data, ensure_ascii=False) + "\n")
+
+
+def build_webhook_app(
+    bot: Bot,
+    dp: Dispatcher,
+    *,
+    shard: int = 0,
+    shard_urls: list[str] | None = None,
+    secret: str | None = None,
+    path: str | None = None,
+    concurrency: int | None = None,
+    max_pending: int | None = None,
+) -> web.Application:
+    shard_urls = settings.TELEGRAM_WEBHOOK_SHARD_URLS if shard_urls is None else shard_urls
+    secret = settings.TELEGRAM_WEBHOOK_SECRET if secret is None else secret
+    path = path or settings.TELEGRAM_WEBHOOK_PATH
+    shards = max(len(shard_urls), 1)
+
+    async def handle_update(update: Update) -> None:
+        await dp.feed_update(bot, update)
+
+    queue = UpdateQueue(
+        handle_update,
+        concurrency=concurrency or settings.TELEGRAM_WEBHOOK_CONCURRENCY,
+        max_pending=max_pending or settings.TELEGRAM_WEBHOOK_MAX_PENDING,
+    )
+
+    app = web.Application()
+    app["update_queue"] = queue
+
+    async def forward(owner: int, raw: bytes) -> web.Response:
+        session: ClientSession = app["forward_session"]
+        headers = {"Content-Type": "application/json", FORWARDED_HEADER: str(shard)}
+        if secret:
+            headers[SECRET_HEADER] = secret
+        try:
+            async with session.post(shard_urls[owner], data=raw, headers=headers) as resp:
+                return web.Response(status=resp.status)
+        except Exception:
+            logger.warning("Webhook: shard %s is unreachable", owner, exc_info=True)
+            # Telegram повторит доставку
+            return web.Response(status=503)
+
+    async def webhook(request: web.Request) -> web.Response:
+        if secret and request.headers.get(SECRET_HEADER) != secret:
+            return web.Response(status=401)
+
+        raw = await request.read()
+        try:
+            data = json.loads(raw)
+            update = Update.model_validate(data, context={"bot": bot})
+        except Exception:
+            logger.warning("Webhook: malformed update dropped", exc_info=True)
+            # подтверждаем, иначе Telegram будет присылать битый апдейт по кругу
+            return web.Response(status=200)
+
+        user_id = update_user_id(update)
+        owner = shard_for_user(user_id, shards)
+        if owner != shard and FORWARDED_HEADER not in request.headers:
+            return await forward(owner, raw)
+
+        if not queue.submit(user_id, update):
+            return web.Response(status=503)
+
+        _record(data)
+        return web.Response(status=200)
+
+    async def health(request: web.Request) -> web.Response:
+        return web.json_response({
+            "shard": shard,
+            "shards": shards,
+            **queue.stats(),
+            "db": db_executor_stats.snapshot(),
+            "antiflood": antiflood_stats.snapshot(),
+        })
+
+    async def on_startup(app: web.Application) -> None:
+        app["forward_session"] = ClientSession(timeout=ClientTimeout(total=10))
+
+    async def on_shutdown(app: web.Application) -> None:
+        # дорабатываем принятые апдейты до emit_shutdown (flush FSM-хранилища)
+        await queue.join(timeout=settings.TELEGRAM_WEBHOOK_SHUTDOWN_TIMEOUT)
+
+    async def on_cleanup(app: web.Application) -> None:
+        await app["forward_session"].close()
+
+    app.router.add_post(path, webhook)
+    app.router.add_get(f"{path.rstrip('/')}/health", health)
+    app.on_startup.append(on_startup)
+    app.on_shutdown.append(on_shutdown)
+    app.on_cleanup.append(on_cleanup)
+    setup_application(app, dp, bot=bot)
+    return app
+
+
+async def set_webhook(bot: Bot, dp: Dispatcher) -> None:
+    if not settings.TELEGRAM_WEBHOOK_URL:
+        raise RuntimeError("TELEGRAM_WEBHOOK_URL is not configured")
+
+    await bot.set_webhook(
+        url=settings.TELEGRAM_WEBHOOK_URL,
+        secret_token=settings.TELEGRAM_WEBHOOK_SECRET or None,
+        allowed_updates=dp.resolve_used_update_types(),
+        max_connections=settings.TELEGRAM_WEBHOOK_MAX_CONNECTIONS,
+        drop_pending_updates=False,
+    )
+    logger.info("Webhook set to %s", settings.TELEGRAM_WEBHOOK_URL)
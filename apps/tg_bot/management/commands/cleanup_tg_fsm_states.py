@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from apps.tg_bot.bot.storage import cleanup_expired_states
+
+
+class Command(BaseCommand):
+    help = "Delete expired Telegram FSM states (SESSION_TTL_MINUTES + grace)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--ttl-minutes", type=int, default=None)
+
+    def handle(self, *args, **options):
+        deleted = cleanup_expired_states(ttl_minutes=options["ttl_minutes"])
+        self.stdout.write(self.style.SUCCESS(f"Deleted: {deleted}"))
@@ -0,0 +1,66 @@
+import asyncio
+import time
+
+from aiohttp.test_utils import TestClient, TestServer
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.tg_bot.bot.main import build_dispatcher
+from apps.tg_bot.bot.testing import build_fake_bot, load_updates
+from apps.tg_bot.bot.utils.antiflood import antiflood_stats
+from apps.tg_bot.bot.utils.db import db_executor_stats
+from apps.tg_bot.bot.webhook import SECRET_HEADER, build_webhook_app
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay recorded Telegram updates (jsonl) against the webhook app offline. "
+        "Handlers work with the configured database — use a test/staging DB."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="jsonl file, one update per line")
+        parser.add_argument("--repeat", type=int, default=1)
+        parser.add_argument("--concurrency", type=int, default=None)
+        parser.add_argument("--max-pending", type=int, default=None)
+        parser.add_argument("--latency", type=float, default=0.0, help="Fake Bot API latency, seconds")
+
+    def handle(self, *args, **options):
+        try:
+            updates = load_updates(options["path"])
+        except OSError as exc:
+            raise CommandError(str(exc))
+        updates = updates * max(options["repeat"], 1)
+        asyncio.run(self._replay(updates, options))
+
+    async def _replay(self, updates, options):
+        bot = build_fake_bot(latency=options["latency"])
+        dp = build_dispatcher()
+        app = build_webhook_app(
+            bot,
+            dp,
+            shard_urls=[],
+            concurrency=options["concurrency"],
+            max_pending=options["max_pending"],
+        )
+        queue = app["update_queue"]
+        headers = {SECRET_HEADER: settings.TELEGRAM_WEBHOOK_SECRET} if settings.TELEGRAM_WEBHOOK_SECRET else {}
+
+        statuses: dict[int, int] = {}
+        started = time.perf_counter()
+        async with TestClient(TestServer(app)) as client:
+            for update in updates:
+                resp = await client.post(settings.TELEGRAM_WEBHOOK_PATH, json=update, headers=headers)
+                statuses[resp.status] = statuses.get(resp.status, 0) + 1
+            accepted_at = time.perf_counter()
+            await queue.join()
+        finished = time.perf_counter()
+
+        stats = queue.stats()
+        self.stdout.write(f"Updates: {len(updates)}, HTTP statuses: {statuses}")
+        self.stdout.write(f"Accepted in {accepted_at - started:.2f}s, processed in {finished - started:.2f}s")
+        self.stdout.write(f"Processed: {stats['processed']}, failed: {stats['failed']}, rejected: {stats['rejected']}")
+        self.stdout.write(f"Bot API calls: {bot.session.method_counts()}")
+        self.stdout.write(f"DB executor: {db_executor_stats.snapshot()}")
+        self.stdout.write(f"Antiflood: {antiflood_stats.snapshot()}")
+        self.stdout.write(self.style.SUCCESS("OK" if not stats["failed"] else "Finished with failures"))
@@ -1,10 +1,26 @@
 from django.core.management.base import BaseCommand
 
-from apps.tg_bot.bot.main import run_polling
+from apps.tg_bot.bot.main import run_polling, run_webhook
 
 
 class Command(BaseCommand):
-    help = "Run Telegram bot via long polling"
+    help = "Run Telegram bot via long polling or webhook (aiohttp)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--webhook", action="store_true", help="Serve webhook instead of long polling")
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8081)
+        parser.add_argument("--shard", type=int, default=0, help="Index in TELEGRAM_WEBHOOK_SHARD_URLS")
+        parser.add_argument("--set-webhook", action="store_true", help="Register TELEGRAM_WEBHOOK_URL on start")
 
     def handle(self, *args, **options):
-        run_polling()
\ No newline at end of file
+        if not options["webhook"]:
+            run_polling()
+            return
+
+        run_webhook(
+            host=options["host"],
+            port=options["port"],
+            shard=options["shard"],
+            register=options["set_webhook"],
+        )
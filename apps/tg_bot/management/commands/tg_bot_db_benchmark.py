@@ -0,0 +1,60 @@
+import asyncio
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.tg_bot.bot.utils.db import configure_db_executor, database_sync_to_async, db_executor_stats
+from apps.tg_bot.selectors import get_telegram_profile_by_user_id
+
+
+def _probe(user_id: int, latency: float):
+    profile = get_telegram_profile_by_user_id(user_id)
+    if latency:
+        # сетевой round-trip до БД: в реальном Postgres поток так же ждёт сокет без GIL
+        time.sleep(latency)
+    return profile
+
+
+class Command(BaseCommand):
+    help = "Measure bot ORM throughput for several DB executor pool sizes"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--pool-sizes", default="1,2,4,8,16")
+        parser.add_argument("--users", type=int, default=200, help="Concurrent simulated users")
+        parser.add_argument("--calls", type=int, default=5, help="ORM calls per user")
+        parser.add_argument("--latency-ms", type=float, default=2.0, help="Extra simulated DB latency per call")
+        parser.add_argument("--with-thread-sensitive", action="store_true", help="Also measure the old single-thread mode")
+
+    def handle(self, *args, **options):
+        sizes = [int(x) for x in options["pool_sizes"].split(",") if x.strip()]
+        latency = options["latency_ms"] / 1000
+
+        if options["with_thread_sensitive"]:
+            elapsed = asyncio.run(self._run(options, latency, thread_sensitive=True))
+            self._report("thread_sensitive", options, elapsed, None)
+
+        for size in sizes:
+            configure_db_executor(size)
+            db_executor_stats.reset()
+            elapsed = asyncio.run(self._run(options, latency, thread_sensitive=False))
+            self._report(f"pool={size}", options, elapsed, db_executor_stats.snapshot())
+
+        configure_db_executor()
+
+    async def _run(self, options, latency: float, *, thread_sensitive: bool) -> float:
+        probe = database_sync_to_async(_probe, thread_sensitive=thread_sensitive)
+
+        async def user(user_id: int):
+            for _ in range(options["calls"]):
+                await probe(user_id, latency)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(user(i + 1) for i in range(options["users"])))
+        return time.perf_counter() - started
+
+    def _report(self, label: str, options, elapsed: float, stats: dict | None):
+        total = options["users"] * options["calls"]
+        line = f"{label:>18}: {total / elapsed:8.1f} calls/s, total {elapsed:.2f}s"
+        if stats:
+            line += f", wait p95 {stats['wait_p95_ms']} ms, exec p95 {stats['exec_p95_ms']} ms"
+        self.stdout.write(line)
@@ -0,0 +1,139 @@
+import asyncio
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from apps.tg_bot.bot.loadtest import (
+    DEFAULT_USER_ID_BASE,
+    LoadTestConfig,
+    build_user_steps,
+    cleanup_load_test_data,
+    count_created_requests,
+    reset_load_test_users,
+    run_load_test,
+    seed_load_test_data,
+)
+from apps.tg_bot.bot.main import build_dispatcher
+from apps.tg_bot.bot.testing import build_fake_bot
+from apps.tg_bot.bot.utils.antiflood import antiflood_stats
+from apps.tg_bot.bot.utils.db import close_db_executor, configure_db_executor, db_executor_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Offline bot load test: synthetic users walk auth/registration -> create request -> "
+        "my requests through the real dispatcher with a fake Bot API. "
+        "Runs in a throwaway test database unless --use-configured-db is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=500)
+        parser.add_argument("--concurrency", type=int, default=100, help="Users active at the same time")
+        parser.add_argument("--registration-share", type=float, default=0.3,
+                            help="Share of users registering by INN instead of phone auth")
+        parser.add_argument("--user-id-base", type=int, default=DEFAULT_USER_ID_BASE,
+                            help="First synthetic Telegram user id; must stay negative (never a real user)")
+        parser.add_argument("--latency", type=float, default=0.0, help="Fake Bot API latency, seconds")
+        parser.add_argument("--think-ms", type=float, default=0.0, help="Average pause between user steps")
+        parser.add_argument("--pool-size", type=int, default=None, help="DB executor size (TELEGRAM_DB_POOL_SIZE)")
+        parser.add_argument("--without-antiflood", action="store_true")
+        parser.add_argument("--seed", type=int, default=0, help="Random seed for the flow mix")
+        parser.add_argument("--use-configured-db", action="store_true",
+                            help="Run against the configured database instead of a throwaway test DB "
+                                 "(created data is removed afterwards)")
+        parser.add_argument("--allow-write-db", action="store_true",
+                            help="Required with --use-configured-db when DEBUG is off")
+
+    def handle(self, *args, **options):
+        if options["user_id_base"] + options["users"] > 0:
+            raise CommandError("--user-id-base + --users must stay <= 0: positive ids belong to real Telegram users.")
+
+        if options["use_configured_db"]:
+            if not (settings.DEBUG or options["allow_write_db"]):
+                raise CommandError(
+                    "Refusing to write load-test data to the configured database with DEBUG off. "
+                    "Drop --use-configured-db to run in a throwaway test DB, or pass --allow-write-db."
+                )
+            self._run(options)
+            return
+
+        old_name = connection.settings_dict["NAME"]
+        test_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        self.stdout.write(f"Using throwaway test database {test_name}")
+        try:
+            self._run(options)
+        finally:
+            close_db_executor()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def _run(self, options):
+        if options["without_antiflood"]:
+            settings.TELEGRAM_ANTIFLOOD_ENABLED = False
+        if options["pool_size"]:
+            configure_db_executor(options["pool_size"])
+        if connection.vendor == "sqlite" and options["pool_size"] != 1:
+            self.stdout.write(self.style.WARNING(
+                "SQLite allows one writer at a time: concurrent pool threads will hit 'database is locked'. "
+                "Use --pool-size 1 or a PostgreSQL database."
+            ))
+
+        config = LoadTestConfig(
+            users=options["users"],
+            concurrency=options["concurrency"],
+            user_id_base=options["user_id_base"],
+            registration_share=options["registration_share"],
+            think_time=options["think_ms"] / 1000,
+            seed=options["seed"],
+        )
+        user_ids = [config.user_id_base + i for i in range(config.users)]
+
+        fixture = seed_load_test_data(config.users)
+        reset_load_test_users(user_ids)
+        plans = build_user_steps(config, fixture)
+        self.stdout.write(f"Seeded fixture {fixture}, {sum(map(len, plans))} updates planned")
+
+        db_executor_stats.reset()
+        antiflood_stats.reset()
+        bot = build_fake_bot(latency=options["latency"])
+        dp = build_dispatcher()
+        try:
+            recorder, elapsed = asyncio.run(
+                run_load_test(bot, dp, plans, concurrency=config.concurrency, think_time=config.think_time)
+            )
+            created = count_created_requests(user_ids)
+        finally:
+            if options["use_configured_db"]:
+                deleted = cleanup_load_test_data(user_ids, config.users)
+                self.stdout.write(f"Load-test data removed: {deleted}")
+
+        updates = sum(len(s.durations) for s in recorder.steps.values())
+        errors = sum(s.errors for s in recorder.steps.values()) + sum(s.errors for s in recorder.handlers.values())
+
+        self.stdout.write(f"Users: {config.users}, concurrency: {config.concurrency}, "
+                          f"updates: {updates}, elapsed: {elapsed:.2f}s, {updates / elapsed:.1f} updates/s")
+        self._table("Steps (feed_update, incl. middlewares)", recorder.steps)
+        self._table("Handlers", recorder.handlers)
+        db_stats = db_executor_stats.snapshot()
+        self.stdout.write(f"DB executor: {db_stats}")
+        self.stdout.write(f"Antiflood: {antiflood_stats.snapshot()}")
+        self.stdout.write(f"Bot API calls: {bot.session.method_counts()}")
+        self.stdout.write(f"Requests created: {created}/{config.users}")
+
+        ok = not errors and not db_stats["errors"] and created == config.users
+        self.stdout.write(
+            self.style.SUCCESS("OK") if ok
+            else self.style.WARNING(f"Handler errors: {errors}, DB errors: {db_stats['errors']}")
+        )
+
+    def _table(self, title: str, rows: dict):
+        self.stdout.write(f"\n{title}")
+        self.stdout.write(f"{'name':<34}{'count':>7}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}{'sql':>7}{'err':>5}")
+        for name, samples in rows.items():
+            s = samples.summary()
+            sql = "-" if s["queries_avg"] is None else s["queries_avg"]
+            self.stdout.write(
+                f"{name:<34}{s['count']:>7}{s['p50_ms']:>9}{s['p95_ms']:>9}{s['p99_ms']:>9}{s['max_ms']:>9}"
+                f"{sql:>7}{s['errors']:>5}"
+            )
+        self.stdout.write("")
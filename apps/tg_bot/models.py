@@ -72,6 +72,8 @@ class TelegramChatBinding(models.Model):
         blank=True,
         related_name="telegram_chat_bindings",
     )
+    # 0 — уведомление о каждом обращении сразу; N — одна сводка раз в N минут
+    digest_minutes = models.PositiveSmallIntegerField(default=0)
 
     updated_at = models.DateTimeField(auto_now=True)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -82,3 +84,115 @@ class TelegramChatBinding(models.Model):
 
     def __str__(self):
         return self.title or str(self.chat_id)
+
+
+class TelegramNotificationDigestItem(models.Model):
+    """
+    Обращение, ожидающее сводки для группы с digest_minutes > 0.
+    Строки удаляются после отправки сводки (apps/tg_bot/bot/utils/notifications.py);
+    на время отправки их забирает один процесс (claim_token / claimed_at).
+    """
+
+    chat_binding = models.ForeignKey(
+        TelegramChatBinding,
+        on_delete=models.CASCADE,
+        related_name="digest_items",
+    )
+    request = models.ForeignKey(
+        "requests.Request",
+        on_delete=models.CASCADE,
+        related_name="telegram_digest_items",
+    )
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    # процесс бота, который сейчас отправляет сводку (несколько процессов/шардов)
+    claim_token = models.CharField(max_length=32, blank=True, db_index=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Telegram сводка: обращение"
+        verbose_name_plural = "Telegram сводки: обращения"
+        constraints = [
+            models.UniqueConstraint(fields=["chat_binding", "request"], name="uniq_tg_digest_item"),
+        ]
+
+    def __str__(self):
+        return f"{self.chat_binding_id}:{self.request_id}"
+
+
+class TelegramFsmState(models.Model):
+    """
+    Состояние aiogram FSM (см. apps/tg_bot/bot/storage.py).
+    Ключ повторяет aiogram StorageKey; пустые thread_id/business_connection_id
+    храним как 0/"" — NULL в unique-ограничении не сравнивается.
+    """
+
+    bot_id = models.BigIntegerField()
+    chat_id = models.BigIntegerField()
+    user_id = models.BigIntegerField()
+    thread_id = models.BigIntegerField(default=0)
+    business_connection_id = models.CharField(max_length=255, blank=True, default="")
+    destiny = models.CharField(max_length=64, default="default")
+
+    state = models.CharField(max_length=255, null=True, blank=True)
+    data = models.JSONField(default=dict, blank=True)
+
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        verbose_name = "Telegram FSM состояние"
+        verbose_name_plural = "Telegram FSM состояния"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["bot_id", "chat_id", "user_id", "thread_id", "business_connection_id", "destiny"],
+                name="uniq_tg_fsm_state_key",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.chat_id}:{self.user_id} | {self.state or '-'}"
+
+
+class TelegramRequestSubmission(models.Model):
+    """
+    Отправка обращения из бота: подтверждение ставит запись в очередь,
+    обращение создаёт фоновый воркер (apps/tg_bot/bot/submissions.py).
+    idempotency_key = chat_id:message_id карточки подтверждения — повторное нажатие
+    "Отправить" не создаёт второе обращение.
+    """
+
+    class Status(models.TextChoices):
+        QUEUED = "queued", "В очереди"
+        PROCESSING = "processing", "Обрабатывается"
+        DONE = "done", "Создано"
+        FAILED = "failed", "Ошибка"
+
+    idempotency_key = models.CharField(max_length=64, unique=True)
+    telegram_user_id = models.BigIntegerField(db_index=True)
+    chat_id = models.BigIntegerField()
+    message_id = models.BigIntegerField()
+    lang = models.CharField(max_length=8, default="uz")
+
+    payload = models.JSONField(default=dict, blank=True)
+
+    status = models.CharField(max_length=16, choices=Status.choices, default=Status.QUEUED, db_index=True)
+    request = models.ForeignKey(
+        "requests.Request",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="telegram_submissions",
+    )
+    notified = models.BooleanField(default=False)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Telegram отправка обращения"
+        verbose_name_plural = "Telegram отправки обращений"
+        ordering = ("-created_at",)
+
+    def __str__(self):
+        return f"{self.idempotency_key} | {self.status}"
@@ -159,6 +159,18 @@ def get_active_notification_chats_for_department(department: Department | None):
     return qs.filter(department=department).order_by("id")
 
 
+def get_active_notification_routes() -> list[tuple[int, int, int | None, int]]:
+    """
+    (binding_id, chat_id, department_id, digest_minutes) всех активных групп — одним запросом.
+    """
+    return list(
+        TelegramChatBinding.objects
+        .filter(is_active=True)
+        .order_by("id")
+        .values_list("id", "chat_id", "department_id", "digest_minutes")
+    )
+
+
 def get_request_detail_for_notification(request_id: int) -> Optional[Request]:
     return (
         Request.objects
@@ -1,21 +1,33 @@
 from __future__ import annotations
 
+import uuid
+
 from dataclasses import dataclass
 from typing import Optional
 
+from datetime import timedelta
+
 from django.conf import settings
-from django.db import transaction
+from django.db import IntegrityError, transaction
+from django.db.models import F, Min, Q
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
-from apps.companies.models import Company, EmployeeCompany, Category, Region, District, Direction, CompanyPhone, Position
+from apps.companies.changes import company_change_source
+from apps.companies.models import (
+    Company, EmployeeCompany, Category, Region, District, Direction, CompanyPhone, Position, CompanyChange,
+)
 from apps.requests.models import Request
 from apps.requests.services import create_request_from_channel
 from .bot.utils.i18n import translate_request_status
-from .models import TelegramProfile, TelegramChatBinding
+from .bot.utils.notification_routes import get_routes_for_department
+from .models import TelegramProfile, TelegramChatBinding, TelegramNotificationDigestItem, TelegramRequestSubmission
 from .selectors import (
+    get_company_request_context,
+    get_problem_direction_by_id,
+    get_verified_telegram_profile_by_user_id,
     find_company_by_phone,
     find_employee_company_by_phone,
-    get_active_notification_chats_for_department,
     get_request_detail_for_notification,
     find_company_by_inn,
     find_employee_company_by_company_and_phone,
@@ -31,6 +43,12 @@ class VerifyTelegramUserResult:
     matched: bool
 
 
+@dataclass(frozen=True)
+class EnqueueSubmissionResult:
+    submission: TelegramRequestSubmission
+    created: bool
+
+
 @dataclass(frozen=True)
 class RegisterByInnResult:
     profile: TelegramProfile
@@ -262,16 +280,7 @@ def build_request_notification_text(request_obj: Request) -> str:
 
 
 def get_notification_chat_ids_for_request(request_obj: Request) -> list[int]:
-    ids = []
-
-    common_chats = get_active_notification_chats_for_department(None)
-    ids.extend(common_chats.values_list("chat_id", flat=True))
-
-    if request_obj.assigned_department_id:
-        dept_chats = get_active_notification_chats_for_department(request_obj.assigned_department)
-        ids.extend(dept_chats.values_list("chat_id", flat=True))
-
-    return list(dict.fromkeys(ids))
+    return [route.chat_id for route in get_routes_for_department(request_obj.assigned_department_id)]
 
 
 def prepare_request_notification_payload(request_id: int) -> dict | None:
@@ -287,7 +296,169 @@ def prepare_request_notification_payload(request_id: int) -> dict | None:
     }
 
 
+def route_request_notification(request_id: int) -> dict | None:
+    """
+    Как prepare_request_notification_payload, но группы с digest_minutes > 0
+    не попадают в chat_ids: обращение откладывается в их сводку.
+    """
+    request_obj = get_request_detail_for_notification(request_id)
+    if not request_obj:
+        return None
+
+    immediate, digest = [], []
+    for route in get_routes_for_department(request_obj.assigned_department_id):
+        (digest if route.digest_minutes else immediate).append(route)
+
+    if digest:
+        # повторная доставка того же обращения (рестарт воркера) не дублирует строку сводки
+        TelegramNotificationDigestItem.objects.bulk_create(
+            [TelegramNotificationDigestItem(chat_binding_id=r.binding_id, request=request_obj) for r in digest],
+            ignore_conflicts=True,
+        )
+
+    return {
+        "chat_ids": [route.chat_id for route in immediate],
+        "text": build_request_notification_text(request_obj) if immediate else "",
+        "request_id": request_obj.id,
+        "public_id": request_obj.public_id,
+    }
+
+
+def deactivate_chat_binding(chat_id: int) -> bool:
+    """
+    Бота исключили из группы — больше туда не пишем.
+    """
+    binding = TelegramChatBinding.objects.filter(chat_id=chat_id, is_active=True).first()
+    if binding is None:
+        return False
+    binding.is_active = False
+    binding.save(update_fields=["is_active", "updated_at"])
+    return True
+
+
+@transaction.atomic
+def migrate_chat_binding(old_chat_id: int, new_chat_id: int) -> bool:
+    """
+    Группа стала супергруппой и получила новый chat_id.
+    """
+    binding = TelegramChatBinding.objects.select_for_update().filter(chat_id=old_chat_id).first()
+    if binding is None:
+        return False
+
+    if TelegramChatBinding.objects.filter(chat_id=new_chat_id).exists():
+        # супергруппа уже привязана отдельно (бот успел получить из неё сообщение)
+        binding.is_active = False
+        binding.save(update_fields=["is_active", "updated_at"])
+        return False
+
+    binding.chat_id = new_chat_id
+    binding.chat_type = TelegramChatBinding.ChatType.SUPERGROUP
+    binding.save(update_fields=["chat_id", "chat_type", "updated_at"])
+    return True
+
+
+def build_request_digest_line(request_obj: Request) -> str:
+    problem_direction = str(request_obj.problem_direction) if request_obj.problem_direction else "-"
+    return (
+        f"• <b>{request_obj.public_id or request_obj.pk}</b> — {request_obj.company} — {problem_direction}\n"
+        f"{build_request_panel_url(request_obj)}"
+    )
+
+
+def build_request_digest_chunks(items: list[TelegramNotificationDigestItem], limit: int = 4000) -> list[dict]:
+    """
+    Сводка по обращениям, разбитая на сообщения короче лимита Telegram (4096).
+    У каждого сообщения — id строк, которые в него вошли: отправленные удаляются
+    сразу, и при сбое на следующем сообщении повторно уходит только хвост.
+    """
+    header = f"🗂 <b>Yangi murojaatlar: {len(items)}</b>"
+    chunks, current, current_ids = [], header, []
+    for item in items:
+        line = build_request_digest_line(item.request)
+        if len(current) + len(line) + 2 > limit and current_ids:
+            chunks.append({"text": current, "item_ids": current_ids})
+            current, current_ids = line, []
+        else:
+            current = f"{current}\n\n{line}"
+        current_ids.append(item.pk)
+    chunks.append({"text": current, "item_ids": current_ids})
+    return chunks
+
+
+def _claimable_digest_items_q(now) -> Q:
+    # не забраны или забраны процессом, который не отчитался за TTL (упал)
+    stale_border = now - timedelta(seconds=settings.TELEGRAM_NOTIFY_DIGEST_CLAIM_SECONDS)
+    return Q(claimed_at__isnull=True) | Q(claimed_at__lt=stale_border)
+
+
+def collect_due_notification_digests(now=None) -> list[dict]:
+    """
+    Сводки, у которых самое старое обращение ждёт дольше digest_minutes группы.
+    Строки забираются одним UPDATE с токеном процесса: при нескольких процессах
+    бота (шарды webhook) каждую сводку отправляет только забравший её.
+    Строки отключённых групп удаляются сразу.
+    """
+    now = now or timezone.now()
+    items = TelegramNotificationDigestItem.objects
+
+    items.filter(chat_binding__is_active=False).delete()
+
+    claimable = _claimable_digest_items_q(now)
+    due_binding_ids = [
+        row["chat_binding_id"]
+        for row in (
+            items
+            .filter(claimable)
+            .values("chat_binding_id", "chat_binding__digest_minutes")
+            .annotate(oldest=Min("created_at"))
+        )
+        if row["oldest"] <= now - timedelta(minutes=row["chat_binding__digest_minutes"])
+    ]
+    if not due_binding_ids:
+        return []
+
+    token = uuid.uuid4().hex
+    claimed = (
+        items
+        .filter(claimable, chat_binding_id__in=due_binding_ids)
+        .update(claim_token=token, claimed_at=now)
+    )
+    if not claimed:
+        return []
+
+    grouped: dict[int, list[TelegramNotificationDigestItem]] = {}
+    for item in (
+        items
+        .filter(claim_token=token)
+        .select_related("chat_binding", "request__company", "request__problem_direction")
+        .order_by("created_at", "id")
+    ):
+        grouped.setdefault(item.chat_binding_id, []).append(item)
+
+    return [
+        {
+            "binding_id": binding_id,
+            "chat_id": group[0].chat_binding.chat_id,
+            "item_ids": [item.pk for item in group],
+            "chunks": build_request_digest_chunks(group),
+        }
+        for binding_id, group in grouped.items()
+    ]
+
+
+def delete_notification_digest_items(item_ids: list[int]) -> None:
+    TelegramNotificationDigestItem.objects.filter(pk__in=item_ids).delete()
+
+
+def release_notification_digest_items(item_ids: list[int]) -> None:
+    """
+    Сводка не ушла — строки снова доступны (повтор на следующем тике любого процесса).
+    """
+    TelegramNotificationDigestItem.objects.filter(pk__in=item_ids).update(claim_token="", claimed_at=None)
+
+
 @transaction.atomic
+@company_change_source(CompanyChange.Source.TELEGRAM)
 def create_request_from_telegram_profile(
     *,
     profile: TelegramProfile,
@@ -344,6 +515,135 @@ def create_request_from_telegram_profile(
     return req
 
 
+def enqueue_telegram_submission(
+    *,
+    idempotency_key: str,
+    telegram_user_id: int,
+    chat_id: int,
+    message_id: int,
+    lang: str,
+    payload: dict,
+) -> EnqueueSubmissionResult:
+    try:
+        with transaction.atomic():
+            submission = TelegramRequestSubmission.objects.create(
+                idempotency_key=idempotency_key,
+                telegram_user_id=telegram_user_id,
+                chat_id=chat_id,
+                message_id=message_id,
+                lang=lang,
+                payload=payload,
+            )
+        return EnqueueSubmissionResult(submission=submission, created=True)
+    except IntegrityError:
+        submission = TelegramRequestSubmission.objects.get(idempotency_key=idempotency_key)
+        return EnqueueSubmissionResult(submission=submission, created=False)
+
+
+def _claimable_submissions_q() -> Q:
+    # processing без движения дольше порога — воркер упал посреди обработки
+    stale_border = timezone.now() - timedelta(seconds=settings.TELEGRAM_SUBMISSION_STALE_SECONDS)
+    return Q(status=TelegramRequestSubmission.Status.QUEUED) | Q(
+        status=TelegramRequestSubmission.Status.PROCESSING, updated_at__lt=stale_border
+    )
+
+
+def _unnotified_submissions_q() -> Q:
+    # обращение создано, но процесс упал до уведомления групп
+    stale_border = timezone.now() - timedelta(seconds=settings.TELEGRAM_SUBMISSION_STALE_SECONDS)
+    return Q(
+        status=TelegramRequestSubmission.Status.DONE,
+        notified=False,
+        request__isnull=False,
+        updated_at__lt=stale_border,
+    )
+
+
+def claim_telegram_submission(submission_id: int) -> TelegramRequestSubmission | None:
+    """
+    Атомарно переводит отправку в processing. None — её уже взял другой воркер.
+    Созданную, но не разосланную (done, notified=False) отправку забирает
+    без смены статуса: updated_at сдвигается, второй воркер её не возьмёт.
+    """
+    now = timezone.now()
+    claimed = (
+        TelegramRequestSubmission.objects
+        .filter(_claimable_submissions_q(), pk=submission_id)
+        .update(
+            status=TelegramRequestSubmission.Status.PROCESSING,
+            attempts=F("attempts") + 1,
+            updated_at=now,
+        )
+    )
+    if not claimed:
+        claimed = (
+            TelegramRequestSubmission.objects
+            .filter(_unnotified_submissions_q(), pk=submission_id)
+            .update(attempts=F("attempts") + 1, updated_at=now)
+        )
+    if not claimed:
+        return None
+    return TelegramRequestSubmission.objects.select_related("request").get(pk=submission_id)
+
+
+def get_pending_telegram_submission_ids(limit: int = 500) -> list[int]:
+    return list(
+        TelegramRequestSubmission.objects
+        .filter(_claimable_submissions_q() | _unnotified_submissions_q())
+        .order_by("id")
+        .values_list("id", flat=True)[:limit]
+    )
+
+
+@transaction.atomic
+def complete_telegram_submission(submission_id: int, *, attachments=None) -> Request:
+    """
+    Создаёт обращение и помечает отправку done в одной транзакции:
+    после падения до commit повторная обработка безопасна.
+    """
+    submission = TelegramRequestSubmission.objects.select_for_update().get(pk=submission_id)
+    if submission.request_id:
+        return submission.request
+
+    profile = get_verified_telegram_profile_by_user_id(submission.telegram_user_id)
+    if not profile or not profile.company:
+        raise ValueError("Telegram profile is not verified or not bound to company")
+
+    company_ctx = get_company_request_context(profile.company_id)
+    if not company_ctx:
+        raise ValueError("Company not found")
+
+    payload = submission.payload or {}
+    req = create_request_from_telegram_profile(
+        profile=profile,
+        problem_direction=get_problem_direction_by_id(payload.get("problem_direction_id")),
+        category=company_ctx["category"],
+        region=company_ctx["region"],
+        district=company_ctx["district"],
+        directions=company_ctx["directions"],
+        description=payload.get("description", ""),
+        attachments=attachments,
+    )
+
+    submission.request = req
+    submission.status = TelegramRequestSubmission.Status.DONE
+    submission.error = ""
+    submission.save(update_fields=["request", "status", "error", "updated_at"])
+    return req
+
+
+def fail_telegram_submission(submission_id: int, error: str) -> None:
+    TelegramRequestSubmission.objects.filter(pk=submission_id).update(
+        status=TelegramRequestSubmission.Status.FAILED,
+        error=error[:2000],
+        updated_at=timezone.now(),
+    )
+
+
+def mark_telegram_submission_notified(submission_id: int) -> None:
+    TelegramRequestSubmission.objects.filter(pk=submission_id).update(notified=True, updated_at=timezone.now())
+
+
 def _get_latest_official_response(request_obj: Request):
     try:
         responses = request_obj.official_responses.all()
@@ -417,6 +717,7 @@ def _split_fio_parts(fio: str) -> tuple[str, str, str]:
 
 
 @transaction.atomic
+@company_change_source(CompanyChange.Source.TELEGRAM)
 def register_or_bind_telegram_profile_by_inn(
     *,
     telegram_user_id: int,
@@ -0,0 +1,19 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .bot.utils.notification_routes import invalidate_notification_routes
+from .bot.utils.profile_context import invalidate_profile_context
+from .models import TelegramChatBinding, TelegramProfile
+
+
+@receiver([post_save, post_delete], sender=TelegramProfile, dispatch_uid="tg_profile_context_invalidate")
+def invalidate_profile_context_on_change(sender, instance: TelegramProfile, **kwargs):
+    # после commit: иначе параллельный апдейт успеет закэшировать старую строку
+    user_id = instance.telegram_user_id
+    transaction.on_commit(lambda: invalidate_profile_context(user_id))
+
+
+@receiver([post_save, post_delete], sender=TelegramChatBinding, dispatch_uid="tg_notification_routes_invalidate")
+def invalidate_notification_routes_on_change(sender, instance: TelegramChatBinding, **kwargs):
+    transaction.on_commit(invalidate_notification_routes)
@@ -1,3 +1,252 @@
-from django.test import TestCase
+import asyncio
+import itertools
+import os
+import tempfile
 
-# Create your tests here.
+from aiogram import Dispatcher, Router
+from aiogram import Bot
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.fsm.middleware import FSMContextMiddleware
+from aiogram.types import File, Message, Update
+from aiohttp.test_utils import TestClient, TestServer
+from django.test import SimpleTestCase, override_settings
+
+from apps.tg_bot.bot.testing import FAKE_BOT_TOKEN, FakeBotSession, build_fake_bot
+from apps.tg_bot.bot.utils.antiflood import AntifloodMiddleware, AntifloodStats, install_antiflood
+from apps.tg_bot.bot.utils.files import MAX_ATTACH_BYTES, AttachmentStager, AttachmentTooLarge
+from apps.tg_bot.bot.webhook import SECRET_HEADER, build_webhook_app
+
+WEBHOOK_PATH = "/tg/webhook/"
+SECRET = "test-secret"
+
+_update_ids = itertools.count(1)
+
+
+def _message_update(user_id: int, text: str) -> dict:
+    update_id = next(_update_ids)
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 1700000000,
+            "chat": {"id": user_id, "type": "private"},
+            "from": {"id": user_id, "is_bot": False, "first_name": f"U{user_id}"},
+            "text": text,
+        },
+    }
+
+
+def _recording_dispatcher(seen: list, shutdown_log: list) -> Dispatcher:
+    """
+    Диспетчер без БД: запоминает (user_id, text); у первого пользователя
+    обработка медленнее, чтобы апдейты разных пользователей перемешивались.
+    """
+    router = Router()
+
+    @router.message()
+    async def record(message: Message):
+        await asyncio.sleep(0.02 if message.from_user.id == 1 else 0.005)
+        seen.append((message.from_user.id, message.text))
+
+    dp = Dispatcher(storage=MemoryStorage())
+    dp.include_router(router)
+
+    async def on_shutdown():
+        shutdown_log.append(len(seen))
+
+    dp.shutdown.register(on_shutdown)
+    return dp
+
+
+class WebhookAppTests(SimpleTestCase):
+    def _build(self, seen, shutdown_log, **kwargs):
+        bot = build_fake_bot()
+        dp = _recording_dispatcher(seen, shutdown_log)
+        app = build_webhook_app(bot, dp, shard_urls=[], secret=SECRET, path=WEBHOOK_PATH, **kwargs)
+        return app
+
+    def test_updates_of_one_user_are_processed_in_order(self):
+        seen, shutdown_log = [], []
+        updates = [_message_update(user_id, f"{user_id}:{n}") for n in range(5) for user_id in (1, 2, 3)]
+
+        async def run():
+            app = self._build(seen, shutdown_log, concurrency=4)
+            async with TestClient(TestServer(app)) as client:
+                for update in updates:
+                    resp = await client.post(WEBHOOK_PATH, json=update, headers={SECRET_HEADER: SECRET})
+                    self.assertEqual(resp.status, 200)
+                await app["update_queue"].join()
+
+        asyncio.run(run())
+
+        self.assertEqual(len(seen), len(updates))
+        for user_id in (1, 2, 3):
+            texts = [text for uid, text in seen if uid == user_id]
+            self.assertEqual(texts, [f"{user_id}:{n}" for n in range(5)])
+        # разные пользователи обрабатывались параллельно, а не в порядке прихода
+        self.assertNotEqual(seen, [(u["message"]["from"]["id"], u["message"]["text"]) for u in updates])
+
+    def test_wrong_secret_is_rejected(self):
+        seen, shutdown_log = [], []
+
+        async def run():
+            app = self._build(seen, shutdown_log)
+            async with TestClient(TestServer(app)) as client:
+                wrong = await client.post(WEBHOOK_PATH, json=_message_update(5, "x"), headers={SECRET_HEADER: "nope"})
+                missing = await client.post(WEBHOOK_PATH, json=_message_update(5, "y"))
+                await app["update_queue"].join()
+                return wrong.status, missing.status, app["update_queue"].stats()
+
+        wrong, missing, stats = asyncio.run(run())
+
+        self.assertEqual((wrong, missing), (401, 401))
+        self.assertEqual(seen, [])
+        self.assertEqual(stats["processed"], 0)
+
+    def test_accepted_updates_are_drained_on_shutdown(self):
+        seen, shutdown_log = [], []
+        updates = [_message_update(1, f"1:{n}") for n in range(10)]
+
+        async def run():
+            app = self._build(seen, shutdown_log)
+            async with TestClient(TestServer(app)) as client:
+                for update in updates:
+                    resp = await client.post(WEBHOOK_PATH, json=update, headers={SECRET_HEADER: SECRET})
+                    self.assertEqual(resp.status, 200)
+                # ответ 200 уже отдан, обработка ещё идёт
+                self.assertLess(len(seen), len(updates))
+            # выход из клиента = runner.cleanup(), как по SIGTERM в run_webhook
+            return app["update_queue"].stats()
+
+        stats = asyncio.run(run())
+
+        self.assertEqual([text for _uid, text in seen], [f"1:{n}" for n in range(10)])
+        self.assertEqual(stats["pending"], 0)
+        # shutdown диспетчера (flush FSM) — только после того, как очередь доработана
+        self.assertEqual(shutdown_log, [len(updates)])
+
+
+class _BigFileSession(FakeBotSession):
+    """
+    file_id "big" Telegram отдаёт с размером больше лимита.
+    """
+
+    def _fake_result(self, bot, method):
+        result = super()._fake_result(bot, method)
+        if isinstance(result, File) and result.file_id == "big":
+            return result.model_copy(update={"file_size": MAX_ATTACH_BYTES + 1})
+        return result
+
+
+class AttachmentStagerTests(SimpleTestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.staging_dir = tmp.name
+        settings_override = override_settings(TELEGRAM_ATTACH_STAGING_DIR=tmp.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.bot = Bot(token=FAKE_BOT_TOKEN, session=_BigFileSession())
+        self.stager = AttachmentStager()
+
+    def _start(self, *file_ids):
+        meta = []
+        for file_id in file_ids:
+            item = {"file_id": file_id, "filename": f"{file_id}.pdf", "kind": "document"}
+            item["staging_id"] = self.stager.start(self.bot, item)
+            meta.append(item)
+        return meta
+
+    def test_same_file_twice_is_kept_twice(self):
+        async def run():
+            return await self.stager.collect(self.bot, self._start("a", "a"))
+
+        staged = asyncio.run(run())
+
+        self.assertEqual(len(staged), 2)
+        self.assertEqual(staged[0].sha256, staged[1].sha256)
+
+    def test_too_large_discards_collected_and_pending(self):
+        async def run():
+            meta = self._start("a", "big", "c")
+            with self.assertRaises(AttachmentTooLarge):
+                await self.stager.collect(self.bot, meta)
+            await asyncio.sleep(0)  # отменённая загрузка "c" успевает завершиться
+
+        asyncio.run(run())
+
+        self.assertEqual(os.listdir(self.staging_dir), [])
+        self.assertEqual(self.stager._tasks, {})
+
+    def test_forget_drops_tasks_and_files(self):
+        async def run():
+            meta = self._start("a", "b")
+            await asyncio.gather(*self.stager._tasks.values())
+            self.stager.forget(meta)
+
+        asyncio.run(run())
+
+        self.assertEqual(os.listdir(self.staging_dir), [])
+        self.assertEqual(self.stager._tasks, {})
+
+    def test_cleanup_prunes_abandoned_tasks(self):
+        async def run():
+            self._start("a")
+            await asyncio.gather(*self.stager._tasks.values())
+            # диалог бросили: collect() не будет, задача «состарилась»
+            for staging_id in self.stager._started_at:
+                self.stager._started_at[staging_id] -= 10 ** 6
+            self.stager._cleaned_at = 0.0
+            self.stager._cleanup_stale()
+
+        asyncio.run(run())
+
+        self.assertEqual(self.stager._tasks, {})
+        self.assertEqual(os.listdir(self.staging_dir), [])
+
+
+class _CountingStorage(MemoryStorage):
+    def __init__(self):
+        super().__init__()
+        self.get_state_calls = 0
+
+    async def get_state(self, key):
+        self.get_state_calls += 1
+        return await super().get_state(key)
+
+
+@override_settings(TELEGRAM_ANTIFLOOD_MESSAGE_BURST=3, TELEGRAM_ANTIFLOOD_MESSAGE_RATE=0.001)
+class AntifloodOrderTests(SimpleTestCase):
+    def test_runs_before_fsm_middleware(self):
+        dp = Dispatcher(storage=MemoryStorage())
+        middleware = AntifloodMiddleware(stats=AntifloodStats())
+        install_antiflood(dp, middleware)
+
+        kinds = list(dp.update.outer_middleware)
+        fsm_index = next(i for i, m in enumerate(kinds) if isinstance(m, FSMContextMiddleware))
+        self.assertLess(kinds.index(middleware), fsm_index)
+
+    def test_dropped_updates_do_not_touch_fsm_storage(self):
+        storage = _CountingStorage()
+        dp = Dispatcher(storage=storage)
+        stats = AntifloodStats()
+        install_antiflood(dp, AntifloodMiddleware(stats=stats, notice_seconds=3600))
+        seen = []
+
+        @dp.message()
+        async def record(message: Message):
+            seen.append(message.text)
+
+        bot = build_fake_bot()
+
+        async def run():
+            for n in range(10):
+                update = Update.model_validate(_message_update(7, f"7:{n}"), context={"bot": bot})
+                await dp.feed_update(bot, update)
+
+        asyncio.run(run())
+
+        self.assertEqual(len(seen), 3)
+        self.assertEqual(stats.shed_rate["message"], 7)
+        self.assertEqual(storage.get_state_calls, 3)
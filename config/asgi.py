@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_asgi_application()
+
+# прогрев кэша справочников при старте (с --preload — в мастере, соединения с БД закрываются)
+from apps.companies.reference_cache import safe_warm_up  # noqa: E402
+
+safe_warm_up()
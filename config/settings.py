@@ -1,4 +1,5 @@
 import os
+import tempfile
 from pathlib import Path
 from dotenv import load_dotenv
 from django.utils.translation import gettext_lazy as _
@@ -102,12 +103,70 @@ DATABASES = {
             "HOST": os.environ.get("DB_HOST"),
             "PORT": os.environ.get("DB_PORT"),
             "CONN_MAX_AGE": int(os.environ.get("DB_CONN_MAX_AGE", "600")),
+            "CONN_HEALTH_CHECKS": os.environ.get("DB_CONN_HEALTH_CHECKS", "True").lower() in ("1", "true", "yes", "on"),
 
         }
 }
 
-if DB_ENGINE and "postgresql" in DB_ENGINE:
+DB_IS_POSTGRES = bool(DB_ENGINE and "postgresql" in DB_ENGINE)
+
+if DB_IS_POSTGRES:
     DATABASES["default"]["OPTIONS"] = {"connect_timeout": 5}
+    # триграммный поиск по справочнику компаний (pg_trgm)
+    INSTALLED_APPS.append("django.contrib.postgres")
+
+# Справочник компаний: точный count() дороже самой страницы, выше порога показываем "N+"
+COMPANY_SEARCH_COUNT_CAP = int(os.environ.get("COMPANY_SEARCH_COUNT_CAP", "1000"))
+
+# Кэш справочников в процессе: как часто сверять версию с БД и сколько максимум держать данные
+REFERENCE_CACHE_CHECK_SECONDS = int(os.environ.get("REFERENCE_CACHE_CHECK_SECONDS", "5"))
+REFERENCE_CACHE_MAX_AGE_SECONDS = int(os.environ.get("REFERENCE_CACHE_MAX_AGE_SECONDS", "600"))
+# Cache-Control для JSON справочников (дальше браузер ревалидирует по ETag)
+REFERENCE_HTTP_MAX_AGE = int(os.environ.get("REFERENCE_HTTP_MAX_AGE", "60"))
+# Просмотры публичных страниц: копятся в памяти процесса и пишутся раз в N секунд
+# (False — UPDATE на каждый просмотр)
+VIEW_COUNTERS_BUFFERED = os.environ.get("VIEW_COUNTERS_BUFFERED", "True").lower() in ("1", "true", "yes", "on")
+VIEW_COUNTERS_FLUSH_SECONDS = int(os.environ.get("VIEW_COUNTERS_FLUSH_SECONDS", "10"))
+
+# Кэш Django. По умолчанию файловый — общий для воркеров gunicorn на одном сервере
+# (сброс кэша публичных страниц виден всем процессам); для нескольких серверов —
+# Redis/Memcached через CACHE_BACKEND / CACHE_LOCATION
+CACHES = {
+    "default": {
+        "BACKEND": os.environ.get("CACHE_BACKEND", "django.core.cache.backends.filebased.FileBasedCache"),
+        "LOCATION": os.environ.get("CACHE_LOCATION", str(BASE_DIR / ".cache")),
+        "TIMEOUT": 300,
+        "OPTIONS": {"MAX_ENTRIES": int(os.environ.get("CACHE_MAX_ENTRIES", "5000"))},
+    }
+}
+# публичные страницы для анонимов (главная, новости, объявления, руководство), 0 — без кэша
+PUBLIC_PAGE_CACHE_SECONDS = int(os.environ.get("PUBLIC_PAGE_CACHE_SECONDS", "300"))
+# новостей / объявлений на странице
+PUBLIC_NEWS_PAGE_SIZE = int(os.environ.get("PUBLIC_NEWS_PAGE_SIZE", "12"))
+# Уменьшенные копии изображений (фото, картинки CKEditor, JPEG/PNG-вложения):
+# размер по длинной стороне, формат webp или jpeg, потоков фоновой сборки
+IMAGE_DERIVATIVES_ENABLED = os.environ.get("IMAGE_DERIVATIVES_ENABLED", "True").lower() in ("1", "true", "yes", "on")
+IMAGE_DERIVATIVE_SIZES = {"sm": 160, "md": 480, "lg": 1280}
+IMAGE_DERIVATIVE_FORMAT = os.environ.get("IMAGE_DERIVATIVE_FORMAT", "webp").lower()
+IMAGE_DERIVATIVE_WORKERS = int(os.environ.get("IMAGE_DERIVATIVE_WORKERS", "2"))
+
+# Kerio Operator: снимок пользователей/номеров для справочника — старше N минут
+# обновляется в фоне; зависшее обновление считается брошенным через N секунд,
+# после ошибки повтор не раньше чем через N секунд
+KERIO_SNAPSHOT_MAX_AGE_MINUTES = int(os.environ.get("KERIO_SNAPSHOT_MAX_AGE_MINUTES", "10"))
+KERIO_SNAPSHOT_REFRESH_TIMEOUT_SECONDS = int(os.environ.get("KERIO_SNAPSHOT_REFRESH_TIMEOUT_SECONDS", "120"))
+KERIO_SNAPSHOT_RETRY_SECONDS = int(os.environ.get("KERIO_SNAPSHOT_RETRY_SECONDS", "60"))
+# общий клиент Kerio: токен живёт N секунд после последнего вызова (таймаут сессии
+# Kerio по бездействию), таймаут HTTP-запроса, keep-alive соединений в пуле
+KERIO_OPERATOR_TOKEN_TTL_SECONDS = int(os.environ.get("KERIO_OPERATOR_TOKEN_TTL_SECONDS", "900"))
+KERIO_OPERATOR_TIMEOUT_SECONDS = int(os.environ.get("KERIO_OPERATOR_TIMEOUT_SECONDS", "25"))
+KERIO_OPERATOR_POOL_SIZE = int(os.environ.get("KERIO_OPERATOR_POOL_SIZE", "8"))
+# синхронизация связок (sync_kerio_links): запуск без итога дольше N секунд считается брошенным
+KERIO_SYNC_STALE_SECONDS = int(os.environ.get("KERIO_SYNC_STALE_SECONDS", "900"))
+# массовое создание сотрудников в Kerio (provision_kerio_links, действие в админке): потоков
+KERIO_PROVISION_WORKERS = int(os.environ.get("KERIO_PROVISION_WORKERS", "4"))
+# телефонный справочник: сотрудников на странице
+TELEPHONY_DIRECTORY_PAGE_SIZE = int(os.environ.get("TELEPHONY_DIRECTORY_PAGE_SIZE", "50"))
 
 
 # Password validation
@@ -135,6 +194,66 @@ LOGOUT_REDIRECT_URL = "users:login"
 # Telegram bot
 TELEGRAM_BOT_TOKEN = os.environ.get("TELEGRAM_BOT_TOKEN", "")
 TELEGRAM_BOT_PARSE_MODE = os.environ.get("TELEGRAM_BOT_PARSE_MODE", "HTML")
+# FSM бота: "db" (TelegramFsmState, переживает рестарт, общее для воркеров) или "memory"
+TELEGRAM_FSM_STORAGE = os.environ.get("TELEGRAM_FSM_STORAGE", "db")
+# update_data(last_step_at=...) пишется в БД не чаще раза в N секунд на диалог
+TELEGRAM_FSM_TOUCH_SECONDS = int(os.environ.get("TELEGRAM_FSM_TOUCH_SECONDS", "60"))
+# состояния удаляются через SESSION_TTL_MINUTES + запас после последнего изменения
+TELEGRAM_FSM_CLEANUP_GRACE_MINUTES = int(os.environ.get("TELEGRAM_FSM_CLEANUP_GRACE_MINUTES", "60"))
+TELEGRAM_FSM_CLEANUP_INTERVAL_SECONDS = int(os.environ.get("TELEGRAM_FSM_CLEANUP_INTERVAL_SECONDS", "600"))
+# пул потоков для ORM-вызовов бота (у каждого потока своё постоянное соединение)
+TELEGRAM_DB_POOL_SIZE = int(os.environ.get("TELEGRAM_DB_POOL_SIZE", "8"))
+TELEGRAM_DB_CONN_CHECK_SECONDS = int(os.environ.get("TELEGRAM_DB_CONN_CHECK_SECONDS", "30"))
+# кэш профилей бота (язык, верификация, компания) в процессе бота
+TELEGRAM_PROFILE_CACHE_TTL = int(os.environ.get("TELEGRAM_PROFILE_CACHE_TTL", "60"))
+TELEGRAM_PROFILE_CACHE_SIZE = int(os.environ.get("TELEGRAM_PROFILE_CACHE_SIZE", "10000"))
+# антифлуд бота: token bucket на пользователя (в секунду / запас), предел апдейтов
+# в обработке на процесс (0 — без предела), "подождите" не чаще раза в N секунд
+TELEGRAM_ANTIFLOOD_ENABLED = os.environ.get("TELEGRAM_ANTIFLOOD_ENABLED", "True").lower() in ("1", "true", "yes", "on")
+TELEGRAM_ANTIFLOOD_MESSAGE_RATE = float(os.environ.get("TELEGRAM_ANTIFLOOD_MESSAGE_RATE", "1"))
+TELEGRAM_ANTIFLOOD_MESSAGE_BURST = int(os.environ.get("TELEGRAM_ANTIFLOOD_MESSAGE_BURST", "15"))
+TELEGRAM_ANTIFLOOD_CALLBACK_RATE = float(os.environ.get("TELEGRAM_ANTIFLOOD_CALLBACK_RATE", "2"))
+TELEGRAM_ANTIFLOOD_CALLBACK_BURST = int(os.environ.get("TELEGRAM_ANTIFLOOD_CALLBACK_BURST", "10"))
+TELEGRAM_ANTIFLOOD_MAX_IN_FLIGHT = int(os.environ.get("TELEGRAM_ANTIFLOOD_MAX_IN_FLIGHT", "200"))
+TELEGRAM_ANTIFLOOD_NOTICE_SECONDS = int(os.environ.get("TELEGRAM_ANTIFLOOD_NOTICE_SECONDS", "30"))
+TELEGRAM_ANTIFLOOD_TRACKED_USERS = int(os.environ.get("TELEGRAM_ANTIFLOOD_TRACKED_USERS", "50000"))
+# кнопок справочника на странице inline-клавиатуры бота (районы, направления ...)
+TELEGRAM_KEYBOARD_PAGE_SIZE = int(os.environ.get("TELEGRAM_KEYBOARD_PAGE_SIZE", "10"))
+# вложения из бота: фоновые загрузки во временный каталог до подтверждения обращения
+TELEGRAM_ATTACH_STAGING_DIR = os.environ.get(
+    "TELEGRAM_ATTACH_STAGING_DIR", os.path.join(tempfile.gettempdir(), "adli_tg_attachments")
+)
+TELEGRAM_ATTACH_DOWNLOAD_CONCURRENCY = int(os.environ.get("TELEGRAM_ATTACH_DOWNLOAD_CONCURRENCY", "4"))
+TELEGRAM_ATTACH_DOWNLOAD_TIMEOUT = int(os.environ.get("TELEGRAM_ATTACH_DOWNLOAD_TIMEOUT", "60"))
+# фоновое создание обращений из бота
+TELEGRAM_SUBMISSION_WORKERS = int(os.environ.get("TELEGRAM_SUBMISSION_WORKERS", "4"))
+TELEGRAM_SUBMISSION_STALE_SECONDS = int(os.environ.get("TELEGRAM_SUBMISSION_STALE_SECONDS", "300"))
+# как часто воркер перечитывает из БД queued / зависшие processing (не подхваченные сразу)
+TELEGRAM_SUBMISSION_SWEEP_SECONDS = int(os.environ.get("TELEGRAM_SUBMISSION_SWEEP_SECONDS", "60"))
+# уведомления в группы: параллельные запросы, интервал между сообщениями в одну группу (сек),
+# попытки при сетевых ошибках, проверка сводок (digest_minutes) раз в N секунд
+TELEGRAM_NOTIFY_CONCURRENCY = int(os.environ.get("TELEGRAM_NOTIFY_CONCURRENCY", "10"))
+TELEGRAM_NOTIFY_CHAT_INTERVAL = float(os.environ.get("TELEGRAM_NOTIFY_CHAT_INTERVAL", "3"))
+TELEGRAM_NOTIFY_MAX_ATTEMPTS = int(os.environ.get("TELEGRAM_NOTIFY_MAX_ATTEMPTS", "3"))
+TELEGRAM_NOTIFY_DIGEST_CHECK_SECONDS = int(os.environ.get("TELEGRAM_NOTIFY_DIGEST_CHECK_SECONDS", "60"))
+# сводку отправляет процесс, забравший её строки; если он не отчитался за N секунд
+# (упал), строки снова доступны другим процессам
+TELEGRAM_NOTIFY_DIGEST_CLAIM_SECONDS = int(os.environ.get("TELEGRAM_NOTIFY_DIGEST_CLAIM_SECONDS", "600"))
+# таблица маршрутов уведомлений (отдел → группы) в памяти процесса
+TELEGRAM_NOTIFY_ROUTES_TTL = int(os.environ.get("TELEGRAM_NOTIFY_ROUTES_TTL", "300"))
+# Webhook-режим (run_tg_bot --webhook)
+TELEGRAM_WEBHOOK_URL = os.environ.get("TELEGRAM_WEBHOOK_URL", "")
+TELEGRAM_WEBHOOK_PATH = os.environ.get("TELEGRAM_WEBHOOK_PATH", "/tg/webhook")
+TELEGRAM_WEBHOOK_SECRET = os.environ.get("TELEGRAM_WEBHOOK_SECRET", "")
+TELEGRAM_WEBHOOK_MAX_CONNECTIONS = int(os.environ.get("TELEGRAM_WEBHOOK_MAX_CONNECTIONS", "40"))
+# параллельно обрабатываемых пользователей / апдейтов в памяти до ответа 503
+TELEGRAM_WEBHOOK_CONCURRENCY = int(os.environ.get("TELEGRAM_WEBHOOK_CONCURRENCY", "32"))
+TELEGRAM_WEBHOOK_MAX_PENDING = int(os.environ.get("TELEGRAM_WEBHOOK_MAX_PENDING", "1000"))
+TELEGRAM_WEBHOOK_SHUTDOWN_TIMEOUT = int(os.environ.get("TELEGRAM_WEBHOOK_SHUTDOWN_TIMEOUT", "30"))
+# внутренние URL всех шардов, через запятую; индекс = --shard
+TELEGRAM_WEBHOOK_SHARD_URLS = [u.strip() for u in os.environ.get("TELEGRAM_WEBHOOK_SHARD_URLS", "").split(",") if u.strip()]
+# если задан — принятые апдейты дописываются в jsonl (для replay_tg_updates)
+TELEGRAM_WEBHOOK_RECORD_PATH = os.environ.get("TELEGRAM_WEBHOOK_RECORD_PATH", "")
 SITE_URL = os.environ.get("SITE_URL", "http://127.0.0.1:8000").rstrip("/")
 
 # Email
@@ -179,6 +298,11 @@ STATIC_ROOT = BASE_DIR / 'staticfiles/'
 
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
+# Вложения обращений отдаются через panel:request_file после проверки доступа;
+# сами байты — веб-сервером: "nginx" (X-Accel-Redirect на internal location
+# PROTECTED_MEDIA_INTERNAL_URL -> MEDIA_ROOT), "apache" (X-Sendfile) или "" — Django
+PROTECTED_MEDIA_SERVER = os.environ.get("PROTECTED_MEDIA_SERVER", "").lower()
+PROTECTED_MEDIA_INTERNAL_URL = os.environ.get("PROTECTED_MEDIA_INTERNAL_URL", "/protected-media/")
 
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
@@ -1,10 +1,10 @@
 from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 
 from apps.companies.autocomplete import DistrictAutocomplete
-from config.views import ActivateLanguageView
+from config.views import ActivateLanguageView, protected_media_not_found
 
 urlpatterns = [
                   path("admin/companies/district-autocomplete/", DistrictAutocomplete.as_view(), name="district-autocomplete"),
@@ -23,5 +23,7 @@ urlpatterns = [
                   path("", include("apps.requests.urls")),
                   path("", include("apps.telephony.urls")),
 
+                  re_path(rf"^{settings.MEDIA_URL.lstrip('/')}(?P<path>requests/.*)$", protected_media_not_found),
+
               ] + static(settings.STATIC_URL, document_root=settings.STATIC_ROOT) \
               + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
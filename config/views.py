@@ -1,6 +1,6 @@
 # config/views.py
 from django.conf import settings
-from django.http import HttpResponseRedirect
+from django.http import Http404, HttpResponseRedirect
 from django.views import View
 from django.utils.translation import activate, get_supported_language_variant
 try:
@@ -30,4 +30,9 @@ class ActivateLanguageView(View):
         if hasattr(request, "session"):
             request.session[LANGUAGE_SESSION_KEY] = lang_code
 
-        return resp
\ No newline at end of file
+        return resp
+
+
+def protected_media_not_found(request, path):
+    # вложения обращений — только через panel:request_file (проверка доступа)
+    raise Http404()